@@ -16,6 +16,13 @@ def health_check():
     return jsonify({"status": "healthy", "service": "recommendation-engine"}), 200
 
 
+def _candidates(data, key, resource_type):
+    """Resources posted under key, else the catalog's (all or resource_ids)."""
+    if key in data or not engine.catalog.has(resource_type):
+        return data.get(key, [])
+    return engine.catalog.features(resource_type, data.get("resource_ids"))
+
+
 @app.route("/api/v1/recommend/shelters", methods=["POST"])
 def recommend_shelters():
     """
@@ -43,23 +50,33 @@ def recommend_shelters():
                 "required_skills": []
             }
         ],
+        "resource_ids": ["shelter_1"],  # catalog ids, instead of "shelters";
+                                        # omit both for the whole catalog
         "top_k": 5,
-        "use_bandit": true
+        "use_bandit": true,
+        "filters": {                    # optional, applied before scoring
+            "max_distance": 0.5,        # same units as location
+            "available_only": true,     # drop full shelters
+            "priority_match": true      # drop shelters not supporting "high"
+        },
+        "slate": true                   # optional; bandit orders every position
     }
     """
     try:
         data = request.get_json()
 
         individual = data.get("individual")
-        shelters = data.get("shelters", [])
+        shelters = _candidates(data, "shelters", "shelter")
         top_k = data.get("top_k", 5)
         use_bandit = data.get("use_bandit", True)
+        filters = data.get("filters")
+        slate = data.get("slate")
 
         if not individual:
             return jsonify({"error": "Individual data is required"}), 400
 
         recommendations = engine.recommend(
-            individual, shelters, "shelter", top_k, use_bandit
+            individual, shelters, "shelter", top_k, use_bandit, filters, slate
         )
 
         return jsonify(
@@ -70,6 +87,8 @@ def recommend_shelters():
             }
         ), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -78,19 +97,26 @@ def recommend_shelters():
 def recommend_jobs():
     """
     Recommend jobs for a homeless individual.
+
+    Same body as /api/v1/recommend/shelters with "jobs" in place of
+    "shelters"; without "jobs", active jobs from the catalog are used.
     """
     try:
         data = request.get_json()
 
         individual = data.get("individual")
-        jobs = data.get("jobs", [])
+        jobs = _candidates(data, "jobs", "job")
         top_k = data.get("top_k", 5)
         use_bandit = data.get("use_bandit", True)
+        filters = data.get("filters")
+        slate = data.get("slate")
 
         if not individual:
             return jsonify({"error": "Individual data is required"}), 400
 
-        recommendations = engine.recommend(individual, jobs, "job", top_k, use_bandit)
+        recommendations = engine.recommend(
+            individual, jobs, "job", top_k, use_bandit, filters, slate
+        )
 
         return jsonify(
             {
@@ -100,6 +126,8 @@ def recommend_jobs():
             }
         ), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -116,12 +144,14 @@ def recommend_training():
         programs = data.get("programs", [])
         top_k = data.get("top_k", 5)
         use_bandit = data.get("use_bandit", True)
+        filters = data.get("filters")
+        slate = data.get("slate")
 
         if not individual:
             return jsonify({"error": "Individual data is required"}), 400
 
         recommendations = engine.recommend(
-            individual, programs, "training", top_k, use_bandit
+            individual, programs, "training", top_k, use_bandit, filters, slate
         )
 
         return jsonify(
@@ -132,6 +162,8 @@ def recommend_training():
             }
         ), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -146,7 +178,8 @@ def provide_feedback():
         "resource_type": "shelter",
         "resource_id": "shelter_1",
         "success": true,
-        "outcome_score": 0.85
+        "outcome_score": 0.85,
+        "individual_id": "ind_123"    # optional; matches contextual feedback
     }
     """
     try:
@@ -156,6 +189,7 @@ def provide_feedback():
         resource_id = data.get("resource_id")
         success = data.get("success")
         outcome_score = data.get("outcome_score")
+        individual_id = data.get("individual_id")
 
         if not resource_type or not resource_id:
             return jsonify({"error": "resource_type and resource_id are required"}), 400
@@ -165,7 +199,9 @@ def provide_feedback():
                 {"error": "Either success or outcome_score is required"}
             ), 400
 
-        engine.provide_feedback(resource_type, resource_id, success, outcome_score)
+        engine.provide_feedback(
+            resource_type, resource_id, success, outcome_score, individual_id
+        )
 
         return jsonify(
             {
@@ -179,6 +215,56 @@ def provide_feedback():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/v1/feedback/slate", methods=["POST"])
+def provide_slate_feedback():
+    """
+    Provide feedback on a whole recommended list, position by position.
+
+    Request body:
+    {
+        "resource_type": "shelter",
+        "slate": ["shelter_3", "shelter_1", "shelter_7"],  # in the order shown
+        "accepted_position": 1,     # 0-based; null if none was accepted
+        "outcome_score": 0.9,       # optional reward for the accepted one
+        "individual_id": "ind_123"  # optional
+    }
+    """
+    try:
+        data = request.get_json()
+
+        resource_type = data.get("resource_type")
+        slate = data.get("slate")
+        accepted_position = data.get("accepted_position")
+
+        if not resource_type or not slate or not isinstance(slate, list):
+            return jsonify({"error": "resource_type and slate are required"}), 400
+
+        if accepted_position is not None and (
+            not isinstance(accepted_position, int)
+            or not 0 <= accepted_position < len(slate)
+        ):
+            return jsonify({"error": "accepted_position is outside the slate"}), 400
+
+        positions = engine.provide_slate_feedback(
+            resource_type,
+            slate,
+            accepted_position,
+            data.get("outcome_score"),
+            data.get("individual_id"),
+        )
+
+        return jsonify(
+            {
+                "message": "Feedback recorded successfully",
+                "resource_type": resource_type,
+                "positions_updated": positions,
+            }
+        ), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/v1/statistics", methods=["GET"])
 def get_statistics():
     """
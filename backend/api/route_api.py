@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
-from models.route_optimizer import RouteOptimizer
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from dataclasses import asdict, is_dataclass
+from models.route_optimizer import RouteOptimizer, TRANSPORT_SPEEDS_KMH
 from datetime import datetime
 
 # Create blueprint
@@ -8,6 +10,103 @@ route_bp = Blueprint("routes", __name__)
 # Initialize optimizer
 optimizer = RouteOptimizer()
 
+# Set by init_route_socketio when running under the websocket server
+_socketio = None
+
+
+def init_route_socketio(socketio: SocketIO):
+    """Enable streamed route results on the /routes namespace."""
+    global _socketio
+    _socketio = socketio
+
+    @socketio.on("join", namespace="/routes")
+    def handle_join(data):
+        """Subscribe to progress events for a dispatcher room."""
+        room = data.get("room")
+        if room:
+            join_room(room)
+            emit("joined", {"room": room})
+
+    @socketio.on("leave", namespace="/routes")
+    def handle_leave(data):
+        """Unsubscribe from a dispatcher room."""
+        room = data.get("room")
+        if room:
+            leave_room(room)
+            emit("left", {"room": room})
+
+
+def _to_json(value):
+    """Convert result dataclasses (Route, Location) for SocketIO payloads."""
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+
+def _stream_results(results, room: str):
+    """
+    Background task: emit each improved result as route_progress, then the
+    final one as route_complete.
+    """
+    final = None
+    try:
+        for final in results:
+            _socketio.emit(
+                "route_progress", _to_json(final), namespace="/routes", room=room
+            )
+        _socketio.emit(
+            "route_complete", _to_json(final), namespace="/routes", room=room
+        )
+    except Exception as e:
+        _socketio.emit("route_error", {"error": str(e)}, namespace="/routes", room=room)
+
+
+def _start_stream(results, room: str):
+    """Return the first (constructive) result and stream the rest."""
+    initial = next(results)
+    _socketio.start_background_task(_stream_results, results, room)
+    return initial
+
+
+def _stream_request_error(data):
+    """Validate the stream/room fields; returns an error message or None."""
+    if not data.get("stream"):
+        return None
+    if not data.get("room"):
+        return "room is required when stream is true"
+    if _socketio is None:
+        return "streaming requires the websocket server"
+    return None
+
+
+_CHANGE_FIELDS = {"insert": ("stop",), "remove": ("stop_id",), "delay": ("minutes",)}
+
+
+def _change_error(change):
+    """Validate one route session change; returns an error message or None."""
+    if not isinstance(change, dict):
+        return "each change must be an object"
+    kind = change.get("type")
+    if kind not in _CHANGE_FIELDS:
+        return f"unknown change type {kind!r}; use insert, remove or delay"
+    for field in _CHANGE_FIELDS[kind]:
+        if change.get(field) is None:
+            return f"missing field '{field}' in {kind} change"
+    if kind == "insert":
+        stop = change["stop"]
+        if not isinstance(stop, dict) or "lat" not in stop or "lon" not in stop:
+            return "stop in insert change needs lat and lon"
+    if kind == "delay":
+        try:
+            float(change["minutes"])
+        except (TypeError, ValueError):
+            return "minutes in delay change must be a number"
+    return None
+
 
 @route_bp.route("/api/v1/routes/optimize", methods=["POST"])
 def optimize_route():
@@ -32,8 +131,14 @@ def optimize_route():
             "max_time": 480,
             "max_distance": 50,
             "transport_mode": "public_transport"
-        }
+        },
+        "time_budget_ms": 200,  // optional, return the best route found in time
+        "stream": false,  // optional, push improvements over SocketIO
+        "room": "dispatch_1"  // required with stream
     }
+
+    With stream, the nearest-neighbor route is returned immediately and
+    route_progress / route_complete events follow on the /routes namespace.
     """
     try:
         data = request.get_json()
@@ -47,9 +152,27 @@ def optimize_route():
                 {"error": "start_location and destinations are required"}
             ), 400
 
+        stream_error = _stream_request_error(data)
+        if stream_error:
+            return jsonify({"error": stream_error}), 400
+
         start = (start_loc["lat"], start_loc["lon"])
+        time_budget_ms = data.get("time_budget_ms")
+
+        if data.get("stream"):
+            result = _start_stream(
+                optimizer.iter_multi_stop_route(
+                    start, destinations, constraints, time_budget_ms
+                ),
+                data["room"],
+            )
+            return jsonify(
+                {"success": True, "route": result, "streaming": True}
+            ), 200
 
-        result = optimizer.optimize_multi_stop_route(start, destinations, constraints)
+        result = optimizer.optimize_multi_stop_route(
+            start, destinations, constraints, time_budget_ms
+        )
 
         return jsonify({"success": True, "route": result}), 200
 
@@ -83,7 +206,11 @@ def optimize_volunteer_routes():
                 "priority": "high"
             }
         ],
-        "date": "2024-11-10"
+        "date": "2024-11-10",
+        "parallel": true,  // optional, uses the route worker pool if configured
+        "time_budget_ms": 2000,  // optional, defaults to VRP_TIME_LIMIT_MS
+        "stream": false,  // optional, push improvements over SocketIO
+        "room": "dispatch_1"  // required with stream
     }
     """
     try:
@@ -96,9 +223,30 @@ def optimize_volunteer_routes():
         if not volunteers or not individuals:
             return jsonify({"error": "volunteers and individuals are required"}), 400
 
+        stream_error = _stream_request_error(data)
+        if stream_error:
+            return jsonify({"error": stream_error}), 400
+
         date = datetime.fromisoformat(date_str) if date_str else None
+        options = {
+            "parallel": data.get("parallel"),
+            "time_budget_ms": data.get("time_budget_ms"),
+        }
 
-        result = optimizer.optimize_volunteer_routes(volunteers, individuals, date)
+        if data.get("stream"):
+            result = _start_stream(
+                optimizer.iter_volunteer_routes(
+                    volunteers, individuals, date, **options
+                ),
+                data["room"],
+            )
+            return jsonify(
+                {"success": True, "optimization": result, "streaming": True}
+            ), 200
+
+        result = optimizer.optimize_volunteer_routes(
+            volunteers, individuals, date, **options
+        )
 
         return jsonify({"success": True, "optimization": result}), 200
 
@@ -106,6 +254,139 @@ def optimize_volunteer_routes():
         return jsonify({"error": str(e)}), 500
 
 
+@route_bp.route("/api/v1/routes/sessions", methods=["POST"])
+def create_route_session():
+    """
+    Solve a volunteer's route and keep it for incremental changes.
+
+    Request body:
+    {
+        "start_location": {"lat": 40.7128, "lon": -74.0060},
+        "destinations": [
+            {
+                "id": "ind_1",
+                "lat": 40.7580,
+                "lon": -73.9855,
+                "wait_time": 15,
+                "hours": {"monday": {"open": "08:00", "close": "20:00"}}
+            }
+        ],
+        "constraints": {
+            "transport_mode": "walking",
+            "start_time": "09:00",
+            "max_time": 480  // minutes, optional
+        },
+        "date": "2024-11-11",
+        "room": "volunteer_vol_1"  // optional, receives route_update events
+    }
+    """
+    try:
+        data = request.get_json()
+
+        start = data.get("start_location")
+        destinations = data.get("destinations", [])
+        date_str = data.get("date")
+
+        if not start:
+            return jsonify({"error": "start_location is required"}), 400
+
+        result = optimizer.create_route_session(
+            (start["lat"], start["lon"]),
+            destinations,
+            data.get("constraints"),
+            datetime.fromisoformat(date_str) if date_str else None,
+            room=data.get("room"),
+            time_budget_ms=data.get("time_budget_ms"),
+        )
+
+        return jsonify({"success": True, "session": result}), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@route_bp.route("/api/v1/routes/sessions/<session_id>", methods=["GET"])
+def get_route_session(session_id):
+    """
+    Get the current route of a session.
+    """
+    try:
+        result = optimizer.get_route_session(session_id)
+        if result is None:
+            return jsonify({"error": "Route session not found"}), 404
+
+        return jsonify({"success": True, "session": result}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@route_bp.route("/api/v1/routes/sessions/<session_id>", methods=["DELETE"])
+def delete_route_session(session_id):
+    """
+    End a route session.
+    """
+    try:
+        if not optimizer.route_sessions.remove(session_id):
+            return jsonify({"error": "Route session not found"}), 404
+
+        return jsonify({"success": True}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@route_bp.route("/api/v1/routes/sessions/<session_id>/changes", methods=["POST"])
+def apply_route_changes(session_id):
+    """
+    Repair a session's route after stops are added, removed or delayed. All
+    changes are applied in order, or none if one fails. The updated route is
+    pushed to the session's room as route_update.
+
+    Request body:
+    {
+        "changes": [
+            {"type": "insert", "stop": {"id": "ind_9", "lat": 40.75, "lon": -73.99}},
+            {"type": "remove", "stop_id": "shelter_2"},  // visited or closed
+            {"type": "delay", "minutes": 20, "stop_id": "ind_1"},
+            {"type": "delay", "minutes": 15}  // no stop: the whole day slips
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        changes = data.get("changes")
+
+        if not changes:
+            return jsonify({"error": "changes are required"}), 400
+
+        for change in changes:
+            change_error = _change_error(change)
+            if change_error:
+                return jsonify({"error": change_error}), 400
+
+        if optimizer.route_sessions.get(session_id) is None:
+            return jsonify({"error": "Route session not found"}), 404
+
+        try:
+            result = optimizer.apply_route_changes(session_id, changes)
+        except (KeyError, ValueError) as e:
+            return jsonify({"error": e.args[0] if e.args else str(e)}), 400
+
+        if _socketio is not None and result["room"]:
+            _socketio.emit(
+                "route_update",
+                _to_json(result),
+                namespace="/routes",
+                room=result["room"],
+            )
+
+        return jsonify({"success": True, "session": result}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @route_bp.route("/api/v1/routes/accessibility-score", methods=["POST"])
 def score_accessibility():
     """
@@ -128,7 +409,11 @@ def score_accessibility():
         "individual_profile": {
             "mobility_issues": false,
             "has_transportation": false
-        }
+        },
+        "max_distance_km": 10,
+        "departure_time": "2024-11-10T09:00:00",  // optional, for GTFS transit
+        "max_travel_minutes": 30,  // optional, via cached resource isochrones
+        "travel_mode": "walking"
     }
     """
     try:
@@ -137,6 +422,7 @@ def score_accessibility():
         individual_loc = data.get("individual_location")
         resources = data.get("resources", [])
         profile = data.get("individual_profile", {})
+        max_distance_km = data.get("max_distance_km")
 
         if not individual_loc or not resources:
             return jsonify(
@@ -144,8 +430,17 @@ def score_accessibility():
             ), 400
 
         location = (individual_loc["lat"], individual_loc["lon"])
-
-        scored = optimizer.score_resource_accessibility(location, resources, profile)
+        departure = data.get("departure_time")
+
+        scored = optimizer.score_resource_accessibility(
+            location,
+            resources,
+            profile,
+            max_distance_km,
+            datetime.fromisoformat(departure) if departure else None,
+            data.get("max_travel_minutes"),
+            data.get("travel_mode", "walking"),
+        )
 
         return jsonify(
             {
@@ -160,6 +455,111 @@ def score_accessibility():
         return jsonify({"error": str(e)}), 500
 
 
+@route_bp.route("/api/v1/routes/accessibility-score/batch", methods=["POST"])
+def score_accessibility_batch():
+    """
+    Score resources by accessibility for many individuals at once.
+
+    Request body:
+    {
+        "individuals": [
+            {
+                "id": "ind_1",
+                "lat": 40.7128,
+                "lon": -74.0060,
+                "profile": {"mobility_issues": false}
+            }
+        ],
+        "resources": [...],  // as for /accessibility-score
+        "top_k": 5,
+        "max_distance_km": 10,
+        "departure_time": "2024-11-10T09:00:00",  // optional, for GTFS transit
+        "max_travel_minutes": 30,  // optional, via cached resource isochrones
+        "travel_mode": "walking",
+        "format": "records"  // or "columnar" for parallel arrays
+    }
+    """
+    try:
+        data = request.get_json()
+
+        individuals = data.get("individuals", [])
+        resources = data.get("resources", [])
+        top_k = int(data.get("top_k", 5))
+        departure = data.get("departure_time")
+        response_format = data.get("format", "records")
+
+        if not individuals or not resources:
+            return jsonify({"error": "individuals and resources are required"}), 400
+        if response_format not in ("records", "columnar"):
+            return jsonify({"error": "format must be 'records' or 'columnar'"}), 400
+
+        scored = optimizer.score_accessibility_batch(
+            [(ind["lat"], ind["lon"]) for ind in individuals],
+            resources,
+            profiles=[ind.get("profile", {}) for ind in individuals],
+            top_k=top_k,
+            max_distance_km=data.get("max_distance_km"),
+            departure=datetime.fromisoformat(departure) if departure else None,
+            max_travel_minutes=data.get("max_travel_minutes"),
+            travel_mode=data.get("travel_mode", "walking"),
+        )
+
+        if response_format == "columnar":
+            # Rows follow individual_ids; -1 in resource_index means no match,
+            # -1 in estimated_time means no transport option
+            results = {
+                "individual_ids": [ind.get("id") for ind in individuals],
+                "resource_ids": [res.get("id") for res in resources],
+                "resource_index": scored["index"].tolist(),
+                "accessibility_score": scored["accessibility_score"].tolist(),
+                "distance_km": scored["distance_km"].tolist(),
+                "estimated_time": scored["estimated_time"].tolist(),
+                "estimated_cost": scored["estimated_cost"].tolist(),
+            }
+        else:
+            results = []
+            for row, individual in enumerate(individuals):
+                matches = []
+                for col, i in enumerate(scored["index"][row]):
+                    if i < 0:
+                        break
+                    resource = resources[i]
+                    travel_time = int(scored["estimated_time"][row, col])
+                    matches.append(
+                        {
+                            "resource_id": resource.get("id"),
+                            "resource_name": resource.get("name"),
+                            "resource_type": resource.get("type"),
+                            "distance_km": float(scored["distance_km"][row, col]),
+                            "accessibility_score": float(
+                                scored["accessibility_score"][row, col]
+                            ),
+                            "estimated_time": (
+                                travel_time if travel_time >= 0 else None
+                            ),
+                            "estimated_cost": float(
+                                scored["estimated_cost"][row, col]
+                            ),
+                        }
+                    )
+                results.append(
+                    {"individual_id": individual.get("id"), "top_resources": matches}
+                )
+
+        return jsonify(
+            {
+                "success": True,
+                "format": response_format,
+                "total_individuals": len(individuals),
+                "total_resources": len(resources),
+                "results": results,
+            }
+        ), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @route_bp.route("/api/v1/routes/visit-times", methods=["POST"])
 def suggest_visit_times():
     """
@@ -170,12 +570,15 @@ def suggest_visit_times():
         "location": {
             "id": "shelter_1",
             "name": "Hope Shelter",
+            "lat": 40.7580,
+            "lon": -73.9855,
             "hours": {
                 "monday": {"open": "08:00", "close": "20:00"},
                 "tuesday": {"open": "08:00", "close": "20:00"}
             }
         },
-        "date": "2024-11-10"
+        "date": "2024-11-10",
+        "origin": {"lat": 40.7128, "lon": -74.0060}  // optional, plans transit
     }
     """
     try:
@@ -183,13 +586,16 @@ def suggest_visit_times():
 
         location = data.get("location")
         date_str = data.get("date")
+        origin = data.get("origin")
 
         if not location:
             return jsonify({"error": "location is required"}), 400
 
         date = datetime.fromisoformat(date_str) if date_str else None
 
-        suggestions = optimizer.suggest_visit_times(location, date)
+        suggestions = optimizer.suggest_visit_times(
+            location, date, (origin["lat"], origin["lon"]) if origin else None
+        )
 
         return jsonify(
             {
@@ -204,6 +610,69 @@ def suggest_visit_times():
         return jsonify({"error": str(e)}), 500
 
 
+@route_bp.route("/api/v1/routes/visit-events", methods=["POST"])
+def record_visit_events():
+    """
+    Record check-ins and capacity updates for the visit-time demand model
+    (when it is not reading the main app's analytics_events).
+
+    Request body:
+    {
+        "events": [
+            {
+                "type": "checkin",
+                "location_id": "shelter_1",
+                "timestamp": "2024-11-11T09:40:00",
+                "wait_minutes": 12  // optional
+            },
+            {
+                "type": "capacity",
+                "location_id": "shelter_1",
+                "timestamp": "2024-11-11T18:00:00",
+                "available_beds": 5,
+                "total_capacity": 50
+            }
+        ]
+    }
+    """
+    try:
+        data = request.get_json()
+        events = data.get("events")
+
+        if not events:
+            return jsonify({"error": "events are required"}), 400
+
+        for event in events:
+            if "location_id" not in event:
+                return jsonify({"error": "location_id is required"}), 400
+            if event.get("type") not in ("checkin", "capacity"):
+                return jsonify({"error": "type must be checkin or capacity"}), 400
+
+        for event in events:
+            location_id = str(event["location_id"])
+            when = (
+                datetime.fromisoformat(event["timestamp"])
+                if event.get("timestamp")
+                else datetime.now()
+            )
+            if event["type"] == "checkin":
+                optimizer.visit_demand.record_checkin(
+                    location_id, when, event.get("wait_minutes")
+                )
+            else:
+                optimizer.visit_demand.record_capacity(
+                    location_id,
+                    when,
+                    event.get("available_beds", 0),
+                    event.get("total_capacity", 0),
+                )
+
+        return jsonify({"success": True, "recorded": len(events)}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @route_bp.route("/api/v1/routes/service-gaps", methods=["POST"])
 def identify_service_gaps():
     """
@@ -226,7 +695,12 @@ def identify_service_gaps():
             "min_lon": -74.1,
             "max_lon": -73.9
         },
-        "population_density": []
+        "population_density": [{"lat": 40.75, "lon": -74.0, "population": 1200}],
+        "grid_size_km": 2.0,
+        "output": "detailed",  // or "raster" for compact base64 arrays
+        "max_minutes": 30,  // optional: coverage by travel time (isochrones)
+        "transport_mode": "walking",
+        "departure_time": "2024-11-10T09:00:00"  // public transport only
     }
     """
     try:
@@ -235,12 +709,26 @@ def identify_service_gaps():
         service_locations = data.get("service_locations", [])
         coverage_area = data.get("coverage_area")
         population_density = data.get("population_density", [])
+        grid_size = data.get("grid_size_km", 2.0)
+        output = data.get("output", "detailed")
 
         if not coverage_area:
             return jsonify({"error": "coverage_area is required"}), 400
 
+        if output not in ("detailed", "raster"):
+            return jsonify({"error": "output must be detailed or raster"}), 400
+
+        departure = data.get("departure_time")
+
         result = optimizer.identify_service_gaps(
-            service_locations, coverage_area, population_density
+            service_locations,
+            coverage_area,
+            population_density,
+            grid_size,
+            output,
+            transport_mode=data.get("transport_mode", "walking"),
+            max_minutes=data.get("max_minutes"),
+            departure=datetime.fromisoformat(departure) if departure else None,
         )
 
         return jsonify({"success": True, "analysis": result}), 200
@@ -269,9 +757,10 @@ def calculate_distance():
         if not origin or not destination:
             return jsonify({"error": "origin and destination are required"}), 400
 
-        distance = optimizer._haversine_distance(
+        estimate = optimizer.estimate_travel(
             (origin["lat"], origin["lon"]), (destination["lat"], destination["lon"])
         )
+        distance = estimate["distance_km"]
 
         return jsonify(
             {
@@ -307,22 +796,113 @@ def estimate_travel():
         if not origin or not destination:
             return jsonify({"error": "origin and destination are required"}), 400
 
-        distance = optimizer._haversine_distance(
-            (origin["lat"], origin["lon"]), (destination["lat"], destination["lon"])
+        estimate = optimizer.estimate_travel(
+            (origin["lat"], origin["lon"]),
+            (destination["lat"], destination["lon"]),
+            transport_mode,
         )
 
-        time = optimizer._estimate_travel_time(distance, transport_mode)
-        cost = optimizer._estimate_travel_cost(distance, transport_mode)
-
         return jsonify(
             {
                 "success": True,
-                "distance_km": round(distance, 2),
-                "estimated_time_minutes": time,
-                "estimated_cost": round(cost, 2),
+                "distance_km": round(estimate["distance_km"], 2),
+                "estimated_time_minutes": estimate["time"],
+                "estimated_cost": round(estimate["cost"], 2),
                 "transport_mode": transport_mode,
             }
         ), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@route_bp.route("/api/v1/routes/isochrones", methods=["POST"])
+def compute_isochrones():
+    """
+    Areas reachable from service locations within a travel-time budget.
+
+    Request body:
+    {
+        "locations": [
+            {"id": "shelter_1", "lat": 40.7580, "lon": -73.9855}
+        ],
+        "transport_mode": "walking",  // or cycling, public_transport, driving
+        "minutes": 30,
+        "departure_time": "2024-11-10T09:00:00",  // public transport only
+        "cell_size_km": 0.25,
+        "output": "polygon"  // or "raster" (bit-packed mask) or "both"
+    }
+    """
+    try:
+        data = request.get_json()
+
+        locations = data.get("locations", [])
+        transport_mode = data.get("transport_mode", "walking")
+        minutes = float(data.get("minutes", 30))
+        departure = data.get("departure_time")
+        output = data.get("output", "polygon")
+
+        if not locations:
+            return jsonify({"error": "locations are required"}), 400
+        if transport_mode not in TRANSPORT_SPEEDS_KMH:
+            return jsonify({"error": f"unknown transport_mode {transport_mode}"}), 400
+        if minutes <= 0:
+            return jsonify({"error": "minutes must be positive"}), 400
+        if output not in ("polygon", "raster", "both"):
+            return jsonify({"error": "output must be polygon, raster or both"}), 400
+
+        isochrones = optimizer.compute_isochrones(
+            locations,
+            transport_mode,
+            minutes,
+            datetime.fromisoformat(departure) if departure else None,
+            data.get("cell_size_km"),
+            output,
+        )
+
+        return jsonify(
+            {"success": True, "isochrones": isochrones, "total": len(isochrones)}
+        ), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@route_bp.route("/api/v1/routes/isochrones/invalidate", methods=["POST"])
+def invalidate_isochrones():
+    """
+    Drop cached isochrones after service locations change.
+
+    Request body:
+    {
+        "location_ids": ["shelter_1"]  // omit to clear the whole cache
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        removed = optimizer.isochrones.invalidate(data.get("location_ids"))
+
+        return jsonify({"success": True, "invalidated": removed}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@route_bp.route("/api/v1/routes/cache-stats", methods=["GET"])
+def get_cache_stats():
+    """
+    Get distance/travel-time cache statistics.
+    """
+    try:
+        return jsonify(
+            {
+                "success": True,
+                "cache": optimizer.distance_cache.get_stats(),
+                "isochrones": optimizer.isochrones.get_stats(),
+                "visit_demand": optimizer.visit_demand.get_stats(),
+            }
+        ), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -3,6 +3,7 @@ from flask_socketio import SocketIO
 from flask_cors import CORS
 from api.app import app
 from api.chatbot_api import chatbot_bp, init_socketio_events
+from api.route_api import init_route_socketio
 from config import Config
 
 # Enable CORS
@@ -22,6 +23,7 @@ app.register_blueprint(chatbot_bp)
 
 # Initialize WebSocket events
 init_socketio_events(socketio)
+init_route_socketio(socketio)
 
 if __name__ == "__main__":
     socketio.run(app, host=Config.API_HOST, port=Config.API_PORT, debug=Config.DEBUG)
@@ -21,6 +21,7 @@ from dotenv import load_dotenv
 
 # Import database
 from database import db
+from models.spatial_index import get_spatial_index
 
 load_dotenv()
 
@@ -356,6 +357,39 @@ def get_available_shelters():
         return error_response(str(e), status=500)
 
 
+@app.route("/api/shelters/nearby", methods=["GET"])
+@jwt_required()
+def get_nearby_shelters():
+    """Get shelters within a radius of a location, nearest first"""
+    try:
+        lat = request.args.get("lat", type=float)
+        lng = request.args.get("lng", type=float)
+        radius_km = request.args.get("radius_km", 5.0, type=float)
+        available_only = request.args.get("available_only", "false").lower() == "true"
+
+        if lat is None or lng is None:
+            return error_response("lat and lng are required", status=400)
+
+        shelters = db.get_shelters(available_only=available_only)
+        if not shelters:
+            return success_response([])
+
+        # Index is shared across requests while the shelter set is unchanged
+        index = get_spatial_index(
+            [(s["location_lat"], s["location_lng"]) for s in shelters]
+        )
+        indices, distances = index.within_radius([(lat, lng)], radius_km)[0]
+
+        nearby = [
+            {**shelters[i], "distance_km": round(float(d), 2)}
+            for i, d in zip(indices, distances)
+        ]
+
+        return success_response(nearby)
+    except Exception as e:
+        return error_response(str(e), status=500)
+
+
 @app.route("/api/shelters/<int:id>", methods=["GET"])
 @jwt_required()
 def get_shelter(id):
@@ -389,6 +423,17 @@ def update_shelter_capacity(id):
 
         shelter = db.get_shelter_by_id(id)
 
+        # Occupancy sample for the visit-time demand model
+        db.log_event(
+            "shelter_capacity",
+            {
+                "location_id": f"shelter_{id}",
+                "available_beds": available_beds,
+                "total_capacity": shelter["total_capacity"],
+                "occurred_at": datetime.now().isoformat(),
+            },
+        )
+
         # Emit socket event
         socketio.emit(
             "shelter_update",
@@ -404,6 +449,38 @@ def update_shelter_capacity(id):
         return error_response(str(e), status=500)
 
 
+@app.route("/api/shelters/<int:id>/checkin", methods=["POST"])
+@jwt_required()
+def check_in_shelter(id):
+    """Record a visit to a shelter and how long the visitor waited"""
+    try:
+        data = request.get_json(silent=True) or {}
+        wait_minutes = data.get("wait_minutes")
+
+        if wait_minutes is not None and (
+            not isinstance(wait_minutes, (int, float)) or wait_minutes < 0
+        ):
+            return error_response("wait_minutes must be a non-negative number")
+
+        shelter = db.get_shelter_by_id(id)
+        if not shelter:
+            return error_response("Shelter not found", status=404)
+
+        event_id = db.log_event(
+            "location_checkin",
+            {
+                "location_id": f"shelter_{id}",
+                "wait_minutes": wait_minutes,
+                "occurred_at": datetime.now().isoformat(),
+            },
+            individual_id=data.get("individual_id"),
+        )
+
+        return success_response({"event_id": event_id}, "Check-in recorded")
+    except Exception as e:
+        return error_response(str(e), status=500)
+
+
 # ==========================================
 # JOBS ENDPOINTS
 # ==========================================
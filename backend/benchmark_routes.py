@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the route optimizer.
+
+Generates reproducible synthetic cities (seeded clusters of individuals,
+shelters and volunteers), times the TSP, volunteer VRP and service-gap
+analysis at several sizes, and measures TSP tour quality against a
+reference: the exact Held-Karp optimum for small instances, otherwise the
+Held-Karp 1-tree lower bound (subgradient optimized; plain MST for the
+largest sizes). Gaps against a lower bound overstate the true gap.
+
+Usage:
+    python benchmark_routes.py --sizes 10,100,1000,10000 --output bench.json
+    python benchmark_routes.py --baseline bench.json      # run and compare
+    python benchmark_routes.py --compare old.json new.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import Config
+from models.distance_matrix import haversine_matrix
+from models.route_optimizer import RouteOptimizer
+
+CITY_CENTER = (40.7128, -74.0060)
+CITY_RADIUS_KM = 12.0
+KM_PER_DEGREE = 111.0
+
+# Largest instances per benchmark; the TSP/VRP keep a dense N x N matrix
+MAX_TSP_POINTS = 3000
+MAX_VRP_POINTS = 2000
+HELD_KARP_MAX_POINTS = 12
+ONE_TREE_MAX_POINTS = 1000
+ONE_TREE_ITERATIONS = 100
+
+# Relative slowdown / quality loss reported as a regression by --baseline;
+# slowdowns under MIN_TIME_DELTA_S are timer noise
+TIME_TOLERANCE = 0.25
+MIN_TIME_DELTA_S = 0.005
+QUALITY_TOLERANCE = 0.01
+
+
+def synthetic_city(size, seed):
+    """
+    Seeded city with `size` individuals in neighbourhood clusters, plus
+    shelters (1 per 20 individuals) and volunteers (1 per 25).
+    """
+    rng = np.random.default_rng(seed + size)
+    num_clusters = max(3, int(np.sqrt(size) / 2))
+    centers = rng.uniform(-CITY_RADIUS_KM, CITY_RADIUS_KM, size=(num_clusters, 2))
+    spread = rng.uniform(0.5, 2.5, size=num_clusters)
+
+    def points(count):
+        cluster = rng.integers(0, num_clusters, size=count)
+        offsets_km = centers[cluster] + rng.normal(size=(count, 2)) * spread[
+            cluster, None
+        ]
+        lat = CITY_CENTER[0] + offsets_km[:, 0] / KM_PER_DEGREE
+        lon = CITY_CENTER[1] + offsets_km[:, 1] / (
+            KM_PER_DEGREE * np.cos(np.radians(CITY_CENTER[0]))
+        )
+        return np.column_stack([lat, lon])
+
+    individual_points = points(size)
+    individuals = []
+    for i, (lat, lon) in enumerate(individual_points.tolist()):
+        individual = {
+            "id": f"ind_{i}",
+            "lat": lat,
+            "lon": lon,
+            "wait_time": int(rng.integers(5, 25)),
+            "priority": ["low", "medium", "high", "critical"][int(rng.integers(0, 4))],
+        }
+        if rng.random() < 0.25:
+            opens = int(rng.integers(8, 13))
+            individual["hours"] = {
+                "monday": {"open": f"{opens:02d}:00", "close": f"{opens + 4:02d}:00"}
+            }
+        individuals.append(individual)
+
+    shelters = [
+        {"id": f"shelter_{i}", "lat": lat, "lon": lon, "type": "shelter"}
+        for i, (lat, lon) in enumerate(points(max(3, size // 20)).tolist())
+    ]
+    volunteers = [
+        {
+            "id": f"vol_{i}",
+            "lat": lat,
+            "lon": lon,
+            "transport_mode": "driving",
+            "available_hours": 8,
+            "capacity": 30,
+        }
+        for i, (lat, lon) in enumerate(points(max(2, size // 25)).tolist())
+    ]
+    population = [
+        {"lat": lat, "lon": lon, "population": int(rng.integers(50, 2000))}
+        for lat, lon in individual_points[: min(size, 2000)].tolist()
+    ]
+
+    return {
+        "start": tuple(individual_points.mean(axis=0).tolist()),
+        "individuals": individuals,
+        "shelters": shelters,
+        "volunteers": volunteers,
+        "population": population,
+    }
+
+
+def path_length(dist, tour):
+    """Length of the open path 0 -> tour[0] -> ... -> tour[-1]."""
+    path = [0] + list(tour)
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def held_karp(dist):
+    """Exact shortest open path from node 0 visiting every node (O(2^n n^2))."""
+    n = len(dist)
+    if n <= 2:
+        return float(dist[0, 1:].sum())
+    m = n - 1
+    full = (1 << m) - 1
+    # best[mask, j]: shortest path from 0 over `mask` ending at node j + 1
+    best = np.full((1 << m, m), np.inf)
+    for j in range(m):
+        best[1 << j, j] = dist[0, j + 1]
+    sub = dist[1:, 1:]
+    for mask in range(1, full + 1):
+        row = best[mask]
+        if not np.isfinite(row).any():
+            continue
+        for j in np.flatnonzero(np.isfinite(row)):
+            remaining = ~mask & full
+            if not remaining:
+                continue
+            nxt = [k for k in range(m) if remaining >> k & 1]
+            candidate = row[j] + sub[j, nxt]
+            targets = mask | (1 << np.array(nxt))
+            np.minimum.at(best, (targets, nxt), candidate)
+    return float(best[full].min())
+
+
+def dense_mst(weights):
+    """Prim's algorithm on a dense matrix: (total weight, node degrees)."""
+    n = len(weights)
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    key = weights[0].astype(float)
+    key[0] = np.inf
+    parent = np.zeros(n, dtype=int)
+    degree = np.zeros(n, dtype=int)
+    total = 0.0
+    for _ in range(n - 1):
+        j = int(np.argmin(key))
+        total += key[j]
+        degree[j] += 1
+        degree[parent[j]] += 1
+        in_tree[j] = True
+        key[j] = np.inf
+        closer = (weights[j] < key) & ~in_tree
+        key[closer] = weights[j][closer]
+        parent[closer] = j
+    return total, degree
+
+
+def one_tree_bound(dist, upper_bound, iterations=ONE_TREE_ITERATIONS):
+    """
+    Held-Karp lower bound for the open path from node 0.
+
+    The path is closed through a dummy node joined to node 0 and to one
+    other node at zero cost. Node penalties pi are tuned by subgradient
+    steps so the 1-tree (MST + the two dummy edges) approaches a path.
+    """
+    n = len(dist)
+    if n <= 2:
+        return float(dist[0, 1:].sum())
+
+    pi = np.zeros(n)
+    best = 0.0
+    step = 2.0
+    stalled = 0
+    for _ in range(iterations):
+        tree_cost, degree = dense_mst(dist + pi[:, None] + pi[None, :])
+
+        other = 1 + int(np.argmin(pi[1:]))
+        bound = tree_cost + pi[0] + pi[other] - 2 * pi.sum()
+        if bound > best + 1e-9:
+            best, stalled = bound, 0
+        else:
+            stalled += 1
+            if stalled >= 5:
+                step, stalled = step / 2, 0
+
+        degree[0] += 1
+        degree[other] += 1
+        gradient = degree - 2
+        norm = float((gradient**2).sum())
+        if norm == 0:
+            break  # the 1-tree is a path: bound is optimal
+        pi += step * (upper_bound - bound) / norm * gradient
+
+    return best
+
+
+def tsp_reference(dist, upper_bound):
+    """(name, length) of the reference: exact optimum or a lower bound."""
+    if len(dist) <= HELD_KARP_MAX_POINTS + 1:
+        return "held_karp", held_karp(dist)
+    if len(dist) <= ONE_TREE_MAX_POINTS + 1:
+        return "one_tree_lower_bound", one_tree_bound(dist, upper_bound)
+    return "mst_lower_bound", float(dense_mst(dist)[0])
+
+
+def bench_tsp(optimizer, city, repeat):
+    dist = optimizer._distance_matrix(
+        [city["start"]] + [(i["lat"], i["lon"]) for i in city["individuals"]]
+    )
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        tour = optimizer._solve_tsp(dist)
+        times.append(time.perf_counter() - started)
+
+    length = path_length(dist, tour)
+    reference, reference_length = tsp_reference(dist, length)
+    return {
+        "seconds": float(np.median(times)),
+        "tour_km": round(length, 3),
+        "reference": reference,
+        "reference_km": round(reference_length, 3),
+        "gap_pct": round((length / reference_length - 1) * 100, 3)
+        if reference_length > 0
+        else 0.0,
+    }
+
+
+def bench_vrp(optimizer, city, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = optimizer.optimize_volunteer_routes(
+            city["volunteers"], city["individuals"], datetime(2024, 11, 11)
+        )
+        times.append(time.perf_counter() - started)
+
+    return {
+        "seconds": float(np.median(times)),
+        "coverage": round(result["coverage"], 4),
+        "unassigned": len(result["unassigned"]),
+        "total_travel_minutes": result["solver_stats"].get("total_travel_minutes"),
+        "balance_score": round(float(result["balance_score"]), 4),
+    }
+
+
+def bench_gaps(optimizer, city, repeat):
+    coords = np.array([(s["lat"], s["lon"]) for s in city["shelters"]])
+    margin = 2 / KM_PER_DEGREE
+    area = {
+        "min_lat": float(coords[:, 0].min() - margin),
+        "max_lat": float(coords[:, 0].max() + margin),
+        "min_lon": float(coords[:, 1].min() - margin),
+        "max_lon": float(coords[:, 1].max() + margin),
+    }
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = optimizer.identify_service_gaps(
+            city["shelters"], area, city["population"], 0.5, "raster"
+        )
+        times.append(time.perf_counter() - started)
+
+    # Check the coverage layer against a brute-force nearest service
+    raster = optimizer._coverage_raster(
+        city["shelters"], area, city["population"], 0.5
+    )
+    lat_grid, lon_grid = np.meshgrid(
+        raster["lat_values"], raster["lon_values"], indexing="ij"
+    )
+    cells = np.column_stack([lat_grid.ravel(), lon_grid.ravel()])
+    nearest = np.full(len(cells), np.inf)
+    for lo in range(0, len(cells), 2000):
+        nearest[lo : lo + 2000] = haversine_matrix(cells[lo : lo + 2000], coords).min(
+            axis=1
+        )
+    expected = np.maximum(0.0, 1.0 - nearest / 10)
+
+    return {
+        "seconds": float(np.median(times)),
+        "cells": int(len(cells)),
+        "total_gaps": result["total_gaps"],
+        "coverage_percentage": round(result["coverage_percentage"], 3),
+        "max_coverage_error": float(
+            np.abs(raster["coverage"].ravel() - expected).max()
+        )
+        if len(cells)
+        else 0.0,
+    }
+
+
+BENCHMARKS = {
+    "tsp": (bench_tsp, MAX_TSP_POINTS),
+    "vrp": (bench_vrp, MAX_VRP_POINTS),
+    "gaps": (bench_gaps, None),
+}
+
+# Metric used for quality comparisons and whether higher is better
+QUALITY_METRICS = {
+    "tsp": ("tour_km", False),
+    "vrp": ("coverage", True),
+    "gaps": ("max_coverage_error", False),
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, seed, repeat, benchmarks, limits):
+    optimizer = RouteOptimizer()
+    results = []
+    for size in sizes:
+        city = synthetic_city(size, seed)
+        for name in benchmarks:
+            bench, _ = BENCHMARKS[name]
+            entry = {"benchmark": name, "size": size}
+            if limits.get(name) is not None and size > limits[name]:
+                entry["skipped"] = f"size above limit {limits[name]}"
+            else:
+                entry.update(bench(optimizer, city, repeat))
+            results.append(entry)
+            print(format_entry(entry), flush=True)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": seed,
+            "repeat": repeat,
+            "sizes": sizes,
+            "road_network": bool(Config.ROAD_NETWORK_PATH),
+            "route_workers": Config.ROUTE_WORKERS,
+        },
+        "results": results,
+    }
+
+
+def format_entry(entry):
+    details = ", ".join(
+        f"{key}={value}"
+        for key, value in entry.items()
+        if key not in ("benchmark", "size", "seconds")
+    )
+    seconds = entry.get("seconds")
+    timing = f"{seconds * 1000:10.1f} ms" if seconds is not None else " " * 13
+    return f"{entry['benchmark']:>5} {entry['size']:>6} {timing}  {details}"
+
+
+def compare(
+    old, new, time_tolerance=TIME_TOLERANCE, quality_tolerance=QUALITY_TOLERANCE
+):
+    """Print per-benchmark deltas; returns the list of regressions."""
+    baseline = {(r["benchmark"], r["size"]): r for r in old["results"]}
+    regressions = []
+
+    print(
+        f"\nComparing {old['meta'].get('commit')} -> {new['meta'].get('commit')}"
+    )
+    print(
+        f"{'bench':>5} {'size':>6} {'old ms':>10} {'new ms':>10} {'time':>8}  quality"
+    )
+    for entry in new["results"]:
+        key = (entry["benchmark"], entry["size"])
+        before = baseline.get(key)
+        if before is None or "seconds" not in entry or "seconds" not in before:
+            continue
+
+        time_change = (
+            entry["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        )
+        metric, higher_is_better = QUALITY_METRICS[entry["benchmark"]]
+        old_value, new_value = before.get(metric), entry.get(metric)
+        quality = ""
+        if old_value is not None and new_value is not None:
+            quality = f"{metric} {old_value} -> {new_value}"
+            worse = new_value < old_value if higher_is_better else new_value > old_value
+            scale = max(abs(old_value), 1e-6)
+            if worse and abs(new_value - old_value) / scale > quality_tolerance:
+                regressions.append(f"{key[0]}/{key[1]}: {metric} worse")
+                quality += "  REGRESSION"
+
+        flag = ""
+        if (
+            time_change > time_tolerance
+            and entry["seconds"] - before["seconds"] > MIN_TIME_DELTA_S
+        ):
+            regressions.append(f"{key[0]}/{key[1]}: {time_change:+.0%} time")
+            flag = " SLOWER"
+        print(
+            f"{key[0]:>5} {key[1]:>6} {before['seconds'] * 1000:10.1f} "
+            f"{entry['seconds'] * 1000:10.1f} {time_change:+7.0%}{flag}  {quality}"
+        )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the route optimizer")
+    parser.add_argument("--sizes", default="10,100,1000,10000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--benchmarks", default=",".join(BENCHMARKS), help="tsp,vrp,gaps"
+    )
+    parser.add_argument("--max-tsp-points", type=int, default=MAX_TSP_POINTS)
+    parser.add_argument("--max-vrp-points", type=int, default=MAX_VRP_POINTS)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare this run with a saved JSON")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved runs"
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        regressions = compare(old, new)
+    else:
+        results = run(
+            [int(size) for size in args.sizes.split(",")],
+            args.seed,
+            args.repeat,
+            args.benchmarks.split(","),
+            {"tsp": args.max_tsp_points, "vrp": args.max_vrp_points},
+        )
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nResults written to {args.output}")
+
+        regressions = []
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare(json.load(f), results)
+
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,6 +17,54 @@ class Config:
     EPSILON = float(os.getenv("EPSILON", 0.1))  # Exploration rate
     EPSILON_DECAY = float(os.getenv("EPSILON_DECAY", 0.995))
     MIN_EPSILON = float(os.getenv("MIN_EPSILON", 0.01))
+    # Non-stationary rewards: per-feedback decay (1 = off) or last-N window
+    BANDIT_DECAY = float(os.getenv("BANDIT_DECAY", 1.0))
+    BANDIT_WINDOW = int(os.getenv("BANDIT_WINDOW", 0))  # 0 = all rewards
+    # SQLite file for bandit_arms (usually the main app DB); empty = memory only
+    BANDIT_DB_PATH = os.getenv("BANDIT_DB_PATH", "")
+    BANDIT_FLUSH_SECONDS = float(os.getenv("BANDIT_FLUSH_SECONDS", 5))
+    # "memory" = per process; "shared" = one mmap-ed arm file for all workers
+    BANDIT_BACKEND = os.getenv("BANDIT_BACKEND", "memory")
+    BANDIT_SHARED_PATH = os.getenv(
+        "BANDIT_SHARED_PATH",
+        os.path.join(tempfile.gettempdir(), "homeless_aid_bandit.mmap"),
+    )
+    BANDIT_SHARED_CAPACITY = int(os.getenv("BANDIT_SHARED_CAPACITY", 65536))  # Arms
+    # Candidate choice: "ucb" (per resource), "linucb" or "thompson" (contextual)
+    BANDIT_POLICY = os.getenv("BANDIT_POLICY", "ucb")
+    CONTEXTUAL_ALPHA = float(os.getenv("CONTEXTUAL_ALPHA", 1.0))  # Exploration
+    # Let the bandit order every returned position, not just the first
+    BANDIT_SLATE = os.getenv("BANDIT_SLATE", "False").lower() == "true"
+
+    # Route Optimization
+    ROUTE_NEIGHBOR_K = int(os.getenv("ROUTE_NEIGHBOR_K", 10))  # 2-opt candidates
+    VRP_TIME_LIMIT_MS = int(os.getenv("VRP_TIME_LIMIT_MS", 2000))
+    ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", 100000))
+    ROUTE_CACHE_TTL_SECONDS = int(os.getenv("ROUTE_CACHE_TTL_SECONDS", 86400))
+    ROUTE_CACHE_DB_PATH = os.getenv("ROUTE_CACHE_DB_PATH", "")  # Empty = memory only
+    ROUTE_WORKERS = int(os.getenv("ROUTE_WORKERS", 0))  # 0/1 = solve in-process
+    ROUTE_SOLVE_TIMEOUT_MS = int(os.getenv("ROUTE_SOLVE_TIMEOUT_MS", 1000))
+    ROUTE_SESSION_MAX = int(os.getenv("ROUTE_SESSION_MAX", 1000))  # Live sessions
+    ROUTE_SESSION_TTL_SECONDS = int(os.getenv("ROUTE_SESSION_TTL_SECONDS", 43200))
+    # Road graph extract (.csv edge list or OSM .pbf); empty = straight-line
+    ROAD_NETWORK_PATH = os.getenv("ROAD_NETWORK_PATH", "")
+    # GTFS zip for time-dependent public transport; empty = speed estimate
+    TRANSIT_GTFS_PATH = os.getenv("TRANSIT_GTFS_PATH", "")
+    TRANSIT_MAX_TRIP_MINUTES = int(os.getenv("TRANSIT_MAX_TRIP_MINUTES", 120))
+    ISOCHRONE_CACHE_SIZE = int(os.getenv("ISOCHRONE_CACHE_SIZE", 512))  # Rasters
+    ISOCHRONE_CELL_KM = float(os.getenv("ISOCHRONE_CELL_KM", 0.25))
+    # Main app SQLite DB whose analytics_events feed visit-time demand;
+    # empty = events recorded through the API only
+    VISIT_DEMAND_DB_PATH = os.getenv("VISIT_DEMAND_DB_PATH", "")
+    VISIT_DEMAND_REFRESH_SECONDS = int(os.getenv("VISIT_DEMAND_REFRESH_SECONDS", 60))
+
+    # Recommendation Catalog
+    # Main app SQLite DB whose shelters and jobs tables back recommendation
+    # requests that don't post resources; empty = resources must be posted
+    RESOURCE_CATALOG_DB_PATH = os.getenv("RESOURCE_CATALOG_DB_PATH", "")
+    RESOURCE_CATALOG_REFRESH_SECONDS = int(
+        os.getenv("RESOURCE_CATALOG_REFRESH_SECONDS", 30)
+    )
 
     # Scoring Weights
     WEIGHT_LOCATION = 0.30
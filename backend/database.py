@@ -223,12 +223,21 @@ class Database:
                 "CREATE INDEX IF NOT EXISTS idx_shelters_available ON shelters(available_beds)"
             )
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_shelters_updated_at ON shelters(updated_at)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at)"
+            )
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_recommendations_individual ON recommendations(individual_id)"
             )
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_chat_messages_conversation ON chat_messages(conversation_id)"
             )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analytics_events_type ON analytics_events(event_type, id)"
+            )
 
             conn.commit()
             print("✅ Database initialized successfully")
@@ -447,9 +456,11 @@ class Database:
         """Update shelter capacity"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # Same UTC format as the column default, so updated_at orders
+            # correctly for readers that poll by it (ResourceCatalog)
             cursor.execute(
-                "UPDATE shelters SET available_beds = ?, updated_at = ? WHERE id = ?",
-                (available_beds, datetime.now(), shelter_id),
+                "UPDATE shelters SET available_beds = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (available_beds, shelter_id),
             )
             return cursor.rowcount > 0
 
@@ -568,6 +579,25 @@ class Database:
     # ANALYTICS OPERATIONS
     # ==========================================
 
+    def log_event(
+        self,
+        event_type: str,
+        metadata: Dict[str, Any],
+        user_id: Optional[int] = None,
+        individual_id: Optional[int] = None,
+    ) -> int:
+        """Record an analytics event"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO analytics_events (event_type, user_id, individual_id, metadata)
+                VALUES (?, ?, ?, ?)
+            """,
+                (event_type, user_id, individual_id, json.dumps(metadata)),
+            )
+            return cursor.lastrowid
+
     def get_dashboard_stats(self) -> Dict[str, Any]:
         """Get dashboard statistics"""
         with self.get_connection() as conn:
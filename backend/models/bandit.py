@@ -1,6 +1,191 @@
 import numpy as np
-from typing import Dict, List, Tuple
-from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+from models.shared_bandit import SharedArmTable
+
+# Rescale decayed statistics before the running weight overflows
+_MAX_SCALE = 1e150
+
+# Pseudo-rewards the base score counts for in slate estimates: it acts as a
+# prior acceptance rate that feedback gradually replaces
+SLATE_PRIOR_WEIGHT = 2.0
+
+
+class ArmTable:
+    """
+    Reward statistics of every arm (resource) of one resource type.
+
+    Each arm keeps a running count, reward sum and sum of squares, so memory
+    stays flat however much feedback arrives and every read is O(1). For
+    resources whose success rate drifts, rewards can be weighted down
+    exponentially (decay < 1, applied per feedback event of the type) or
+    limited to each arm's last ``window`` rewards.
+    """
+
+    def __init__(self, decay: float = 1.0, window: int = 0):
+        if not 0 < decay <= 1:
+            raise ValueError("decay must be in (0, 1]")
+        if window < 0:
+            raise ValueError("window must be >= 0")
+        if decay < 1 and window:
+            raise ValueError("Use either decay or window, not both")
+        self.decay = decay
+        self.window = window
+
+        self.slots: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self._allocate(64)
+
+        # Decayed values are stored multiplied by _scale (1 / decay^t), so a
+        # new reward never has to touch the other arms
+        self._scale = 1.0
+        self._total = 0.0
+        self.total_updates = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def update(self, arm_id: str, reward: float):
+        """Add one reward to an arm."""
+        row = self._row(arm_id)
+        reward = float(reward)
+
+        if self.decay < 1:
+            self._scale /= self.decay
+            if self._scale > _MAX_SCALE:
+                self._rescale()
+            weight = self._scale
+        else:
+            weight = 1.0
+
+        if self.window:
+            filled = self._filled[row]
+            head = self._head[row]
+            if filled == self.window:
+                old = self._ring[row, head]
+                self._sum[row] -= old
+                self._sum_sq[row] -= old * old
+                self._count[row] -= 1
+                self._total -= 1
+            else:
+                self._filled[row] += 1
+            self._ring[row, head] = reward
+            self._head[row] = (head + 1) % self.window
+            if self._head[row] == 0 and self._filled[row] == self.window:
+                # Drop the rounding error of repeated subtraction
+                self._sum[row] = self._ring[row].sum() - reward
+                self._sum_sq[row] = (self._ring[row] ** 2).sum() - reward * reward
+
+        self._count[row] += weight
+        self._sum[row] += weight * reward
+        self._sum_sq[row] += weight * reward * reward
+        self._updates[row] += 1
+        self._total += weight
+        self.total_updates += 1
+
+    def load(
+        self, arm_id: str, count: float, reward_sum: float, reward_sq_sum: float
+    ):
+        """
+        Add stored totals to an arm (warm start). With a window, only the
+        last ``window`` rewards count, so the totals are cut down to that
+        many rewards at their mean.
+        """
+        if count <= 0:
+            return
+        row = self._row(arm_id)
+        updates = int(count)
+        if self.window:
+            kept = min(count, self.window - self._filled[row])
+            if kept <= 0:
+                return
+            mean = reward_sum / count
+            self._ring[row, self._filled[row] : self._filled[row] + int(kept)] = mean
+            self._filled[row] += int(kept)
+            self._head[row] = self._filled[row] % self.window
+            reward_sum *= kept / count
+            reward_sq_sum *= kept / count
+            count = kept
+
+        self._count[row] += count * self._scale
+        self._sum[row] += reward_sum * self._scale
+        self._sum_sq[row] += reward_sq_sum * self._scale
+        self._updates[row] += updates
+        self._total += count * self._scale
+        self.total_updates += updates
+
+    def lookup(self, arm_ids: Iterable[str]) -> np.ndarray:
+        """Rows of arms, -1 for arms without feedback."""
+        return np.array([self.slots.get(i, -1) for i in arm_ids], dtype=int)
+
+    def counts(self, rows: np.ndarray) -> np.ndarray:
+        """Effective number of rewards per row (decayed or windowed)."""
+        rows = np.asarray(rows, dtype=int)
+        return np.where(rows >= 0, self._count[rows] / self._scale, 0.0)
+
+    def means(self, rows: np.ndarray, default: float = 0.5) -> np.ndarray:
+        """Mean reward per row; default where there is none."""
+        rows = np.asarray(rows, dtype=int)
+        count = np.where(rows >= 0, self._count[rows], 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = self._sum[rows] / count
+        return np.where(count > 0, mean, default)
+
+    def variances(self, rows: np.ndarray) -> np.ndarray:
+        """Reward variance per row; 0 where there is no reward."""
+        rows = np.asarray(rows, dtype=int)
+        count = np.where(rows >= 0, self._count[rows], 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = self._sum[rows] / count
+            variance = self._sum_sq[rows] / count - mean**2
+        return np.where(count > 0, np.maximum(variance, 0.0), 0.0)
+
+    def total_count(self) -> float:
+        """Effective number of rewards over all arms."""
+        return self._total / self._scale
+
+    def get_stats(self) -> Dict:
+        """Summary of the arms."""
+        rows = np.arange(len(self.ids))
+        seen = self.counts(rows) > 0
+        return {
+            "total_interactions": self.total_updates,
+            "unique_resources": len(self.ids),
+            "avg_reward": float(self.means(rows)[seen].mean()) if seen.any() else 0.0,
+        }
+
+    def _row(self, arm_id: str) -> int:
+        row = self.slots.get(arm_id)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self._count):
+                self._allocate(2 * row)
+            self.slots[arm_id] = row
+            self.ids.append(arm_id)
+        return row
+
+    def _rescale(self):
+        """Fold the running weight into the stored sums."""
+        for column in (self._count, self._sum, self._sum_sq):
+            column /= self._scale
+        self._total /= self._scale
+        self._scale = 1.0
+
+    def _allocate(self, rows: int):
+        """Create or grow the per-arm arrays to ``rows`` arms."""
+        for name, shape, dtype in (
+            ("_count", (rows,), float),
+            ("_sum", (rows,), float),
+            ("_sum_sq", (rows,), float),
+            ("_updates", (rows,), np.int64),
+            ("_filled", (rows,), np.int64),
+            ("_head", (rows,), np.int64),
+            ("_ring", (rows, self.window), float),
+        ):
+            grown = np.zeros(shape, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                grown[: len(old)] = old
+            setattr(self, name, grown)
 
 
 class MultiArmedBandit:
@@ -14,14 +199,50 @@ class MultiArmedBandit:
         epsilon: float = 0.1,
         epsilon_decay: float = 0.995,
         min_epsilon: float = 0.01,
+        decay: float = 1.0,
+        window: int = 0,
+        shared=None,
     ):
-        self.epsilon = epsilon
+        if shared is not None and (decay < 1 or window):
+            raise ValueError("decay and window are not supported with shared state")
+        # Arms and epsilon in a file mapped by every worker (SharedBanditFile)
+        self.shared = shared
+
+        self._epsilon = epsilon  # the shared file keeps its own (see epsilon)
         self.epsilon_decay = epsilon_decay
         self.min_epsilon = min_epsilon
 
-        # Track rewards for each resource type and ID
-        self.rewards = defaultdict(lambda: defaultdict(list))
-        self.counts = defaultdict(lambda: defaultdict(int))
+        # Reward statistics per resource type (see ArmTable)
+        self.decay = decay
+        self.window = window
+        self.tables: Dict[str, ArmTable] = {}
+
+        # Optional persistence, told about every reward (see BanditStore)
+        self.store = None
+
+    @property
+    def epsilon(self) -> float:
+        if self.shared is not None:
+            return self.shared.epsilon
+        return self._epsilon
+
+    @epsilon.setter
+    def epsilon(self, value: float):
+        if self.shared is not None:
+            self.shared.epsilon = value
+        else:
+            self._epsilon = value
+
+    def table(self, resource_type: str) -> ArmTable:
+        """Arm table of a resource type, created on first use."""
+        table = self.tables.get(resource_type)
+        if table is None:
+            if self.shared is not None:
+                table = SharedArmTable(self.shared, resource_type)
+            else:
+                table = ArmTable(self.decay, self.window)
+            self.tables[resource_type] = table
+        return table
 
     def select_action(
         self, resource_type: str, candidates: List[Dict], scores: Dict[str, float]
@@ -34,66 +255,102 @@ class MultiArmedBandit:
             return np.random.choice([c["id"] for c in candidates])
 
         # Exploitation: select based on UCB score
-        best_id = None
-        best_ucb = -float("inf")
-
-        total_counts = sum(self.counts[resource_type].values())
-
-        for candidate in candidates:
-            resource_id = candidate["id"]
-            base_score = scores.get(resource_id, 0.0)
+        ids = [c["id"] for c in candidates]
+        base_scores = np.array([scores.get(i, 0.0) for i in ids])
+        return ids[int(np.argmax(self.ucb_values(resource_type, ids, base_scores)))]
 
-            # Calculate UCB bonus
-            count = self.counts[resource_type][resource_id]
-            if count == 0:
-                ucb_bonus = 1.0  # High bonus for unexplored options
-            else:
-                ucb_bonus = np.sqrt(2 * np.log(total_counts + 1) / count)
+    def select_slate(
+        self, resource_type: str, ids: List[str], base_scores: np.ndarray, k: int
+    ) -> List[int]:
+        """
+        Fill k positions at once with cascading UCB: candidates ordered by
+        the upper confidence bound of their acceptance rate, best first.
+        The base score is a prior worth SLATE_PRIOR_WEIGHT rewards, blended
+        with the observed mean, so resources with and without feedback are
+        ranked on the same scale.
 
-            ucb_score = base_score + ucb_bonus
+        Returns:
+            Indices into ids
+        """
+        table = self.table(resource_type)
+        rows = table.lookup(ids)
+        counts = table.counts(rows)
+        weight = counts + SLATE_PRIOR_WEIGHT
+        estimate = (
+            SLATE_PRIOR_WEIGHT * np.asarray(base_scores, dtype=float)
+            + counts * table.means(rows)
+        ) / weight
+        bonus = np.sqrt(1.5 * np.log(table.total_count() + 1) / weight)
+        return np.argsort(-(estimate + bonus), kind="stable")[:k].tolist()
 
-            if ucb_score > best_ucb:
-                best_ucb = ucb_score
-                best_id = resource_id
+    def ucb_values(
+        self, resource_type: str, ids: List[str], base_scores: np.ndarray
+    ) -> np.ndarray:
+        """Base score plus UCB exploration bonus for each candidate."""
+        table = self.table(resource_type)
+        counts = table.counts(table.lookup(ids))
 
-        return best_id
+        # High bonus for unexplored options
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ucb_bonus = np.where(
+                counts > 0,
+                np.sqrt(2 * np.log(table.total_count() + 1) / counts),
+                1.0,
+            )
+        return np.asarray(base_scores, dtype=float) + ucb_bonus
 
     def update(self, resource_type: str, resource_id: str, reward: float):
         """
         Update the bandit with feedback from a placement.
         """
-        self.rewards[resource_type][resource_id].append(reward)
-        self.counts[resource_type][resource_id] += 1
+        self.table(resource_type).update(resource_id, reward)
+        if self.store is not None:
+            self.store.record(resource_type, resource_id, reward)
 
         # Decay epsilon for less exploration over time
-        self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
+        if self.shared is not None:
+            self.shared.decay_epsilon(self.epsilon_decay, self.min_epsilon)
+        else:
+            self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
+
+    def load_arms(self, rows: Iterable[Tuple[str, str, float, float, float]]):
+        """
+        Warm start from stored (resource_type, resource_id, count, reward_sum,
+        reward_sq_sum) totals. Epsilon is decayed as if the rewards had
+        arrived one by one.
+        """
+        total = 0
+        for resource_type, resource_id, count, reward_sum, reward_sq_sum in rows:
+            self.table(resource_type).load(
+                resource_id, count, reward_sum, reward_sq_sum
+            )
+            total += count
+        self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay**total)
+
+    def get_count(self, resource_type: str, resource_id: str) -> float:
+        """
+        Get the (effective) number of rewards seen for a resource.
+        """
+        table = self.table(resource_type)
+        return float(table.counts(table.lookup([resource_id]))[0])
 
     def get_average_reward(self, resource_type: str, resource_id: str) -> float:
         """
         Get historical success rate for a resource.
         """
-        rewards_list = self.rewards[resource_type].get(resource_id, [])
-        if not rewards_list:
-            return 0.5  # Neutral default for cold start
-        return np.mean(rewards_list)
+        # Neutral default of 0.5 for cold start
+        table = self.table(resource_type)
+        return float(table.means(table.lookup([resource_id]), default=0.5)[0])
 
     def get_stats(self) -> Dict:
         """
         Get statistics about the bandit's learning.
         """
-        stats = {}
-        for resource_type in self.rewards:
-            stats[resource_type] = {
-                "total_interactions": sum(self.counts[resource_type].values()),
-                "unique_resources": len(self.counts[resource_type]),
-                "avg_reward": np.mean(
-                    [
-                        np.mean(rewards)
-                        for rewards in self.rewards[resource_type].values()
-                        if rewards
-                    ]
-                )
-                if self.rewards[resource_type]
-                else 0.0,
-            }
-        return stats
+        if self.shared is not None:
+            # Include types only other workers have touched so far
+            for resource_type in self.shared.resource_types():
+                self.table(resource_type)
+        return {
+            resource_type: table.get_stats()
+            for resource_type, table in self.tables.items()
+        }
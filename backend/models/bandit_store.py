@@ -0,0 +1,158 @@
+"""
+SQLite persistence for bandit arm statistics.
+
+Feedback is accumulated in memory as per-arm deltas (count, reward sum, sum
+of squares) and written by a background thread every few seconds, so
+``/api/v1/feedback`` never waits on the database. Writes add to the stored
+totals, which lets several worker processes share one table; at startup
+each worker loads the merged totals (warm start). A crash loses at most
+the feedback of one flush interval.
+"""
+
+import atexit
+import sqlite3
+import threading
+import time
+from typing import Dict, Tuple
+
+ArmKey = Tuple[str, str]  # (resource_type, resource_id)
+
+
+class BanditStore:
+    """Write-behind store of bandit arms in a ``bandit_arms`` table."""
+
+    def __init__(
+        self, db_path: str, flush_seconds: float = 5.0, flush_every: int = 1000
+    ):
+        self.db_path = db_path
+        self.flush_seconds = flush_seconds
+        self.flush_every = flush_every  # Pending arms that trigger an early flush
+
+        self._pending: Dict[ArmKey, list] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.arms_loaded = 0
+
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bandit_arms (
+                resource_type TEXT NOT NULL,
+                resource_id TEXT NOT NULL,
+                reward_count INTEGER NOT NULL,
+                reward_sum REAL NOT NULL,
+                reward_sq_sum REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (resource_type, resource_id)
+            )
+        """)
+        self._conn.commit()
+
+        self._flusher = threading.Thread(
+            target=self._run, name="bandit-store-flusher", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def load(self, bandit) -> int:
+        """Warm-start a MultiArmedBandit from the stored totals."""
+        with self._write_lock:
+            rows = self._conn.execute("""
+                SELECT resource_type, resource_id, reward_count, reward_sum,
+                       reward_sq_sum
+                FROM bandit_arms
+            """).fetchall()
+        bandit.load_arms(rows)
+        self.arms_loaded = len(rows)
+        return len(rows)
+
+    def record(self, resource_type: str, resource_id: str, reward: float):
+        """Queue one reward for the next flush."""
+        reward = float(reward)
+        with self._lock:
+            delta = self._pending.get((resource_type, resource_id))
+            if delta is None:
+                delta = self._pending[(resource_type, resource_id)] = [0, 0.0, 0.0]
+            delta[0] += 1
+            delta[1] += reward
+            delta[2] += reward * reward
+            if len(self._pending) >= self.flush_every:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """Add pending deltas to the table in one transaction."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            now = time.time()
+            try:
+                self._conn.executemany(
+                    """
+                    INSERT INTO bandit_arms
+                    (resource_type, resource_id, reward_count, reward_sum,
+                     reward_sq_sum, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (resource_type, resource_id) DO UPDATE SET
+                        reward_count = reward_count + excluded.reward_count,
+                        reward_sum = reward_sum + excluded.reward_sum,
+                        reward_sq_sum = reward_sq_sum + excluded.reward_sq_sum,
+                        updated_at = excluded.updated_at
+                """,
+                    [key + tuple(delta) + (now,) for key, delta in pending.items()],
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                # Keep the deltas for the next attempt
+                self._conn.rollback()
+                self._requeue(pending)
+                raise
+
+            self.flushes += 1
+            self.rows_written += len(pending)
+            return len(pending)
+
+    def close(self):
+        """Stop the flusher and write what is pending."""
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wake.set()
+        self._flusher.join(timeout=self.flush_seconds + 5)
+        self.flush()
+        self._conn.close()
+
+    def get_stats(self) -> Dict:
+        """Get persistence counters."""
+        return {
+            "db_path": self.db_path,
+            "arms_loaded": self.arms_loaded,
+            "pending_arms": len(self._pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
+    def _requeue(self, pending: Dict[ArmKey, list]):
+        with self._lock:
+            for key, delta in pending.items():
+                current = self._pending.setdefault(key, [0, 0.0, 0.0])
+                for i in range(3):
+                    current[i] += delta[i]
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if self._stopped:
+                break
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Database busy or unavailable; retried next interval
+                pass
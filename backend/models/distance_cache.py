@@ -0,0 +1,295 @@
+"""
+Bounded LRU/TTL cache for pairwise distances and travel-time estimates.
+
+Keys are rounded coordinates plus a transport mode. An optional SQLite
+tier keeps entries across worker restarts: it is loaded at startup,
+consulted on single-pair memory misses, and written in batches. Distance
+matrices are looked up and stored as whole blocks (get_many/set_many).
+"""
+
+import atexit
+import sqlite3
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CacheKey = Tuple[float, float, float, float, str]
+CacheValue = Tuple[float, Optional[float]]  # (distance_km, travel_minutes)
+
+
+class DistanceCache:
+    """
+    LRU cache of (distance_km, travel_minutes) keyed by origin, destination
+    and transport mode.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        ttl_seconds: float = 86_400,
+        db_path: Optional[str] = None,
+        precision: int = 5,
+        flush_every: int = 500,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision  # 5 decimals is about 1 m
+        self.flush_every = flush_every
+
+        self._entries: "OrderedDict[CacheKey, Tuple[CacheValue, float]]" = (
+            OrderedDict()
+        )
+        self._pending: Dict[CacheKey, Tuple[CacheValue, float]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._init_persistent_tier()
+            atexit.register(self.flush)
+
+    def make_key(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        mode: str,
+    ) -> CacheKey:
+        """Build a cache key from rounded coordinates and transport mode."""
+        p = self.precision
+        return (
+            round(float(origin[0]), p),
+            round(float(origin[1]), p),
+            round(float(destination[0]), p),
+            round(float(destination[1]), p),
+            mode,
+        )
+
+    def get(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        mode: str,
+    ) -> Optional[CacheValue]:
+        """Look up a cached (distance_km, travel_minutes) pair."""
+        key = self.make_key(origin, destination, mode)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            if entry is not None:
+                del self._entries[key]
+
+            value = self._load_persistent(key, now)
+            if value is not None:
+                self._store(key, value[0], value[1])
+                self.hits += 1
+                self.persistent_hits += 1
+                return value[0]
+
+            self.misses += 1
+            return None
+
+    def set(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        mode: str,
+        distance_km: float,
+        travel_minutes: Optional[float] = None,
+    ):
+        """Store a distance (and optional travel time) for a pair."""
+        key = self.make_key(origin, destination, mode)
+        value = (float(distance_km), travel_minutes)
+        created = time.time()
+
+        with self._lock:
+            self._store(key, value, created)
+            if self._conn is not None:
+                self._pending[key] = (value, created)
+                if len(self._pending) >= self.flush_every:
+                    self._flush_locked()
+
+    def get_many(
+        self,
+        origins: Sequence[Tuple[float, float]],
+        destinations: Sequence[Tuple[float, float]],
+        mode: str,
+    ) -> np.ndarray:
+        """
+        Cached distances for every origin x destination pair, NaN where
+        missing. Only the in-memory tier is read (it is warm-started from
+        the persistent one), so a block lookup never waits on SQLite.
+        """
+        keys = self._block_keys(origins, destinations, mode)
+        now = time.time()
+        distances = np.full(len(keys), np.nan)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and now - entry[1] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    distances[i] = entry[0][0]
+            found = int(np.count_nonzero(~np.isnan(distances)))
+            self.hits += found
+            self.misses += len(keys) - found
+
+        return distances.reshape(len(origins), len(destinations))
+
+    def set_many(
+        self,
+        origins: Sequence[Tuple[float, float]],
+        destinations: Sequence[Tuple[float, float]],
+        mode: str,
+        distances_km: np.ndarray,
+        travel_minutes: Optional[np.ndarray] = None,
+    ):
+        """Store an origin x destination block of distances (and times)."""
+        keys = self._block_keys(origins, destinations, mode)
+        distances = np.asarray(distances_km, dtype=float).ravel().tolist()
+        minutes = (
+            [None] * len(keys)
+            if travel_minutes is None
+            else np.asarray(travel_minutes, dtype=float).ravel().tolist()
+        )
+        created = time.time()
+
+        with self._lock:
+            for key, distance, minute in zip(keys, distances, minutes):
+                value = (distance, minute)
+                self._store(key, value, created)
+                if self._conn is not None:
+                    self._pending[key] = (value, created)
+            if self._conn is not None and len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        """Write pending entries to the persistent tier."""
+        with self._lock:
+            self._flush_locked()
+
+    def clear(self):
+        """Drop all in-memory entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.persistent_hits = 0
+
+    def get_stats(self) -> Dict:
+        """Get cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._conn is not None,
+            "pending_writes": len(self._pending),
+        }
+
+    def _block_keys(
+        self,
+        origins: Sequence[Tuple[float, float]],
+        destinations: Sequence[Tuple[float, float]],
+        mode: str,
+    ) -> List[CacheKey]:
+        """Keys of an origin x destination block, row by row (see make_key)."""
+        p = self.precision
+        a_keys = [(round(float(lat), p), round(float(lon), p)) for lat, lon in origins]
+        b_keys = [
+            (round(float(lat), p), round(float(lon), p)) for lat, lon in destinations
+        ]
+        return [o + d + (mode,) for o in a_keys for d in b_keys]
+
+    def _store(self, key: CacheKey, value: CacheValue, created: float):
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Persistent tier
+    # ------------------------------------------------------------------
+
+    def _init_persistent_tier(self):
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS route_distance_cache (
+                origin_lat REAL NOT NULL,
+                origin_lon REAL NOT NULL,
+                dest_lat REAL NOT NULL,
+                dest_lon REAL NOT NULL,
+                mode TEXT NOT NULL,
+                distance_km REAL NOT NULL,
+                travel_minutes REAL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (origin_lat, origin_lon, dest_lat, dest_lon, mode)
+            )
+        """)
+        self._conn.execute(
+            "DELETE FROM route_distance_cache WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,),
+        )
+        self._conn.commit()
+
+        # Warm start with the most recent entries
+        rows = self._conn.execute(
+            """
+            SELECT origin_lat, origin_lon, dest_lat, dest_lon, mode,
+                   distance_km, travel_minutes, created_at
+            FROM route_distance_cache ORDER BY created_at DESC LIMIT ?
+        """,
+            (self.max_entries,),
+        ).fetchall()
+        for row in reversed(rows):
+            self._entries[tuple(row[:5])] = ((row[5], row[6]), row[7])
+
+    def _load_persistent(self, key: CacheKey, now: float) -> Optional[Tuple]:
+        if self._conn is None:
+            return None
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return pending
+
+        row = self._conn.execute(
+            """
+            SELECT distance_km, travel_minutes, created_at FROM route_distance_cache
+            WHERE origin_lat = ? AND origin_lon = ? AND dest_lat = ? AND dest_lon = ?
+              AND mode = ?
+        """,
+            key,
+        ).fetchone()
+        if row is None or now - row[2] > self.ttl_seconds:
+            return None
+        return (row[0], row[1]), row[2]
+
+    def _flush_locked(self):
+        if self._conn is None or not self._pending:
+            return
+
+        self._conn.executemany(
+            """
+            INSERT OR REPLACE INTO route_distance_cache
+            (origin_lat, origin_lon, dest_lat, dest_lon, mode,
+             distance_km, travel_minutes, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            [
+                key + (value[0], value[1], created)
+                for key, (value, created) in self._pending.items()
+            ],
+        )
+        self._conn.commit()
+        self._pending.clear()
@@ -0,0 +1,61 @@
+"""Vectorized great-circle distance helpers shared by the routing models."""
+
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def coords_array(points: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Convert a sequence of (lat, lon) pairs into an (N, 2) float array."""
+    arr = np.asarray(points, dtype=float)
+    if arr.size == 0:
+        return np.empty((0, 2), dtype=float)
+    return arr.reshape(-1, 2)
+
+
+def haversine_matrix(
+    points_a: Sequence[Tuple[float, float]],
+    points_b: Optional[Sequence[Tuple[float, float]]] = None,
+) -> np.ndarray:
+    """
+    Calculate the N×M matrix of Haversine distances (km) between two point sets.
+
+    Args:
+        points_a: N (lat, lon) pairs or an (N, 2) array
+        points_b: M (lat, lon) pairs; defaults to points_a (square matrix)
+
+    Returns:
+        (N, M) array where entry [i, j] is the distance from a[i] to b[j]
+    """
+    a = np.radians(coords_array(points_a))
+    b = a if points_b is None else np.radians(coords_array(points_b))
+
+    lat1 = a[:, 0][:, None]
+    lat2 = b[:, 0][None, :]
+    dlat = lat2 - lat1
+    dlon = b[:, 1][None, :] - a[:, 1][:, None]
+
+    h = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    )
+    np.clip(h, 0.0, 1.0, out=h)
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+
+def haversine_paired(
+    points_a: Sequence[Tuple[float, float]], points_b: Sequence[Tuple[float, float]]
+) -> np.ndarray:
+    """Calculate element-wise Haversine distances (km) between a[i] and b[i]."""
+    a = np.radians(coords_array(points_a))
+    b = np.radians(coords_array(points_b))
+
+    dlat = b[:, 0] - a[:, 0]
+    dlon = b[:, 1] - a[:, 1]
+
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[:, 0]) * np.cos(b[:, 0]) * np.sin(dlon / 2) ** 2
+    np.clip(h, 0.0, 1.0, out=h)
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
@@ -0,0 +1,329 @@
+"""
+Isochrones (areas reachable within a travel-time budget) for service
+locations.
+
+Each location and mode gets a travel-time raster: minutes from the
+location to the centre of every cell in a square grid around it (outbound,
+for isochrones), or from every cell to the location (inbound, for
+accessibility: can an individual there reach the service). The two differ
+on one-way roads and transit timetables. One raster covers every budget up
+to its extent, so a 15-minute and a 30-minute isochrone of the same shelter
+share it. Rasters are cached per location id.
+A location whose coordinates change drops its cached rasters on the next
+lookup, and rasters can also be invalidated explicitly.
+"""
+
+import base64
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from models.distance_matrix import coords_array
+
+KM_PER_DEGREE_LAT = 111.0
+
+# Rasters cover at least this many minutes so most budgets share one raster
+MIN_EXTENT_MINUTES = 60
+
+# Cells per raster; the cell size grows for large extents (driving)
+MAX_RASTER_CELLS = 250_000
+
+# Transit rasters are computed for departures rounded down to this step
+DEPARTURE_BUCKET_MINUTES = 15
+
+# (location, points, mode, time, inbound) -> minutes per point; time is the
+# departure from the location (outbound) or the arrival deadline at it
+# (inbound, public transport only)
+TravelMinutesFn = Callable[
+    [Tuple[float, float], np.ndarray, str, Optional[datetime], bool], np.ndarray
+]
+
+
+@dataclass
+class TravelTimeRaster:
+    """Minutes from an origin to the centres of a grid of cells (or back)."""
+
+    origin: Tuple[float, float]
+    lat_step: float
+    lon_step: float
+    minutes: np.ndarray  # (2 * half + 1, 2 * half + 1), inf if unreachable
+    extent_minutes: float
+    mode: str
+    departure: Optional[datetime] = None
+    inbound: bool = False
+
+    @property
+    def half(self) -> int:
+        return self.minutes.shape[0] // 2
+
+    @property
+    def min_lat(self) -> float:
+        return self.origin[0] - (self.half + 0.5) * self.lat_step
+
+    @property
+    def min_lon(self) -> float:
+        return self.origin[1] - (self.half + 0.5) * self.lon_step
+
+    def sample(self, points: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """Minutes at the cells containing each point (inf outside)."""
+        points = coords_array(points)
+        rows = np.floor((points[:, 0] - self.min_lat) / self.lat_step).astype(int)
+        cols = np.floor((points[:, 1] - self.min_lon) / self.lon_step).astype(int)
+        size = self.minutes.shape[0]
+        inside = (rows >= 0) & (rows < size) & (cols >= 0) & (cols < size)
+        result = np.full(len(points), np.inf)
+        result[inside] = self.minutes[rows[inside], cols[inside]]
+        return result
+
+    def mask(self, minutes: float) -> np.ndarray:
+        """Boolean raster of cells reachable within a budget."""
+        return self.minutes <= minutes
+
+
+class IsochroneCache:
+    """
+    LRU cache of travel-time rasters keyed by location, mode, cell size,
+    departure bucket and direction.
+    """
+
+    def __init__(
+        self,
+        travel_minutes: TravelMinutesFn,
+        speeds_kmh: Dict[str, float],
+        max_entries: int = 256,
+        cell_km: float = 0.25,
+    ):
+        self.travel_minutes = travel_minutes
+        self.speeds_kmh = speeds_kmh
+        self.max_entries = max_entries
+        self.cell_km = cell_km
+
+        self._rasters: "OrderedDict[Tuple, TravelTimeRaster]" = OrderedDict()
+        self._fingerprints: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_raster(
+        self,
+        location: Dict,
+        mode: str,
+        minutes: float,
+        departure: Optional[datetime] = None,
+        cell_km: Optional[float] = None,
+        inbound: bool = False,
+    ) -> TravelTimeRaster:
+        """
+        Get (computing if needed) a raster covering a travel-time budget,
+        from the location or, with inbound, to it.
+        """
+        origin = (float(location["lat"]), float(location["lon"]))
+        location_id = str(location.get("id") or f"{origin[0]:.6f},{origin[1]:.6f}")
+        cell_km = cell_km or self.cell_km
+        if mode == "public_transport":
+            departure = self._departure_bucket(departure or datetime.now())
+        else:
+            departure = None
+        extent = max(float(minutes), MIN_EXTENT_MINUTES)
+
+        with self._lock:
+            if self._fingerprints.get(location_id, origin) != origin:
+                self._invalidate_locked([location_id])
+            self._fingerprints[location_id] = origin
+
+            prefix = (location_id, mode, cell_km, departure, inbound)
+            for key, raster in self._rasters.items():
+                if key[:5] == prefix and raster.extent_minutes >= minutes:
+                    self._rasters.move_to_end(key)
+                    self.hits += 1
+                    return raster
+            self.misses += 1
+
+        raster = self._compute(origin, mode, extent, departure, cell_km, inbound)
+
+        with self._lock:
+            self._rasters[prefix + (extent,)] = raster
+            while len(self._rasters) > self.max_entries:
+                self._rasters.popitem(last=False)
+        return raster
+
+    def travel_minutes_to(
+        self,
+        locations: List[Dict],
+        points: Sequence[Tuple[float, float]],
+        mode: str,
+        minutes: float,
+        departure: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """
+        (points × locations) minutes from each point to each location, from
+        the locations' cached inbound rasters; inf where a point lies outside
+        the raster.
+        """
+        points = coords_array(points)
+        result = np.full((len(points), len(locations)), np.inf)
+        for j, location in enumerate(locations):
+            raster = self.get_raster(location, mode, minutes, departure, inbound=True)
+            result[:, j] = raster.sample(points)
+        return result
+
+    def isochrone(
+        self,
+        location: Dict,
+        mode: str,
+        minutes: float,
+        departure: Optional[datetime] = None,
+        cell_km: Optional[float] = None,
+        output: str = "polygon",
+    ) -> Dict:
+        """
+        Isochrone of a location as a GeoJSON polygon and/or a raster mask.
+
+        Args:
+            location: Dict with id, lat, lon
+            mode: Transport mode
+            minutes: Travel-time budget
+            departure: Departure time (public transport only; default now)
+            cell_km: Raster cell size in km
+            output: "polygon", "raster" or "both"
+
+        Returns:
+            Isochrone summary with the requested geometry
+        """
+        raster = self.get_raster(location, mode, minutes, departure, cell_km)
+        mask = raster.mask(minutes)
+        cell_area = (raster.lat_step * KM_PER_DEGREE_LAT) * (
+            raster.lon_step
+            * KM_PER_DEGREE_LAT
+            * np.cos(np.radians(raster.origin[0]))
+        )
+
+        result = {
+            "location_id": location.get("id"),
+            "mode": mode,
+            "minutes": minutes,
+            "departure": raster.departure.isoformat() if raster.departure else None,
+            "reachable_cells": int(mask.sum()),
+            "area_km2": round(float(mask.sum() * cell_area), 3),
+        }
+        if output in ("polygon", "both"):
+            result["polygon"] = self._mask_polygon(raster, mask)
+        if output in ("raster", "both"):
+            result["raster"] = {
+                "shape": list(mask.shape),
+                "origin": {"lat": raster.min_lat, "lon": raster.min_lon},
+                "cell_size_deg": {"lat": raster.lat_step, "lon": raster.lon_step},
+                "encoding": "bit-packed row-major (numpy packbits), 1 = reachable",
+                "mask": base64.b64encode(np.packbits(mask).tobytes()).decode("ascii"),
+            }
+        return result
+
+    def invalidate(self, location_ids: Optional[List[str]] = None) -> int:
+        """Drop cached rasters for some locations (all if None)."""
+        with self._lock:
+            if location_ids is None:
+                removed = len(self._rasters)
+                self._rasters.clear()
+                self._fingerprints.clear()
+                self.invalidations += removed
+                return removed
+            return self._invalidate_locked([str(i) for i in location_ids])
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._rasters),
+                "max_entries": self.max_entries,
+                "locations": len({key[0] for key in self._rasters}),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def _invalidate_locked(self, location_ids: List[str]) -> int:
+        ids = set(location_ids)
+        stale = [key for key in self._rasters if key[0] in ids]
+        for key in stale:
+            del self._rasters[key]
+        for location_id in ids:
+            self._fingerprints.pop(location_id, None)
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def _compute(
+        self,
+        origin: Tuple[float, float],
+        mode: str,
+        extent_minutes: float,
+        departure: Optional[datetime],
+        cell_km: float,
+        inbound: bool = False,
+    ) -> TravelTimeRaster:
+        """Travel minutes from the origin to every cell within reach (or back)."""
+        reach_km = extent_minutes / 60 * self.speeds_kmh.get(mode, 25)
+        half = int(np.ceil(reach_km / cell_km))
+        max_half = int((np.sqrt(MAX_RASTER_CELLS) - 1) // 2)
+        if half > max_half:
+            cell_km = reach_km / max_half
+            half = max_half
+
+        lat_step = cell_km / KM_PER_DEGREE_LAT
+        lon_step = lat_step / max(np.cos(np.radians(origin[0])), 1e-6)
+        offsets = np.arange(-half, half + 1)
+        lat_grid, lon_grid = np.meshgrid(
+            origin[0] + offsets * lat_step,
+            origin[1] + offsets * lon_step,
+            indexing="ij",
+        )
+        cells = np.column_stack([lat_grid.ravel(), lon_grid.ravel()])
+
+        # Inbound transit rasters are arrive-by: minutes needed to reach the
+        # location by the end of the extent, leaving as late as possible
+        when = departure
+        if inbound and departure is not None:
+            when = departure + timedelta(minutes=extent_minutes)
+        minutes = np.asarray(
+            self.travel_minutes(origin, cells, mode, when, inbound), dtype=float
+        )
+        minutes[minutes > extent_minutes] = np.inf
+
+        return TravelTimeRaster(
+            origin=origin,
+            lat_step=lat_step,
+            lon_step=lon_step,
+            minutes=minutes.reshape(lat_grid.shape).astype(np.float32),
+            extent_minutes=extent_minutes,
+            mode=mode,
+            departure=departure,
+            inbound=inbound,
+        )
+
+    @staticmethod
+    def _departure_bucket(departure: datetime) -> datetime:
+        minute = departure.minute - departure.minute % DEPARTURE_BUCKET_MINUTES
+        return departure.replace(minute=minute, second=0, microsecond=0)
+
+    @staticmethod
+    def _mask_polygon(raster: TravelTimeRaster, mask: np.ndarray) -> Dict:
+        """GeoJSON MultiPolygon with one rectangle per run of reachable cells."""
+        polygons = []
+        padded = np.pad(mask.astype(np.int8), ((0, 0), (1, 1)))
+        edges = np.diff(padded, axis=1)
+        for row in np.flatnonzero(mask.any(axis=1)):
+            starts = np.flatnonzero(edges[row] == 1)
+            ends = np.flatnonzero(edges[row] == -1)
+            lat0 = raster.min_lat + row * raster.lat_step
+            lat1 = lat0 + raster.lat_step
+            for start, end in zip(starts, ends):
+                lon0 = raster.min_lon + start * raster.lon_step
+                lon1 = raster.min_lon + end * raster.lon_step
+                ring = [[lon0, lat0], [lon1, lat0], [lon1, lat1], [lon0, lat1]]
+                polygons.append([ring + [ring[0]]])
+        return {"type": "MultiPolygon", "coordinates": polygons}
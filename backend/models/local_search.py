@@ -0,0 +1,271 @@
+"""
+Local search moves for open-path routes over a precomputed distance matrix.
+
+Paths are lists of matrix indices whose first element is the fixed start
+node. Moves are evaluated from the edges they change only and applied in
+place. Distances are assumed symmetric, so reversing a segment does not
+change its internal length; directed matrices (one-way roads) are searched
+through symmetric() and the resulting path costed on the directed matrix.
+
+All moves accept an optional ``deadline`` (a time.perf_counter() value);
+when it passes they stop and leave the best path found so far.
+"""
+
+import time
+import numpy as np
+from typing import Iterator, List, Optional, Sequence
+
+IMPROVEMENT_EPS = 1e-9
+
+
+def nearest_neighbors(dist: np.ndarray, k: int) -> List[List[int]]:
+    """
+    Build k-nearest-neighbor candidate lists for every node.
+
+    Args:
+        dist: (N, N) distance matrix
+        k: Number of neighbors to keep per node
+
+    Returns:
+        For each node, up to k other node indices sorted by distance
+    """
+    n = len(dist)
+    k = min(k, n - 1)
+    if k <= 0:
+        return [[] for _ in range(n)]
+
+    masked = np.array(dist, dtype=float, copy=True)
+    np.fill_diagonal(masked, np.inf)
+
+    candidates = np.argpartition(masked, k - 1, axis=1)[:, :k]
+    rows = np.arange(n)[:, None]
+    order = np.argsort(masked[rows, candidates], axis=1)
+
+    return candidates[rows, order].tolist()
+
+
+def symmetric(dist: np.ndarray) -> np.ndarray:
+    """
+    The matrix itself if it is symmetric, else the mean of both directions,
+    so that the move deltas below stay exact.
+    """
+    dist = np.asarray(dist, dtype=float)
+    if np.array_equal(dist, dist.T):
+        return dist
+    return (dist + dist.T) / 2
+
+
+def path_length(path: Sequence[int], d: Sequence[Sequence[float]]) -> float:
+    """Calculate the length of an open path."""
+    return sum(d[a][b] for a, b in zip(path, path[1:]))
+
+
+def two_opt(
+    path: List[int],
+    d: Sequence[Sequence[float]],
+    neighbors: Sequence[Sequence[int]],
+    max_iterations: int = 100,
+    deadline: Optional[float] = None,
+) -> bool:
+    """
+    Improve an open path in place with neighbor-list 2-opt.
+
+    Each candidate move reverses path[x+1..y] and is scored from the two
+    edges it removes and the two it adds.
+
+    Returns:
+        True if the path was improved
+    """
+    n = len(path)
+    if n < 4:
+        return False
+
+    pos = {node: i for i, node in enumerate(path)}
+    improved_any = False
+
+    for _ in range(max_iterations):
+        improved = False
+
+        for i in range(n):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return improved_any or improved
+            a = path[i]
+
+            # A move can only gain if the new edge (a, c) is shorter than
+            # one of the edges currently attached to a
+            limit = max(
+                d[a][path[i + 1]] if i + 1 < n else 0.0,
+                d[a][path[i - 1]] if i > 0 else 0.0,
+            )
+
+            for c in neighbors[a]:
+                if d[a][c] >= limit:
+                    break
+                j = pos.get(c)
+                if j is None or j == 0:
+                    continue
+
+                # Successor form: new edge (a, c) replaces (a, succ(a))
+                # Predecessor form: new edge (a, c) replaces (pred(a), a)
+                applied = False
+                for x, y in (
+                    (min(i, j), max(i, j)),
+                    (min(i, j) - 1, max(i, j) - 1),
+                ):
+                    if x < 0 or y - x < 2:
+                        continue
+
+                    p_x, p_x1, p_y = path[x], path[x + 1], path[y]
+                    delta = d[p_x][p_y] - d[p_x][p_x1]
+                    if y + 1 < n:
+                        p_y1 = path[y + 1]
+                        delta += d[p_x1][p_y1] - d[p_y][p_y1]
+
+                    if delta < -IMPROVEMENT_EPS:
+                        path[x + 1 : y + 1] = path[x + 1 : y + 1][::-1]
+                        for k in range(x + 1, y + 1):
+                            pos[path[k]] = k
+                        applied = True
+                        break
+
+                if applied:
+                    improved = True
+                    break
+
+        if not improved:
+            break
+        improved_any = True
+
+    return improved_any
+
+
+def or_opt(
+    path: List[int],
+    d: Sequence[Sequence[float]],
+    neighbors: Sequence[Sequence[int]],
+    max_segment: int = 3,
+    max_iterations: int = 100,
+    deadline: Optional[float] = None,
+    reverse: bool = True,
+) -> bool:
+    """
+    Improve an open path in place by relocating segments of 1..max_segment
+    stops next to one of their nearest neighbors (optionally reversed).
+    At most max_iterations moves are applied. Without reverse, segments keep
+    their direction and the moves are exact on directed distances too.
+
+    Returns:
+        True if the path was improved
+    """
+    improved_any = False
+
+    for _ in range(max_iterations):
+        improved = False
+        n = len(path)
+        pos = {node: i for i, node in enumerate(path)}
+
+        for length in range(1, max_segment + 1):
+            for i in range(1, n - length + 1):
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return improved_any
+                s0, s1 = path[i], path[i + length - 1]
+                orientations = ((s0, s1), (s1, s0)) if reverse else ((s0, s1),)
+                prev = path[i - 1]
+                nxt = path[i + length] if i + length < n else None
+
+                removal_gain = d[prev][s0]
+                if nxt is not None:
+                    removal_gain += d[s1][nxt] - d[prev][nxt]
+                if removal_gain <= IMPROVEMENT_EPS:
+                    continue
+
+                best = None
+                for end in (s0, s1):
+                    for c in neighbors[end]:
+                        if d[end][c] >= removal_gain:
+                            break
+                        j = pos.get(c)
+                        if j is None or i <= j < i + length:
+                            continue
+
+                        # Insert between (c, succ(c)) or (pred(c), c)
+                        for u_idx in (j, j - 1):
+                            if u_idx < 0 or i - 1 <= u_idx < i + length:
+                                continue
+                            u = path[u_idx]
+                            v = path[u_idx + 1] if u_idx + 1 < n else None
+
+                            for first, last in orientations:
+                                added = d[u][first]
+                                if v is not None:
+                                    added += d[last][v] - d[u][v]
+                                delta = added - removal_gain
+                                if delta < -IMPROVEMENT_EPS and (
+                                    best is None or delta < best[0]
+                                ):
+                                    best = (delta, u, first != s0)
+
+                if best is not None:
+                    _, u, flip = best
+                    segment = path[i : i + length]
+                    if flip:
+                        segment.reverse()
+                    del path[i : i + length]
+                    insert_at = path.index(u) + 1
+                    path[insert_at:insert_at] = segment
+                    improved = True
+                    improved_any = True
+                    break
+
+            if improved:
+                break
+
+        if not improved:
+            break
+
+    return improved_any
+
+
+def iter_improve_path(
+    path: List[int],
+    d: Sequence[Sequence[float]],
+    neighbors: Sequence[Sequence[int]],
+    max_iterations: int = 100,
+    deadline: Optional[float] = None,
+) -> Iterator[List[int]]:
+    """
+    Run 2-opt and Or-opt alternately, yielding the path after every round
+    that shortened it, until neither improves it or the deadline passes.
+
+    The same list is yielded each time and modified in place; copy it to
+    keep a snapshot.
+    """
+    for _ in range(max_iterations):
+        changed = two_opt(path, d, neighbors, max_iterations, deadline)
+        changed = (
+            or_opt(path, d, neighbors, max_iterations=max_iterations, deadline=deadline)
+            or changed
+        )
+        if not changed:
+            break
+        yield path
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+
+
+def improve_path(
+    path: List[int],
+    d: Sequence[Sequence[float]],
+    neighbors: Sequence[Sequence[int]],
+    max_iterations: int = 100,
+    deadline: Optional[float] = None,
+) -> List[int]:
+    """
+    Run 2-opt and Or-opt alternately until neither improves the path.
+
+    Returns:
+        The improved path (the input list is modified in place)
+    """
+    for _ in iter_improve_path(path, d, neighbors, max_iterations, deadline):
+        pass
+    return path
@@ -0,0 +1,105 @@
+"""
+Structure-of-arrays storage for route optimization locations.
+
+Solvers address locations by integer index into NumPy columns (coordinates,
+wait time, accessibility) instead of holding one object per location.
+Location objects are only built for the locations that appear in a
+response.
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class Location:
+    """Represents a location with coordinates and metadata."""
+
+    id: str
+    name: str
+    lat: float
+    lon: float
+    type: str  # 'shelter', 'job', 'medical', 'individual', etc.
+    hours: Optional[Dict] = None
+    wait_time_avg: int = 0  # minutes
+    accessibility_score: float = 0.0
+
+
+class LocationStore:
+    """Column store of locations addressed by integer index."""
+
+    __slots__ = (
+        "ids",
+        "names",
+        "types",
+        "hours",
+        "coords",
+        "wait_time",
+        "accessibility",
+        "_index",
+    )
+
+    def __init__(
+        self,
+        ids: List[str],
+        names: List[str],
+        types: List[str],
+        hours: List[Optional[Dict]],
+        coords: np.ndarray,
+        wait_time: np.ndarray,
+        accessibility: np.ndarray,
+    ):
+        self.ids = ids
+        self.names = names
+        self.types = types
+        self.hours = hours
+        self.coords = coords  # (N, 2) lat, lon
+        self.wait_time = wait_time  # (N,) minutes, int
+        self.accessibility = accessibility  # (N,) 0-1, 0 = not scored
+        self._index: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_dicts(cls, destinations: List[Dict]) -> "LocationStore":
+        """Build a store from request dicts (lat, lon, id, name, type, ...)."""
+        count = len(destinations)
+        coords = np.empty((count, 2), dtype=float)
+        wait_time = np.empty(count, dtype=np.int64)
+        accessibility = np.zeros(count, dtype=float)
+        ids, names, types, hours = [], [], [], []
+
+        for i, dest in enumerate(destinations):
+            coords[i] = (dest["lat"], dest["lon"])
+            wait_time[i] = dest.get("wait_time", dest.get("wait_time_avg", 0)) or 0
+            ids.append(dest.get("id", f"loc_{i}"))
+            names.append(dest.get("name", f"Location {i}"))
+            types.append(dest.get("type", "unknown"))
+            hours.append(dest.get("hours"))
+
+        return cls(ids, names, types, hours, coords, wait_time, accessibility)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index_of(self, location_id: str) -> int:
+        """Index of a location id (the id map is built on first use)."""
+        if self._index is None:
+            self._index = {location_id: i for i, location_id in enumerate(self.ids)}
+        return self._index[location_id]
+
+    def location(self, i: int) -> Location:
+        """Materialize one location for a response."""
+        return Location(
+            id=self.ids[i],
+            name=self.names[i],
+            lat=float(self.coords[i, 0]),
+            lon=float(self.coords[i, 1]),
+            type=self.types[i],
+            hours=self.hours[i],
+            wait_time_avg=int(self.wait_time[i]),
+            accessibility_score=float(self.accessibility[i]),
+        )
+
+    def locations(self, indices: Iterable[int]) -> List[Location]:
+        """Materialize several locations, in the given order."""
+        return [self.location(i) for i in indices]
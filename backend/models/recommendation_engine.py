@@ -1,8 +1,40 @@
-from typing import Dict, List, Tuple
+import numpy as np
+from typing import Dict, List, Optional, Union
 from models.bandit import MultiArmedBandit
-from models.scorer import RecommendationScorer
+from models.bandit_store import BanditStore
+from models.shared_bandit import SharedBanditFile
+from models.resource_catalog import ResourceCatalog
+from models.contextual_bandit import ContextualBandit
+from models.scorer import (
+    COMPONENTS,
+    RecommendationScorer,
+    ResourceFeatures,
+    build_features,
+)
 from config import Config
 
+# Keyword arguments accepted in recommend(filters=...)
+PREFILTER_OPTIONS = {"max_distance", "available_only", "priority_match"}
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> List[int]:
+    """
+    Indices of the k highest scores, best first, in O(n + k log k).
+
+    Ties keep input order, as a stable full sort would.
+    """
+    count = len(scores)
+    if k <= 0:
+        return []
+    if k < count:
+        # Everything at or above the k-th best score; ties may add a few extra
+        threshold = np.partition(scores, count - k)[count - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(count)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k].tolist()
+
 
 class RecommendationEngine:
     """
@@ -10,78 +42,153 @@ class RecommendationEngine:
     """
 
     def __init__(self):
+        self.shared_bandit = None
+        if Config.BANDIT_BACKEND == "shared":
+            self.shared_bandit = SharedBanditFile(
+                Config.BANDIT_SHARED_PATH,
+                capacity=Config.BANDIT_SHARED_CAPACITY,
+                epsilon=Config.EPSILON,
+            )
+        elif Config.BANDIT_BACKEND != "memory":
+            raise ValueError(f"Unknown BANDIT_BACKEND: {Config.BANDIT_BACKEND}")
+
         self.bandit = MultiArmedBandit(
             epsilon=Config.EPSILON,
             epsilon_decay=Config.EPSILON_DECAY,
             min_epsilon=Config.MIN_EPSILON,
+            decay=Config.BANDIT_DECAY,
+            window=Config.BANDIT_WINDOW,
+            shared=self.shared_bandit,
         )
+        self.bandit_store = None
+        if Config.BANDIT_DB_PATH:
+            # Warm start, then persist new feedback in the background. A
+            # shared arm file is loaded once, by the worker that created it
+            self.bandit_store = BanditStore(
+                Config.BANDIT_DB_PATH, flush_seconds=Config.BANDIT_FLUSH_SECONDS
+            )
+            if self.shared_bandit is None or self.shared_bandit.created:
+                self.bandit_store.load(self.bandit)
+            self.bandit.store = self.bandit_store
         self.scorer = RecommendationScorer(bandit=self.bandit)
+
+        # "ucb" = per-resource bandit above; "linucb"/"thompson" pick among the
+        # top candidates with a linear model of their score components
+        self.contextual = None
+        if Config.BANDIT_POLICY != "ucb":
+            self.contextual = ContextualBandit(
+                dim=len(COMPONENTS) + 1,
+                policy=Config.BANDIT_POLICY,
+                alpha=Config.CONTEXTUAL_ALPHA,
+            )
+        self.catalog = ResourceCatalog(
+            db_path=Config.RESOURCE_CATALOG_DB_PATH or None,
+            refresh_seconds=Config.RESOURCE_CATALOG_REFRESH_SECONDS,
+        )
         self.ab_test_variant = "A"  # Default variant
+        # Slate feedback per resource type: examined/accepted count by position
+        self.position_stats: Dict[str, Dict[str, np.ndarray]] = {}
 
     def recommend(
         self,
         individual: Dict,
-        resources: List[Dict],
+        resources: Union[List[Dict], ResourceFeatures],
         resource_type: str,
         top_k: int = 5,
         use_bandit: bool = True,
+        filters: Optional[Dict] = None,
+        slate: Optional[bool] = None,
     ) -> List[Dict]:
         """
         Generate top-k recommendations for an individual.
-        """
-        if not resources:
-            return []
-
-        # Calculate scores for all candidates
-        scored_resources = []
-        scores_dict = {}
 
-        for resource in resources:
-            score, explanation = self.scorer.calculate_composite_score(
-                individual, resource, resource_type
-            )
-            scores_dict[resource["id"]] = score
+        resources are resource dicts or precomputed ResourceFeatures (see
+        ResourceCatalog). filters optionally drops candidates before scoring:
+        max_distance, available_only and priority_match (see
+        RecommendationScorer.prefilter). With slate (default
+        Config.BANDIT_SLATE) the bandit orders all top_k positions instead of
+        only picking the first.
+        """
+        if slate is None:
+            slate = Config.BANDIT_SLATE
+        if not isinstance(resources, ResourceFeatures):
+            resources = build_features(resources or [])
 
-            scored_resources.append(
-                {"resource": resource, "score": score, "explanation": explanation}
-            )
+        if filters:
+            unknown = set(filters) - PREFILTER_OPTIONS
+            if unknown:
+                raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+            keep = self.scorer.prefilter(individual, resources, **filters)
+            if len(keep) < len(resources):
+                resources = resources.take(keep)
 
-        # Sort by score
-        scored_resources.sort(key=lambda x: x["score"], reverse=True)
+        if not len(resources):
+            return []
 
-        # If using bandit, reorder top candidates
-        if use_bandit and len(scored_resources) > 0:
-            # Get top candidates for bandit selection
-            top_candidates = scored_resources[: min(top_k * 2, len(scored_resources))]
+        # Score all candidates in one vectorized pass
+        scores, components = self.scorer.score_batch(
+            individual, resources, resource_type
+        )
+        # Only the candidates the bandit may pick from need ordering
+        ranked = top_k_indices(scores, top_k * 2 if use_bandit else top_k)
+        if not ranked:
+            return []  # top_k <= 0: nothing for a policy to pick from
+        ids = resources.ids
 
-            # Let bandit select the best one
+        # If using bandit, let it pick the best of the top candidates
+        if use_bandit and slate:
+            # Every position in one pass: candidates ordered by policy value
+            if self.contextual is not None:
+                values = self.contextual.select(
+                    resource_type, self._context_features(components, ranked)
+                )
+                order = np.argsort(-values, kind="stable")[:top_k].tolist()
+            else:
+                order = self.bandit.select_slate(
+                    resource_type, [ids[i] for i in ranked], scores[ranked], top_k
+                )
+            ranked = [ranked[j] for j in order]
+        elif use_bandit and self.contextual is not None:
+            values = self.contextual.select(
+                resource_type, self._context_features(components, ranked)
+            )
+            best = int(np.argmax(values))
+            if best > 0:
+                ranked.insert(0, ranked.pop(best))
+        elif use_bandit:
             best_id = self.bandit.select_action(
                 resource_type,
-                [item["resource"] for item in top_candidates],
-                scores_dict,
+                [resources.resources[i] for i in ranked],
+                {ids[i]: float(scores[i]) for i in ranked},
             )
 
             # Move selected to front
-            for i, item in enumerate(top_candidates):
-                if item["resource"]["id"] == best_id:
-                    if i > 0:
-                        top_candidates.insert(0, top_candidates.pop(i))
+            for position, i in enumerate(ranked):
+                if ids[i] == best_id:
+                    if position > 0:
+                        ranked.insert(0, ranked.pop(position))
                     break
 
-            # Combine with remaining
-            scored_resources = top_candidates + scored_resources[len(top_candidates) :]
+        if self.contextual is not None:
+            # Feedback is credited to the features the resource was shown with
+            contexts = self._context_features(components, ranked[:top_k])
+            for i, context in zip(ranked, contexts):
+                self.contextual.remember(
+                    resource_type, ids[i], individual.get("id"), context
+                )
 
-        # Return top-k with explanations
+        # Return top-k; explanations are only built for these
         results = []
-        for item in scored_resources[:top_k]:
+        for i in ranked[:top_k]:
+            resource = resources.resources[i]
             results.append(
                 {
-                    "resource_id": item["resource"]["id"],
-                    "resource_name": item["resource"].get("name", "Unknown"),
+                    "resource_id": ids[i],
+                    "resource_name": resource.get("name", "Unknown"),
                     "resource_type": resource_type,
-                    "score": item["score"],
-                    "explanation": item["explanation"],
-                    "resource_details": item["resource"],
+                    "score": float(scores[i]),
+                    "explanation": self.scorer.explain(scores, components, i),
+                    "resource_details": resource,
                 }
             )
 
@@ -93,6 +200,7 @@ class RecommendationEngine:
         resource_id: str,
         success: bool,
         outcome_score: float = None,
+        individual_id: str = None,
     ):
         """
         Update the model with feedback from a placement.
@@ -104,6 +212,63 @@ class RecommendationEngine:
 
         self.bandit.update(resource_type, resource_id, reward)
 
+        if self.contextual is not None:
+            context = self.contextual.recall(resource_type, resource_id, individual_id)
+            if context is not None:
+                self.contextual.update(resource_type, context, reward)
+
+    def provide_slate_feedback(
+        self,
+        resource_type: str,
+        slate: List[str],
+        accepted_position: Optional[int],
+        outcome_score: float = None,
+        individual_id: str = None,
+    ) -> int:
+        """
+        Update the model from how an individual went through a recommended
+        list, following the cascade model: resources above the accepted one
+        were looked at and passed over (reward 0), the accepted one gets the
+        outcome, and those below were not reached. With no acceptance every
+        position counts as passed over.
+
+        Returns:
+            Number of positions that gave feedback
+        """
+        if accepted_position is not None and not 0 <= accepted_position < len(slate):
+            raise ValueError("accepted_position is outside the slate")
+        examined = len(slate) if accepted_position is None else accepted_position + 1
+
+        for position in range(examined):
+            accepted = position == accepted_position
+            self.provide_feedback(
+                resource_type,
+                slate[position],
+                accepted,
+                outcome_score if accepted else None,
+                individual_id,
+            )
+
+        # Per-position log: how often each position is reached and accepted
+        log = self.position_stats.setdefault(
+            resource_type, {"examined": np.zeros(0), "accepted": np.zeros(0)}
+        )
+        if len(log["examined"]) < len(slate):
+            for name in ("examined", "accepted"):
+                log[name] = np.pad(log[name], (0, len(slate) - len(log[name])))
+        log["examined"][:examined] += 1
+        if accepted_position is not None:
+            log["accepted"][accepted_position] += 1
+        return examined
+
+    @staticmethod
+    def _context_features(components: Dict[str, np.ndarray], rows) -> np.ndarray:
+        """(n, d) contextual bandit features: score components plus a bias."""
+        rows = np.asarray(rows, dtype=int)
+        return np.column_stack(
+            [components[name][rows] for name in COMPONENTS] + [np.ones(len(rows))]
+        )
+
     def get_statistics(self) -> Dict:
         """
         Get learning statistics.
@@ -112,6 +277,21 @@ class RecommendationEngine:
             "bandit_stats": self.bandit.get_stats(),
             "epsilon": self.bandit.epsilon,
             "ab_test_variant": self.ab_test_variant,
+            "catalog_stats": self.catalog.get_stats(),
+            "persistence": self.bandit_store.get_stats()
+            if self.bandit_store
+            else None,
+            "shared_state": self.shared_bandit.get_stats()
+            if self.shared_bandit
+            else None,
+            "contextual": self.contextual.get_stats() if self.contextual else None,
+            "position_stats": {
+                resource_type: {
+                    "examined": log["examined"].astype(int).tolist(),
+                    "accepted": log["accepted"].astype(int).tolist(),
+                }
+                for resource_type, log in self.position_stats.items()
+            },
         }
 
     def set_ab_variant(self, variant: str):
@@ -0,0 +1,307 @@
+"""
+Server-side catalog of shelters and jobs for recommendations.
+
+Rows of the main app's ``shelters`` and ``jobs`` tables are kept as resource
+dicts plus the columns the scorer reads (locations, capacity, skill bitsets
+and priority masks), so recommendation requests can reference resources by
+id instead of posting them. Refreshes read only rows whose ``updated_at`` is
+at or after the newest one seen, which covers capacity updates and new jobs.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+from models.scorer import (
+    DEFAULT_PRIORITY_SUPPORT,
+    ResourceFeatures,
+    priority_mask,
+    skill_bitset,
+    skill_words,
+)
+
+SHELTER = "shelter"
+JOB = "job"
+
+
+class _CatalogTable:
+    """Feature rows of one resource type, updated in place."""
+
+    def __init__(self):
+        self.slots: Dict[str, int] = {}
+        self.resources: List[Dict] = []
+        self.vocabulary: Dict[str, int] = {}
+        self._allocate(64, 1)
+        self._snapshot: Optional[ResourceFeatures] = None
+
+    def upsert(self, resource: Dict):
+        skills = {s.lower() for s in resource.get("required_skills", []) or ()}
+        for skill in skills:
+            self.vocabulary.setdefault(skill, len(self.vocabulary))
+        words = skill_words(self.vocabulary)
+
+        slot = self.slots.get(resource["id"])
+        if slot is None:
+            slot = len(self.resources)
+            self.slots[resource["id"]] = slot
+            self.resources.append(resource)
+        else:
+            self.resources[slot] = resource
+        rows, width = self.skill_bits.shape
+        if slot == rows or words > width:
+            self._allocate(2 * rows if slot == rows else rows, words)
+
+        location = resource.get("location")
+        self.locations[slot] = location if location else np.nan
+        self.capacity[slot] = resource.get("capacity", 0)
+        self.occupied[slot] = resource.get("occupied", 0)
+        self.skill_bits[slot] = skill_bitset(skills, self.vocabulary, words)
+        self.skill_counts[slot] = len(skills)
+        self.priority_masks[slot] = priority_mask(
+            resource.get("priority_support", DEFAULT_PRIORITY_SUPPORT)
+        )
+        self._snapshot = None
+
+    def remove(self, resource_id: str):
+        """Drop a row, moving the last row into its place."""
+        slot = self.slots.pop(resource_id, None)
+        if slot is None:
+            return
+        last = len(self.resources) - 1
+        if slot != last:
+            moved = self.resources[last]
+            self.resources[slot] = moved
+            self.slots[moved["id"]] = slot
+            for column in self._columns():
+                column[slot] = column[last]
+        self.resources.pop()
+        self._snapshot = None
+
+    def features(self) -> ResourceFeatures:
+        """Copy of the current rows; reused until the next change."""
+        if self._snapshot is None:
+            count = len(self.resources)
+            self._snapshot = ResourceFeatures(
+                resources=list(self.resources),
+                ids=[r["id"] for r in self.resources],
+                locations=self.locations[:count].copy(),
+                capacity=self.capacity[:count].copy(),
+                occupied=self.occupied[:count].copy(),
+                skill_bits=self.skill_bits[:count].copy(),
+                skill_counts=self.skill_counts[:count].copy(),
+                priority_masks=self.priority_masks[:count].copy(),
+                vocabulary=dict(self.vocabulary),
+            )
+        return self._snapshot
+
+    def _columns(self):
+        return (
+            self.locations,
+            self.capacity,
+            self.occupied,
+            self.skill_bits,
+            self.skill_counts,
+            self.priority_masks,
+        )
+
+    def _allocate(self, rows: int, words: int):
+        """Create or grow the columns to ``rows`` resources."""
+        for name, shape, dtype, fill in (
+            ("locations", (rows, 2), float, np.nan),
+            ("capacity", (rows,), float, 0),
+            ("occupied", (rows,), float, 0),
+            ("skill_bits", (rows, words), np.uint64, 0),
+            ("skill_counts", (rows,), float, 0),
+            ("priority_masks", (rows,), np.int64, 0),
+        ):
+            grown = np.full(shape, fill, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                if old.ndim == 2:
+                    grown[: len(old), : old.shape[1]] = old
+                else:
+                    grown[: len(old)] = old
+            setattr(self, name, grown)
+
+
+class ResourceCatalog:
+    """Shelters and active jobs from the main app database, with features."""
+
+    def __init__(self, db_path: Optional[str] = None, refresh_seconds: float = 30):
+        self.db_path = db_path
+        self.refresh_seconds = refresh_seconds
+
+        self._tables = {SHELTER: _CatalogTable(), JOB: _CatalogTable()}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+        # Newest updated_at read from each table
+        self.watermarks = {SHELTER: "", JOB: ""}
+        self.rows_read = 0
+        self._next_refresh = 0.0
+
+    def has(self, resource_type: str) -> bool:
+        """Whether the catalog serves this resource type."""
+        return resource_type in self._tables
+
+    def upsert(self, resource_type: str, resources: Iterable[Dict]) -> int:
+        """Add or replace resources (dicts in the recommendation format)."""
+        table = self._tables[resource_type]
+        count = 0
+        with self._lock:
+            for resource in resources:
+                table.upsert(resource)
+                count += 1
+        return count
+
+    def remove(self, resource_type: str, resource_ids: Iterable[str]):
+        """Drop resources from the catalog."""
+        table = self._tables[resource_type]
+        with self._lock:
+            for resource_id in resource_ids:
+                table.remove(resource_id)
+
+    def features(
+        self, resource_type: str, resource_ids: Optional[List[str]] = None
+    ) -> ResourceFeatures:
+        """
+        Features of every catalog resource of a type, or of the given ids.
+
+        Raises:
+            ValueError: for ids not in the catalog
+        """
+        self.refresh()
+        table = self._tables[resource_type]
+        with self._lock:
+            features = table.features()
+            if resource_ids is None:
+                return features
+            slots = [table.slots.get(str(i)) for i in resource_ids]
+        missing = [str(i) for i, slot in zip(resource_ids, slots) if slot is None]
+        if missing:
+            raise ValueError(f"Unknown {resource_type} ids: {', '.join(missing)}")
+        return features.take(slots)
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Read shelters and jobs updated since the last refresh from the
+        database. Runs at most once per refresh_seconds unless forced.
+        """
+        if not self.db_path:
+            return 0
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return 0
+        # One reader at a time; others keep serving the current catalog
+        if not self._refresh_lock.acquire(blocking=force):
+            return 0
+        self._next_refresh = now + self.refresh_seconds
+
+        conn = None
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            # Rows stamped in the same second as the watermark are read
+            # again; upserting them twice is harmless
+            shelters = conn.execute(
+                """
+                SELECT id, name, address, location_lat, location_lng,
+                       total_capacity, available_beds, amenities, restrictions,
+                       operating_hours, updated_at
+                FROM shelters WHERE updated_at >= ? ORDER BY updated_at
+                """,
+                (self.watermarks[SHELTER],),
+            ).fetchall()
+            jobs = conn.execute(
+                """
+                SELECT id, title, company, location, location_lat, location_lng,
+                       salary_min, salary_max, job_type, requirements, status,
+                       updated_at
+                FROM jobs WHERE updated_at >= ? ORDER BY updated_at
+                """,
+                (self.watermarks[JOB],),
+            ).fetchall()
+
+            if shelters:
+                self.upsert(SHELTER, (_shelter_resource(row) for row in shelters))
+                self.watermarks[SHELTER] = str(shelters[-1]["updated_at"])
+            if jobs:
+                active = [row for row in jobs if row["status"] == "active"]
+                closed = [row for row in jobs if row["status"] != "active"]
+                self.upsert(JOB, (_job_resource(row) for row in active))
+                self.remove(JOB, (f"job_{row['id']}" for row in closed))
+                self.watermarks[JOB] = str(jobs[-1]["updated_at"])
+            read = len(shelters) + len(jobs)
+            self.rows_read += read
+            return read
+        except sqlite3.OperationalError:
+            # Database not created yet (main app never started)
+            return 0
+        finally:
+            if conn is not None:
+                conn.close()
+            self._refresh_lock.release()
+
+    def get_stats(self) -> Dict:
+        """Get catalog statistics."""
+        return {
+            "shelters": len(self._tables[SHELTER].resources),
+            "jobs": len(self._tables[JOB].resources),
+            "skills": len(self._tables[JOB].vocabulary),
+            "rows_read": self.rows_read,
+            "watermarks": dict(self.watermarks),
+            "source": "database" if self.db_path else "api",
+        }
+
+
+def _location(row: sqlite3.Row) -> Optional[List[float]]:
+    if row["location_lat"] is None or row["location_lng"] is None:
+        return None
+    return [row["location_lat"], row["location_lng"]]
+
+
+def _json_list(text: Optional[str]) -> List:
+    try:
+        value = json.loads(text) if text else []
+    except ValueError:
+        return []
+    return value if isinstance(value, list) else []
+
+
+def _shelter_resource(row: sqlite3.Row) -> Dict:
+    capacity = row["total_capacity"] or 0
+    return {
+        "id": f"shelter_{row['id']}",
+        "name": row["name"],
+        "address": row["address"],
+        "location": _location(row),
+        "capacity": capacity,
+        "occupied": max(capacity - (row["available_beds"] or 0), 0),
+        "amenities": _json_list(row["amenities"]),
+        "restrictions": _json_list(row["restrictions"]),
+        "operating_hours": row["operating_hours"],
+    }
+
+
+def _job_resource(row: sqlite3.Row) -> Dict:
+    # requirements is free text: a JSON list or comma-separated skills
+    requirements = row["requirements"] or ""
+    skills = _json_list(requirements) if requirements.startswith("[") else None
+    if skills is None:
+        skills = [s.strip() for s in requirements.split(",") if s.strip()]
+    return {
+        "id": f"job_{row['id']}",
+        "name": row["title"],
+        "company": row["company"],
+        "address": row["location"],
+        "location": _location(row),
+        # An open posting counts as one free place
+        "capacity": 1,
+        "occupied": 0,
+        "required_skills": [str(s) for s in skills],
+        "job_type": row["job_type"],
+        "salary_min": row["salary_min"],
+        "salary_max": row["salary_max"],
+    }
@@ -0,0 +1,417 @@
+"""
+Offline road-network routing over a local graph extract.
+
+A graph is loaded from a CSV edge list (or an OSM .pbf extract when the
+optional ``osmium`` package is installed) into compact arrays, with one
+CSR adjacency per transport mode. Points are snapped to the nearest node
+of that mode's graph with the KD-tree spatial index. Point-to-point
+queries use A* with a great-circle lower bound; one-to-many queries and
+distance matrices run scipy's Dijkstra from each distinct source node (or
+each destination node over the reversed graph, when there are fewer), and
+many-to-one queries run it once over the reversed graph.
+"""
+
+import csv
+import heapq
+import math
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from models.distance_matrix import (
+    EARTH_RADIUS_KM,
+    coords_array,
+    haversine_matrix,
+    haversine_paired,
+)
+from models.spatial_index import SpatialIndex
+
+try:
+    import osmium
+except ImportError:  # only needed for .pbf extracts
+    osmium = None
+
+# Mode bits stored per edge
+WALK, CYCLE, DRIVE = 1, 2, 4
+ALL_MODES = WALK | CYCLE | DRIVE
+
+# Transport mode -> graph used for it (buses run on the road network)
+MODE_BITS = {
+    "walking": WALK,
+    "cycling": CYCLE,
+    "driving": DRIVE,
+    "public_transport": DRIVE,
+}
+
+# OSM highway tag -> allowed modes (anything unlisted allows all modes)
+HIGHWAY_MODES = {
+    "motorway": DRIVE,
+    "motorway_link": DRIVE,
+    "trunk": DRIVE,
+    "trunk_link": DRIVE,
+    "footway": WALK,
+    "pedestrian": WALK,
+    "steps": WALK,
+    "path": WALK | CYCLE,
+    "cycleway": WALK | CYCLE,
+    "bridleway": WALK,
+}
+
+# Coordinates are rounded to this many decimals to merge shared nodes
+NODE_PRECISION = 7
+
+# Dijkstra rows (sources x nodes) computed per chunk in distance_matrix
+MATRIX_CHUNK_CELLS = 20_000_000
+
+
+class RoadNetwork:
+    """
+    Directed road graph with per-mode shortest-path queries (distances in km).
+    """
+
+    def __init__(
+        self,
+        nodes: np.ndarray,
+        edge_from: np.ndarray,
+        edge_to: np.ndarray,
+        edge_length_km: np.ndarray,
+        edge_modes: np.ndarray,
+    ):
+        self.nodes = coords_array(nodes)
+        self.edge_from = np.asarray(edge_from, dtype=np.int64)
+        self.edge_to = np.asarray(edge_to, dtype=np.int64)
+        # Zero-length edges would vanish from the sparse graph
+        self.edge_length_km = np.maximum(
+            np.asarray(edge_length_km, dtype=float), 1e-9
+        )
+        self.edge_modes = np.asarray(edge_modes, dtype=np.uint8)
+        self._nodes_rad = np.radians(self.nodes)
+        self._graphs: Dict[int, Dict] = {}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: str) -> "RoadNetwork":
+        """Load a .csv edge list or an OSM .pbf extract."""
+        if path.lower().endswith(".pbf"):
+            return cls.from_pbf(path)
+        return cls.from_csv(path)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "RoadNetwork":
+        """
+        Load an edge list with columns from_lat, from_lon, to_lat, to_lon and
+        optional length_m, oneway (1/0) and highway (OSM tag).
+        """
+        starts, ends, lengths, modes, oneway = [], [], [], [], []
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                starts.append((float(row["from_lat"]), float(row["from_lon"])))
+                ends.append((float(row["to_lat"]), float(row["to_lon"])))
+                length = row.get("length_m")
+                lengths.append(float(length) / 1000 if length else np.nan)
+                modes.append(HIGHWAY_MODES.get(row.get("highway") or "", ALL_MODES))
+                oneway.append(
+                    str(row.get("oneway", "0")).lower() in ("1", "yes", "true")
+                )
+
+        return cls.from_segments(starts, ends, modes, oneway, lengths)
+
+    @classmethod
+    def from_pbf(cls, path: str) -> "RoadNetwork":
+        """Load the highway ways of an OSM .pbf extract (requires osmium)."""
+        if osmium is None:
+            raise ImportError("Reading .pbf extracts requires the 'osmium' package")
+
+        starts, ends, modes, oneway = [], [], [], []
+
+        class _HighwayHandler(osmium.SimpleHandler):
+            def way(self, way):
+                highway = way.tags.get("highway")
+                if highway is None:
+                    return
+                allowed = HIGHWAY_MODES.get(highway, ALL_MODES)
+                one_way = way.tags.get("oneway") in ("yes", "1", "true")
+                points = [(node.lat, node.lon) for node in way.nodes]
+                for a, b in zip(points, points[1:]):
+                    starts.append(a)
+                    ends.append(b)
+                    modes.append(allowed)
+                    oneway.append(one_way)
+
+        _HighwayHandler().apply_file(path, locations=True)
+        return cls.from_segments(starts, ends, modes, oneway)
+
+    @classmethod
+    def from_segments(
+        cls,
+        starts: Sequence[Tuple[float, float]],
+        ends: Sequence[Tuple[float, float]],
+        modes: Sequence[int],
+        oneway: Sequence[bool],
+        lengths_km: Optional[Sequence[float]] = None,
+    ) -> "RoadNetwork":
+        """
+        Build a graph from road segments. Segments are traversable both ways
+        except that one-way segments are forward-only for driving.
+        """
+        starts = coords_array(starts)
+        ends = coords_array(ends)
+        modes = np.asarray(modes, dtype=np.uint8)
+        oneway = np.asarray(oneway, dtype=bool)
+
+        length = haversine_paired(starts, ends)
+        if lengths_km is not None:
+            given = np.asarray(lengths_km, dtype=float)
+            length = np.where(np.isnan(given), length, given)
+
+        # Merge endpoints with identical (rounded) coordinates into nodes
+        rounded = np.round(np.vstack([starts, ends]), NODE_PRECISION)
+        nodes, inverse = np.unique(rounded, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        u, v = inverse[: len(starts)], inverse[len(starts) :]
+
+        backward_modes = np.where(oneway, modes & ~np.uint8(DRIVE), modes)
+        return cls(
+            nodes,
+            np.concatenate([u, v]),
+            np.concatenate([v, u]),
+            np.concatenate([length, length]),
+            np.concatenate([modes, backward_modes]).astype(np.uint8),
+        )
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def snap(
+        self, points: Sequence[Tuple[float, float]], transport_mode: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Snap points to the nearest node usable by a transport mode.
+
+        Returns:
+            (node indices, snap distances in km)
+        """
+        graph = self._graph(transport_mode)
+        if graph["index"].size == 0:
+            raise ValueError(f"Road network has no edges for {transport_mode}")
+        distances, idx = graph["index"].nearest(points, k=1)
+        return graph["node_ids"][idx[:, 0]], distances[:, 0]
+
+    def route(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        transport_mode: str = "driving",
+    ) -> Tuple[float, List[Tuple[float, float]]]:
+        """
+        Point-to-point shortest path with A*.
+
+        Returns:
+            (distance_km, waypoints); distance is inf if unreachable
+        """
+        (source, target), offsets = self.snap([origin, destination], transport_mode)
+        if source == target:
+            # Both points are closest to the same node; go straight there
+            direct = float(haversine_paired([origin], [destination])[0])
+            return direct, [tuple(origin), tuple(destination)]
+
+        distance, path = self._astar(int(source), int(target), transport_mode)
+        if not path:
+            return math.inf, []
+
+        waypoints = [tuple(origin)] + [tuple(self.nodes[n]) for n in path]
+        waypoints.append(tuple(destination))
+        return distance + float(offsets.sum()), waypoints
+
+    def route_distance(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        transport_mode: str = "driving",
+    ) -> float:
+        """Network distance (km) between two points, never below straight-line."""
+        direct = float(haversine_paired([origin], [destination])[0])
+        distance, _ = self.route(origin, destination, transport_mode)
+        return direct if math.isinf(distance) else max(distance, direct)
+
+    def distance_matrix(
+        self,
+        points_a: Sequence[Tuple[float, float]],
+        points_b: Optional[Sequence[Tuple[float, float]]] = None,
+        transport_mode: str = "driving",
+    ) -> np.ndarray:
+        """
+        N×M network distances (km), computed one-to-many from each distinct
+        source node, or many-to-one to each destination node if fewer.
+        Entries are never below the straight-line distance; unreachable pairs
+        and pairs snapped to the same node fall back to it.
+        """
+        a = coords_array(points_a)
+        b = a if points_b is None else coords_array(points_b)
+        direct = haversine_matrix(a, b)
+        if not len(a) or not len(b):
+            return direct
+
+        graph = self._graph(transport_mode)
+        src, src_offset = self.snap(a, transport_mode)
+        dst, dst_offset = self.snap(b, transport_mode)
+        sources, source_row = np.unique(src, return_inverse=True)
+        targets, target_row = np.unique(dst, return_inverse=True)
+
+        # Search from whichever side has fewer distinct nodes; targets are
+        # searched over the reversed graph
+        if len(targets) < len(sources):
+            network = self._many_to_many(graph["reverse"], targets, target_row, src).T
+        else:
+            network = self._many_to_many(graph["csr"], sources, source_row, dst)
+
+        network += src_offset[:, None] + dst_offset[None, :]
+        fallback = np.isinf(network) | (src[:, None] == dst[None, :])
+        return np.where(fallback, direct, np.maximum(network, direct))
+
+    def _many_to_many(
+        self, csr, roots: np.ndarray, root_row: np.ndarray, other: np.ndarray
+    ) -> np.ndarray:
+        """Dijkstra from each distinct root, in chunks; (len(root_row), len(other))."""
+        network = np.empty((len(root_row), len(other)))
+        chunk = max(1, MATRIX_CHUNK_CELLS // len(self.nodes))
+        for lo in range(0, len(roots), chunk):
+            rows = dijkstra(csr, directed=True, indices=roots[lo : lo + chunk])
+            selected = (root_row >= lo) & (root_row < lo + chunk)
+            network[selected] = rows[root_row[selected] - lo][:, other]
+        return network
+
+    def distances_from(
+        self,
+        origin: Tuple[float, float],
+        destinations: Sequence[Tuple[float, float]],
+        transport_mode: str = "driving",
+    ) -> np.ndarray:
+        """One-to-many network distances (km) from a single origin."""
+        return self.distance_matrix([origin], destinations, transport_mode)[0]
+
+    def distances_to(
+        self,
+        origins: Sequence[Tuple[float, float]],
+        destination: Tuple[float, float],
+        transport_mode: str = "driving",
+    ) -> np.ndarray:
+        """
+        Many-to-one network distances (km) to a single destination, from one
+        Dijkstra over the reversed graph. Fallbacks as in distance_matrix.
+        """
+        a = coords_array(origins)
+        direct = haversine_matrix(a, [destination])[:, 0]
+        if not len(a):
+            return direct
+
+        graph = self._graph(transport_mode)
+        src, src_offset = self.snap(a, transport_mode)
+        dst, dst_offset = self.snap([destination], transport_mode)
+        network = dijkstra(graph["reverse"], directed=True, indices=int(dst[0]))[src]
+
+        network += src_offset + dst_offset[0]
+        fallback = np.isinf(network) | (src == dst[0])
+        return np.where(fallback, direct, np.maximum(network, direct))
+
+    def get_stats(self) -> Dict:
+        """Get graph size per transport mode."""
+        return {
+            "nodes": len(self.nodes),
+            "edges": len(self.edge_from),
+            "edges_by_mode": {
+                mode: int(np.count_nonzero(self.edge_modes & bit))
+                for mode, bit in MODE_BITS.items()
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _graph(self, transport_mode: str) -> Dict:
+        """Build (once) the CSR graph and snapping index for a mode."""
+        bit = MODE_BITS.get(transport_mode, DRIVE)
+        graph = self._graphs.get(bit)
+        if graph is not None:
+            return graph
+
+        mask = (self.edge_modes & bit) != 0
+        u = self.edge_from[mask]
+        v = self.edge_to[mask]
+        length = self.edge_length_km[mask]
+
+        # Keep the shortest of parallel edges (csr_matrix would sum them)
+        order = np.lexsort((length, v, u))
+        u, v, length = u[order], v[order], length[order]
+        first = np.ones(len(u), dtype=bool)
+        first[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+        u, v, length = u[first], v[first], length[first]
+
+        n = len(self.nodes)
+        csr = csr_matrix((length, (u, v)), shape=(n, n))
+        node_ids = np.unique(np.concatenate([u, v]))
+
+        graph = {
+            "csr": csr,
+            "reverse": csr.T.tocsr(),
+            "node_ids": node_ids,
+            "index": SpatialIndex(self.nodes[node_ids]),
+        }
+        self._graphs[bit] = graph
+        return graph
+
+    def _astar(
+        self, source: int, target: int, transport_mode: str
+    ) -> Tuple[float, List[int]]:
+        """A* over the mode's CSR graph with a great-circle heuristic."""
+        if source == target:
+            return 0.0, [source]
+
+        csr = self._graph(transport_mode)["csr"]
+        indptr, indices, weights = csr.indptr, csr.indices, csr.data
+        lat_t, lon_t = self._nodes_rad[target]
+        cos_t = math.cos(lat_t)
+
+        def heuristic(node: int) -> float:
+            lat, lon = self._nodes_rad[node]
+            h = (
+                math.sin((lat_t - lat) / 2) ** 2
+                + math.cos(lat) * cos_t * math.sin((lon_t - lon) / 2) ** 2
+            )
+            return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+        best = {source: 0.0}
+        parent = {}
+        closed = set()
+        heap = [(heuristic(source), 0.0, source)]
+
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                path = [node]
+                while node in parent:
+                    node = parent[node]
+                    path.append(node)
+                return cost, path[::-1]
+            if node in closed:
+                continue
+            closed.add(node)
+
+            lo, hi = indptr[node], indptr[node + 1]
+            for neighbor, weight in zip(
+                indices[lo:hi].tolist(), weights[lo:hi].tolist()
+            ):
+                new_cost = cost + weight
+                if new_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = new_cost
+                    parent[neighbor] = node
+                    heapq.heappush(
+                        heap, (new_cost + heuristic(neighbor), new_cost, neighbor)
+                    )
+
+        return math.inf, []
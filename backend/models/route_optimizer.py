@@ -1,23 +1,64 @@
+import base64
+import time
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from datetime import datetime, timedelta
 import heapq
 from dataclasses import dataclass
 from config import Config
-
-
-@dataclass
-class Location:
-    """Represents a location with coordinates and metadata."""
-
-    id: str
-    name: str
-    lat: float
-    lon: float
-    type: str  # 'shelter', 'job', 'medical', 'individual', etc.
-    hours: Optional[Dict] = None
-    wait_time_avg: int = 0  # minutes
-    accessibility_score: float = 0.0
+from models.distance_cache import DistanceCache
+from models.distance_matrix import coords_array, haversine_matrix, haversine_paired
+from models.isochrone import IsochroneCache
+from models.location_store import Location, LocationStore
+from models.local_search import (
+    improve_path,
+    iter_improve_path,
+    nearest_neighbors,
+    or_opt,
+    symmetric,
+)
+from models.road_network import RoadNetwork
+from models.route_session import RouteSession, RouteSessionStore
+from models.route_workers import RoutePool
+from models.spatial_index import get_spatial_index
+from models.transit_router import TransitRouter
+from models.visit_demand import DayProfile, VisitDemandModel
+from models.vrp_solver import VRPSolution, VRPSolver
+
+# Average speeds used for travel time estimates (km/h)
+TRANSPORT_SPEEDS_KMH = {
+    "walking": 5,
+    "cycling": 15,
+    "public_transport": 25,
+    "driving": 40,
+}
+
+PRIORITY_LEVELS = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+
+# Alternative routes: default count, share of the primary solve time they may
+# use, and how far (length ratio / shared edges) an alternate order may go
+ALTERNATIVE_ROUTES = 2
+ALTERNATIVE_TIME_SHARE = 0.3
+ALTERNATIVE_MIN_BUDGET_S = 0.002
+ALTERNATIVE_MAX_DETOUR = 0.15
+ALTERNATIVE_MAX_SHARED_EDGES = 0.8
+ALTERNATIVE_EDGE_PENALTY = 0.3
+
+# Largest road-network distance matrix (pairs) read from and stored in the
+# distance cache; bigger ones would mostly evict other entries
+MATRIX_CACHE_MAX_CELLS = 10_000
+
+# Individual x resource cells scored per chunk in batch accessibility scoring
+BATCH_SCORE_CELLS = 2_000_000
+
+# Visit-time suggestions from observed demand: slot length, the wait that
+# halves a slot's score, how close to the best wait a slot must be to be
+# recommended, and the check-ins needed to call a wait "observed"
+VISIT_SLOT_MINUTES = 120
+VISIT_WAIT_SCALE_MINUTES = 30
+VISIT_RECOMMEND_MARGIN_MINUTES = 5
+VISIT_MIN_CHECKINS = 3
+VISIT_OCCUPANCY_WEIGHT = 0.2
 
 
 @dataclass
@@ -33,6 +74,18 @@ class Route:
     waypoints: List[Tuple[float, float]]
 
 
+@dataclass
+class TSPSearch:
+    """State of a finished TSP solve, reused to generate alternatives."""
+
+    dist: np.ndarray
+    d: List[List[float]]  # symmetric(dist) as nested lists for the local search
+    neighbors: List[List[int]]
+    tour: List[int]
+    solve_seconds: float
+    deadline: Optional[float] = None  # the request's, shared with alternatives
+
+
 class RouteOptimizer:
     """
     AI-powered route optimization for volunteers and individuals.
@@ -40,8 +93,44 @@ class RouteOptimizer:
     """
 
     def __init__(self):
-        self.locations_cache = {}
-        self.distance_cache = {}
+        self.distance_cache = DistanceCache(
+            max_entries=Config.ROUTE_CACHE_SIZE,
+            ttl_seconds=Config.ROUTE_CACHE_TTL_SECONDS,
+            db_path=Config.ROUTE_CACHE_DB_PATH or None,
+        )
+        self.road_network = (
+            RoadNetwork.load(Config.ROAD_NETWORK_PATH)
+            if Config.ROAD_NETWORK_PATH
+            else None
+        )
+        self.transit_router = (
+            TransitRouter.from_gtfs(
+                Config.TRANSIT_GTFS_PATH, Config.TRANSIT_MAX_TRIP_MINUTES
+            )
+            if Config.TRANSIT_GTFS_PATH
+            else None
+        )
+        self.isochrones = IsochroneCache(
+            self._raster_minutes,
+            TRANSPORT_SPEEDS_KMH,
+            max_entries=Config.ISOCHRONE_CACHE_SIZE,
+            cell_km=Config.ISOCHRONE_CELL_KM,
+        )
+        self.visit_demand = VisitDemandModel(
+            db_path=Config.VISIT_DEMAND_DB_PATH or None,
+            refresh_seconds=Config.VISIT_DEMAND_REFRESH_SECONDS,
+        )
+        self.route_sessions = RouteSessionStore(
+            max_sessions=Config.ROUTE_SESSION_MAX,
+            ttl_seconds=Config.ROUTE_SESSION_TTL_SECONDS,
+        )
+        self.route_pool = (
+            RoutePool(Config.ROUTE_WORKERS, Config.ROUTE_SOLVE_TIMEOUT_MS)
+            if Config.ROUTE_WORKERS > 1
+            else None
+        )
+        if self.route_pool is not None:
+            self.route_pool.start()
 
         # Weights for route scoring
         self.weights = {
@@ -57,6 +146,7 @@ class RouteOptimizer:
         start_location: Tuple[float, float],
         destinations: List[Dict],
         constraints: Dict = None,
+        time_budget_ms: Optional[float] = None,
     ) -> Dict:
         """
         Calculate optimal route visiting multiple destinations.
@@ -65,99 +155,394 @@ class RouteOptimizer:
             start_location: (lat, lon) starting point
             destinations: List of destination dicts with lat, lon, type
             constraints: Optional constraints (max_time, max_distance, transport_mode)
+            time_budget_ms: Stop improving after this long and return the best
+                route found so far (unbounded if None)
 
         Returns:
             Optimized route with waypoints and metadata
         """
+        deadline = self._deadline(time_budget_ms)
         constraints = constraints or {}
+        locations = LocationStore.from_dicts(destinations)
 
-        # Convert to Location objects
-        locations = [
-            Location(
-                id=dest.get("id", f"loc_{i}"),
-                name=dest.get("name", f"Location {i}"),
-                lat=dest["lat"],
-                lon=dest["lon"],
-                type=dest.get("type", "unknown"),
-                hours=dest.get("hours"),
-                wait_time_avg=dest.get("wait_time", 0),
-            )
-            for i, dest in enumerate(destinations)
-        ]
+        # Pairwise distances for the whole request; node 0 is the start
+        dist = self._distance_matrix(
+            np.vstack([start_location, locations.coords]),
+            transport_mode=constraints.get("transport_mode", "driving"),
+        )
 
         # Solve TSP using nearest neighbor with improvements
-        route_order = self._solve_tsp(start_location, locations, constraints)
+        search = self._search_tsp(dist, deadline)
 
-        # Build detailed route
-        route = self._build_route(start_location, route_order, constraints)
+        return self._route_result(
+            start_location, locations, search.tour, dist, constraints, search
+        )
 
-        # Calculate scores
-        route_data = {
-            "route": route,
-            "order": [loc.id for loc in route_order],
-            "total_distance": route.total_distance,
-            "total_time": route.total_time,
-            "estimated_cost": route.cost,
-            "accessibility_score": route.accessibility_score,
-            "waypoints": route.waypoints,
-            "transport_modes": route.transport_modes,
-            "alternatives": self._generate_alternatives(
-                start_location, locations, constraints
-            ),
-        }
+    def iter_multi_stop_route(
+        self,
+        start_location: Tuple[float, float],
+        destinations: List[Dict],
+        constraints: Dict = None,
+        time_budget_ms: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        """
+        Progressive version of optimize_multi_stop_route.
 
-        return route_data
+        Yields the nearest-neighbor route at once, then the route after each
+        improving 2-opt/Or-opt round, and finally the best route with its
+        alternatives.
+        """
+        deadline = self._deadline(time_budget_ms)
+        constraints = constraints or {}
+        locations = LocationStore.from_dicts(destinations)
+        dist = self._distance_matrix(
+            np.vstack([start_location, locations.coords]),
+            transport_mode=constraints.get("transport_mode", "driving"),
+        )
+
+        started = time.perf_counter()
+        tour = self._nearest_neighbor_tour(dist)
+        yield self._route_result(start_location, locations, tour, dist, constraints)
+
+        # Moves are scored on symmetric distances, routes on the directed ones
+        search_dist = symmetric(dist)
+        d = search_dist.tolist()
+        neighbors = nearest_neighbors(search_dist, Config.ROUTE_NEIGHBOR_K)
+        if len(tour) >= 2:
+            path = [0] + tour
+            for _ in iter_improve_path(path, d, neighbors, deadline=deadline):
+                tour = path[1:]
+                yield self._route_result(
+                    start_location, locations, tour, dist, constraints
+                )
+
+        search = TSPSearch(
+            dist, d, neighbors, tour, time.perf_counter() - started, deadline
+        )
+        yield self._route_result(
+            start_location, locations, tour, dist, constraints, search
+        )
 
     def optimize_volunteer_routes(
-        self, volunteers: List[Dict], individuals: List[Dict], date: datetime = None
+        self,
+        volunteers: List[Dict],
+        individuals: List[Dict],
+        date: datetime = None,
+        parallel: Optional[bool] = None,
+        time_budget_ms: Optional[float] = None,
     ) -> Dict:
         """
         Optimize daily routes for multiple volunteers conducting outreach.
 
+        Solved as a vehicle routing problem with time windows: each volunteer's
+        available_hours (from start_time) and capacity are hard limits, and each
+        individual's hours for the day and wait_time must fit into the route.
+        Stops with recorded check-ins use the demand model's expected wait for
+        the hour of the visit instead of wait_time.
+
         Args:
             volunteers: List of volunteer dicts with id, location, capacity
             individuals: List of individual dicts with id, location, priority
             date: Date for route planning
+            parallel: Improve routes in the worker pool; defaults to True when
+                ROUTE_WORKERS > 1
+            time_budget_ms: Solver budget; defaults to VRP_TIME_LIMIT_MS
 
         Returns:
             Optimized assignments and routes for each volunteer
         """
         date = date or datetime.now()
+        locations = LocationStore.from_dicts(individuals)
+        solver, dist = self._volunteer_solver(volunteers, individuals, locations, date)
+        solution = solver.solve(
+            time_limit_ms=time_budget_ms or Config.VRP_TIME_LIMIT_MS,
+            pool=self._solver_pool(parallel),
+        )
+        return self._volunteer_result(
+            volunteers, locations, date, dist, solver.shift_start, solution
+        )
+
+    def iter_volunteer_routes(
+        self,
+        volunteers: List[Dict],
+        individuals: List[Dict],
+        date: datetime = None,
+        parallel: Optional[bool] = None,
+        time_budget_ms: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        """
+        Progressive version of optimize_volunteer_routes.
+
+        Yields the constructed assignment at once, then the result after each
+        improving solver pass; the last one yielded is final.
+        """
+        date = date or datetime.now()
+        locations = LocationStore.from_dicts(individuals)
+        solver, dist = self._volunteer_solver(volunteers, individuals, locations, date)
+        for solution in solver.solve_progressive(
+            time_limit_ms=time_budget_ms or Config.VRP_TIME_LIMIT_MS,
+            pool=self._solver_pool(parallel),
+        ):
+            yield self._volunteer_result(
+                volunteers, locations, date, dist, solver.shift_start, solution
+            )
 
-        # Cluster individuals by location
-        clusters = self._cluster_locations(individuals)
+    def _solver_pool(self, parallel: Optional[bool]) -> Optional[RoutePool]:
+        if self.route_pool is not None and parallel is not False:
+            return self.route_pool
+        return None
 
-        # Assign clusters to volunteers
-        assignments = self._assign_clusters_to_volunteers(volunteers, clusters)
+    @staticmethod
+    def _deadline(time_budget_ms: Optional[float]) -> Optional[float]:
+        """Convert a budget into a time.perf_counter() deadline."""
+        if time_budget_ms is None:
+            return None
+        return time.perf_counter() + time_budget_ms / 1000.0
 
-        # Optimize route for each volunteer
+    def _volunteer_solver(
+        self,
+        volunteers: List[Dict],
+        individuals: List[Dict],
+        locations: LocationStore,
+        date: datetime,
+    ) -> Tuple[VRPSolver, np.ndarray]:
+        """Build the VRP for a day; returns the solver and its distance matrix."""
+        day_name = date.strftime("%A").lower()
+
+        # Volunteers are nodes 0..V-1, individuals follow. One matrix serves
+        # every volunteer, so mixed teams are routed on the driving network
+        modes = {v.get("transport_mode", "driving") for v in volunteers}
+        volunteer_coords = coords_array([(v["lat"], v["lon"]) for v in volunteers])
+        dist = self._distance_matrix(
+            np.vstack([volunteer_coords, locations.coords]),
+            transport_mode=modes.pop() if len(modes) == 1 else "driving",
+        )
+
+        shift_start = np.array(
+            [self._parse_minutes(v.get("start_time", "09:00")) for v in volunteers],
+            dtype=float,
+        )
+        windows = np.array(
+            [self._time_window(hours, day_name) for hours in locations.hours],
+            dtype=float,
+        ).reshape(-1, 2)
+
+        # Time-dependent service durations where check-ins have been observed
+        service = locations.wait_time.astype(float)
+        profiles = self.visit_demand.service_profiles(
+            locations.ids, date.weekday(), service
+        )
+
+        solver = VRPSolver(
+            dist,
+            speeds_kmh=np.array(
+                [
+                    TRANSPORT_SPEEDS_KMH.get(v.get("transport_mode", "driving"), 25)
+                    for v in volunteers
+                ]
+            ),
+            shift_start=shift_start,
+            shift_end=shift_start
+            + np.array([v.get("available_hours", 8) * 60 for v in volunteers]),
+            capacity=np.array(
+                [
+                    np.inf if v.get("capacity") is None else v["capacity"]
+                    for v in volunteers
+                ],
+                dtype=float,
+            ),
+            service=service if profiles is None else profiles,
+            window_open=windows[:, 0],
+            window_close=windows[:, 1],
+            demand=np.array([ind.get("demand", 1) for ind in individuals], dtype=float),
+            priority=np.array(
+                [
+                    PRIORITY_LEVELS.get(str(ind.get("priority", "medium")).lower(), 2)
+                    for ind in individuals
+                ]
+            ),
+            neighbor_k=Config.ROUTE_NEIGHBOR_K,
+        )
+        return solver, dist
+
+    def _volunteer_result(
+        self,
+        volunteers: List[Dict],
+        locations: LocationStore,
+        date: datetime,
+        dist: np.ndarray,
+        shift_start: np.ndarray,
+        solution: VRPSolution,
+    ) -> Dict:
+        """Build the volunteer-optimization response from a VRP solution."""
+        num_volunteers = len(volunteers)
+
+        # Build the detailed route for each volunteer
+        assignments = {}
         volunteer_routes = {}
-        for volunteer_id, assigned_individuals in assignments.items():
-            volunteer = next(v for v in volunteers if v["id"] == volunteer_id)
-
-            route = self.optimize_multi_stop_route(
-                start_location=(volunteer["lat"], volunteer["lon"]),
-                destinations=assigned_individuals,
-                constraints={
-                    "max_time": volunteer.get("available_hours", 8) * 60,
-                    "transport_mode": volunteer.get("transport_mode", "driving"),
-                },
+        for v, volunteer in enumerate(volunteers):
+            stops = solution.routes[v]
+            assignments[volunteer["id"]] = stops
+
+            constraints = {
+                "max_time": volunteer.get("available_hours", 8) * 60,
+                "transport_mode": volunteer.get("transport_mode", "driving"),
+            }
+            nodes = [v] + [num_volunteers + i for i in stops]
+            route = self._route_result(
+                (volunteer["lat"], volunteer["lon"]),
+                locations,
+                list(range(1, len(nodes))),
+                dist[np.ix_(nodes, nodes)],
+                constraints,
+                members=stops,
             )
 
-            volunteer_routes[volunteer_id] = {
+            schedule = solution.schedules[v] or []
+            volunteer_routes[volunteer["id"]] = {
                 "volunteer_name": volunteer.get("name"),
                 "route": route,
-                "individuals_count": len(assigned_individuals),
-                "estimated_duration": route["total_time"],
+                "individuals_count": len(stops),
+                "estimated_duration": int(round(schedule[-1][2] - shift_start[v]))
+                if schedule
+                else 0,
+                "schedule": [
+                    {
+                        "id": locations.ids[i],
+                        "arrival": self._format_minutes(arrival),
+                        "start": self._format_minutes(start),
+                        "depart": self._format_minutes(depart),
+                    }
+                    for i, (arrival, start, depart) in zip(stops, schedule)
+                ],
                 "workload_score": self._calculate_workload_score(route),
             }
 
         return {
             "date": date.isoformat(),
             "volunteer_routes": volunteer_routes,
-            "total_individuals": len(individuals),
-            "coverage": self._calculate_coverage(assignments, individuals),
+            "total_individuals": len(locations),
+            "unassigned": [locations.ids[i] for i in solution.unassigned],
+            "coverage": self._calculate_coverage(assignments, len(locations)),
             "balance_score": self._calculate_balance_score(volunteer_routes),
+            "solver_stats": solution.stats,
+        }
+
+    def create_route_session(
+        self,
+        start_location: Tuple[float, float],
+        destinations: List[Dict],
+        constraints: Dict = None,
+        date: datetime = None,
+        room: Optional[str] = None,
+        time_budget_ms: Optional[float] = None,
+    ) -> Dict:
+        """
+        Solve a multi-stop route and keep it server-side for incremental
+        changes (see apply_route_changes).
+
+        Args:
+            start_location: (lat, lon) starting point
+            destinations: List of destination dicts with id, lat, lon, hours,
+                wait_time
+            constraints: Optional constraints (transport_mode, start_time,
+                max_time in minutes)
+            date: Day whose opening hours apply
+            room: SocketIO room that receives route updates
+            time_budget_ms: Budget for the initial solve
+
+        Returns:
+            Session id, version and the current route
+        """
+        constraints = constraints or {}
+        date = date or datetime.now()
+        transport_mode = constraints.get("transport_mode", "driving")
+        day_name = date.strftime("%A").lower()
+        locations = LocationStore.from_dicts(destinations)
+
+        dist = self._distance_matrix(
+            np.vstack([start_location, locations.coords]),
+            transport_mode=transport_mode,
+        )
+        search = self._search_tsp(dist, self._deadline(time_budget_ms))
+
+        start_minute = self._parse_minutes(constraints.get("start_time", "09:00"))
+        max_time = constraints.get("max_time")
+        session = RouteSession(
+            start_location,
+            [dict(dest, id=locations.ids[i]) for i, dest in enumerate(destinations)],
+            search.tour,
+            dist,
+            distance_fn=lambda a, b: self._distance_matrix(a, b, transport_mode),
+            window_fn=lambda hours: self._time_window(hours, day_name),
+            minutes_per_km=60.0 / TRANSPORT_SPEEDS_KMH.get(transport_mode, 25),
+            start_minute=start_minute,
+            shift_end=start_minute + max_time if max_time else np.inf,
+            constraints=constraints,
+            room=room,
+        )
+        self.route_sessions.add(session)
+        return self._session_result(session)
+
+    def apply_route_changes(self, session_id: str, changes: List[Dict]) -> Dict:
+        """
+        Apply insert/remove/delay changes to a route session and repair it
+        locally instead of re-solving.
+
+        Raises:
+            KeyError: Unknown or expired session, or a change names a stop
+                that is not in the route
+            ValueError: Invalid change
+        """
+        session = self.route_sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"Route session {session_id} not found")
+
+        with session.lock:
+            started = time.perf_counter()
+            summaries = session.apply_all(changes)
+            repair_ms = (time.perf_counter() - started) * 1000
+            result = self._session_result(session)
+
+        result["changes"] = summaries
+        result["repair_ms"] = round(repair_ms, 2)
+        return result
+
+    def get_route_session(self, session_id: str) -> Optional[Dict]:
+        """Current state of a route session, or None if unknown/expired."""
+        session = self.route_sessions.get(session_id)
+        if session is None:
+            return None
+        with session.lock:
+            return self._session_result(session)
+
+    def _session_result(self, session: RouteSession) -> Dict:
+        """Route response for a session's current order."""
+        locations = LocationStore.from_dicts(session.stops)
+        route = self._route_result(
+            tuple(session.coords[0]),
+            locations,
+            list(session.order),
+            session.dist,
+            session.constraints,
+        )
+        return {
+            "session_id": session.session_id,
+            "version": session.version,
+            "room": session.room,
+            "route": route,
+            "schedule": [
+                {
+                    "id": locations.ids[node - 1],
+                    "arrival": self._format_minutes(arrival),
+                    "start": self._format_minutes(start),
+                    "depart": self._format_minutes(depart),
+                }
+                for node, (arrival, start, depart) in zip(
+                    session.order, session.schedule()
+                )
+            ],
+            "unserved": session.stop_ids(session.unserved),
         }
 
     def score_resource_accessibility(
@@ -165,6 +550,10 @@ class RouteOptimizer:
         individual_location: Tuple[float, float],
         resources: List[Dict],
         individual_profile: Dict = None,
+        max_distance_km: Optional[float] = None,
+        departure: Optional[datetime] = None,
+        max_travel_minutes: Optional[float] = None,
+        travel_mode: str = "walking",
     ) -> List[Dict]:
         """
         Score resources based on accessibility for an individual.
@@ -173,23 +562,71 @@ class RouteOptimizer:
             individual_location: (lat, lon) of individual
             resources: List of resource locations
             individual_profile: Optional profile with mobility constraints
+            max_distance_km: Optional radius; farther resources are skipped
+            departure: Departure time for timetable-based public transport
+                (default now; used when a GTFS feed is loaded)
+            max_travel_minutes: Optional budget; resources whose isochrone
+                for travel_mode does not cover the individual are skipped
+            travel_mode: Transport mode for max_travel_minutes
 
         Returns:
             Resources sorted by accessibility score
         """
         individual_profile = individual_profile or {}
 
-        scored_resources = []
+        if not resources:
+            return []
 
-        for resource in resources:
-            resource_loc = (resource["lat"], resource["lon"])
+        # Calculate distances to every resource in one pass
+        coords = [(resource["lat"], resource["lon"]) for resource in resources]
+        if max_distance_km is not None:
+            indices, distances = get_spatial_index(coords).within_radius(
+                [individual_location], max_distance_km
+            )[0]
+            if self.road_network is not None and len(indices):
+                # Straight-line radius is a lower bound; re-check on the network
+                distances = self._distance_matrix(
+                    [individual_location], [coords[i] for i in indices], "walking"
+                )[0]
+                keep = np.argsort(distances, kind="stable")
+                keep = keep[distances[keep] <= max_distance_km]
+                indices, distances = indices[keep], distances[keep]
+        else:
+            indices = range(len(resources))
+            distances = self._distance_matrix(
+                [individual_location], coords, "walking"
+            )[0]
+
+        if max_travel_minutes is not None and len(indices):
+            reach = self.isochrones.travel_minutes_to(
+                [resources[i] for i in indices],
+                [individual_location],
+                travel_mode,
+                max_travel_minutes,
+                departure,
+            )[0]
+            keep = reach <= max_travel_minutes
+            indices = np.asarray(indices)[keep]
+            distances = np.asarray(distances)[keep]
+
+        transit = self._transit_minutes(
+            [individual_location], [coords[i] for i in indices], departure
+        )
 
-            # Calculate distance
-            distance = self._haversine_distance(individual_location, resource_loc)
+        scored_resources = []
+
+        for n, (i, distance) in enumerate(zip(indices, distances)):
+            resource = resources[i]
+            resource_loc = coords[i]
+            distance = float(distance)
 
             # Get transport options
             transport_options = self._get_transport_options(
-                individual_location, resource_loc, individual_profile
+                individual_location,
+                resource_loc,
+                individual_profile,
+                distance,
+                None if transit is None else float(transit[0, n]),
             )
 
             # Calculate accessibility score
@@ -223,13 +660,300 @@ class RouteOptimizer:
 
         return scored_resources
 
-    def suggest_visit_times(self, location: Dict, date: datetime = None) -> List[Dict]:
+    def score_accessibility_batch(
+        self,
+        individual_locations: List[Tuple[float, float]],
+        resources: List[Dict],
+        profiles: Optional[List[Dict]] = None,
+        top_k: int = 5,
+        max_distance_km: Optional[float] = None,
+        departure: Optional[datetime] = None,
+        max_travel_minutes: Optional[float] = None,
+        travel_mode: str = "walking",
+    ) -> Dict[str, np.ndarray]:
+        """
+        Score many individuals against many resources in one vectorized pass.
+
+        Mirrors score_resource_accessibility (same scores, times and costs)
+        without building per-resource transport option dicts.
+
+        Args:
+            individual_locations: P (lat, lon) pairs
+            resources: R resource dicts
+            profiles: Optional per-individual profiles (mobility_issues)
+            top_k: Resources kept per individual
+            max_distance_km: Optional radius; farther resources are skipped
+            departure: Departure time for timetable-based public transport
+            max_travel_minutes: Optional isochrone budget (see
+                score_resource_accessibility)
+            travel_mode: Transport mode for max_travel_minutes
+
+        Returns:
+            (P, k) arrays: index (resource index, -1 if fewer matches),
+            accessibility_score, distance_km, estimated_time (-1 if no
+            transport option), estimated_cost
+        """
+        num_individuals = len(individual_locations)
+        num_resources = len(resources)
+        k = max(0, min(int(top_k), num_resources))
+        profiles = profiles or [{}] * num_individuals
+
+        coords = coords_array([(r["lat"], r["lon"]) for r in resources])
+        mobility = np.array(
+            [bool((p or {}).get("mobility_issues")) for p in profiles], dtype=bool
+        )
+        bonus = 0.1 * np.array(
+            [bool(r.get("wheelchair_accessible")) for r in resources], dtype=float
+        ) + 0.1 * np.array(
+            [bool(r.get("public_transport_nearby")) for r in resources], dtype=float
+        )
+
+        result = {
+            "index": np.full((num_individuals, k), -1, dtype=int),
+            "accessibility_score": np.zeros((num_individuals, k)),
+            "distance_km": np.zeros((num_individuals, k)),
+            "estimated_time": np.zeros((num_individuals, k), dtype=int),
+            "estimated_cost": np.zeros((num_individuals, k)),
+        }
+        if k == 0:
+            return result
+
+        chunk = max(1, BATCH_SCORE_CELLS // num_resources)
+        for lo in range(0, num_individuals, chunk):
+            hi = min(lo + chunk, num_individuals)
+            distance = self._distance_matrix(
+                individual_locations[lo:hi], coords, "walking"
+            )
+            score, travel_time, cost = self._accessibility_arrays(
+                distance,
+                mobility[lo:hi, None],
+                bonus,
+                self._transit_minutes(individual_locations[lo:hi], coords, departure),
+            )
+            if max_travel_minutes is not None:
+                reach = self.isochrones.travel_minutes_to(
+                    resources,
+                    individual_locations[lo:hi],
+                    travel_mode,
+                    max_travel_minutes,
+                    departure,
+                )
+                score = np.where(reach <= max_travel_minutes, score, -np.inf)
+            tie_rank = None
+            if max_distance_km is not None:
+                score = np.where(distance <= max_distance_km, score, -np.inf)
+                # Radius queries visit resources nearest first
+                tie_rank = np.argsort(
+                    np.argsort(distance, axis=1, kind="stable"), axis=1
+                )
+
+            top = self._top_k_indices(score, k, tie_rank)
+            rows = np.arange(hi - lo)[:, None]
+            safe = np.maximum(top, 0)
+            result["index"][lo:hi] = top
+            result["accessibility_score"][lo:hi] = np.round(score[rows, safe], 3)
+            result["distance_km"][lo:hi] = np.round(distance[rows, safe], 2)
+            result["estimated_time"][lo:hi] = travel_time[rows, safe]
+            result["estimated_cost"][lo:hi] = cost[rows, safe]
+
+        missing = result["index"] < 0
+        for key in ("accessibility_score", "distance_km", "estimated_time"):
+            result[key][missing] = 0
+        result["estimated_cost"][missing] = 0.0
+
+        return result
+
+    def _accessibility_arrays(
+        self,
+        distance: np.ndarray,
+        mobility: np.ndarray,
+        bonus: np.ndarray,
+        transit_minutes: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized _get_transport_options + _calculate_accessibility_score.
+
+        Returns:
+            (score, estimated_time, estimated_cost) for the first transport
+            option, as in score_resource_accessibility; time is -1 and cost
+            0 where no option exists
+        """
+        walk = distance <= 3
+        cycle = (distance <= 10) & ~mobility
+        transit_cost = 2.5 + np.maximum(0, (distance - 5) * 0.3)
+        if transit_minutes is None:
+            # Without a timetable public transport is always offered
+            transit = np.ones(distance.shape, dtype=bool)
+            transit_time = distance / TRANSPORT_SPEEDS_KMH["public_transport"] * 60
+        else:
+            transit = np.isfinite(transit_minutes)
+            transit_time = np.where(transit, transit_minutes, 0.0)
+
+        score = 1.0 - np.where(distance > 10, 0.3, np.where(distance > 5, 0.15, 0.0))
+
+        num_options = walk.astype(int) + transit + cycle
+        score -= np.where(num_options == 0, 0.4, np.where(num_options == 1, 0.1, 0.0))
+        min_cost = np.where(walk | cycle, 0.0, np.where(transit, transit_cost, 0.0))
+        score -= np.where(min_cost > 5, 0.2, np.where(min_cost > 2, 0.1, 0.0))
+        score -= np.where(mobility & ~transit, 0.3, 0.0)
+        score = np.clip(score + bonus, 0.0, 1.0)
+
+        travel_time = np.where(
+            walk,
+            distance / TRANSPORT_SPEEDS_KMH["walking"] * 60,
+            np.where(
+                transit,
+                transit_time,
+                np.where(cycle, distance / TRANSPORT_SPEEDS_KMH["cycling"] * 60, -1),
+            ),
+        ).astype(int)
+        cost = np.where(walk | ~transit, 0.0, transit_cost)
+
+        return score, travel_time, cost
+
+    def _raster_minutes(
+        self,
+        location: Tuple[float, float],
+        points: np.ndarray,
+        transport_mode: str,
+        when: Optional[datetime] = None,
+        inbound: bool = False,
+    ) -> np.ndarray:
+        """
+        Travel minutes from a location to many points, or with inbound from
+        the points to it (isochrone rasters). For public transport, when is
+        the departure, or the arrival deadline if inbound.
+        """
+
+        def distances(mode: str) -> np.ndarray:
+            if inbound:
+                return self._distances_to(points, location, mode)
+            return self._distance_matrix([location], points, mode)[0]
+
+        if transport_mode == "public_transport" and self.transit_router is not None:
+            walking = distances("walking") / TRANSPORT_SPEEDS_KMH["walking"] * 60
+            when = when or datetime.now()
+            if inbound:
+                transit = self.transit_router.travel_minutes_to(points, location, when)
+            else:
+                transit = self.transit_router.travel_minutes(location, points, when)
+            return np.minimum(transit, walking)
+
+        speed = TRANSPORT_SPEEDS_KMH.get(transport_mode, 25)
+        return distances(transport_mode) / speed * 60
+
+    def _distances_to(
+        self,
+        points: np.ndarray,
+        destination: Tuple[float, float],
+        transport_mode: str,
+    ) -> np.ndarray:
+        """Distances (km) from many points to one destination."""
+        if self.road_network is None:
+            return haversine_matrix(points, [destination])[:, 0]
+        return self.road_network.distances_to(points, destination, transport_mode)
+
+    def compute_isochrones(
+        self,
+        locations: List[Dict],
+        transport_mode: str = "walking",
+        minutes: float = 30,
+        departure: Optional[datetime] = None,
+        cell_km: Optional[float] = None,
+        output: str = "polygon",
+    ) -> List[Dict]:
+        """
+        Areas reachable from each location within a travel-time budget.
+
+        Args:
+            locations: Dicts with id, lat, lon
+            transport_mode: Transport mode
+            minutes: Travel-time budget
+            departure: Departure time (public transport)
+            cell_km: Raster cell size in km (default Config.ISOCHRONE_CELL_KM)
+            output: "polygon", "raster" or "both"
+
+        Returns:
+            One isochrone per location (cached; see IsochroneCache)
+        """
+        return [
+            self.isochrones.isochrone(
+                location, transport_mode, minutes, departure, cell_km, output
+            )
+            for location in locations
+        ]
+
+    def _transit_minutes(
+        self,
+        origins: List[Tuple[float, float]],
+        destinations: List[Tuple[float, float]],
+        departure: Optional[datetime] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Timetable travel minutes (origins × destinations, inf if unreachable),
+        or None when no GTFS feed is loaded.
+        """
+        if self.transit_router is None:
+            return None
+        departure = departure or datetime.now()
+        minutes = np.full((len(origins), len(destinations)), np.inf)
+        if len(destinations):
+            for row, origin in enumerate(origins):
+                minutes[row] = self.transit_router.travel_minutes(
+                    origin, destinations, departure
+                )
+        return minutes
+
+    @staticmethod
+    def _top_k_indices(
+        scores: np.ndarray, k: int, tie_rank: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Column indices of the k best scores per row, best first.
+
+        Ties on the rounded score are broken by tie_rank (default: column
+        order), matching the stable sort of score_resource_accessibility.
+        Excluded (-inf) entries become -1.
+        """
+        num_columns = scores.shape[1]
+        if tie_rank is None:
+            tie_rank = np.arange(num_columns)
+        finite = np.isfinite(scores)
+        key = np.where(
+            finite,
+            np.round(np.where(finite, scores, 0) * 1000) * num_columns
+            + (num_columns - 1 - tie_rank),
+            -1.0,
+        )
+
+        if k < num_columns:
+            candidates = np.argpartition(-key, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(num_columns), key.shape)
+
+        rows = np.arange(len(key))[:, None]
+        order = np.argsort(-key[rows, candidates], axis=1)
+        top = candidates[rows, order]
+        return np.where(key[rows, top] >= 0, top, -1)
+
+    def suggest_visit_times(
+        self,
+        location: Dict,
+        date: datetime = None,
+        origin: Optional[Tuple[float, float]] = None,
+    ) -> List[Dict]:
         """
         Suggest best times to visit based on hours and wait times.
 
+        Locations with recorded check-ins get slots across their opening
+        hours scored by the observed wait for that weekday and hour; others
+        get typical-crowd slots.
+
         Args:
-            location: Location dict with hours and wait time data
+            location: Location dict with id, hours and wait time data
             date: Target date
+            origin: Optional (lat, lon) to plan public transport to each slot
+                (requires a GTFS feed and the location's lat/lon)
 
         Returns:
             List of suggested time slots with scores
@@ -249,7 +973,32 @@ class RouteOptimizer:
                 }
             ]
 
-        # Generate time slots
+        # Slots from observed waits when the location has check-ins, else
+        # typical crowd patterns
+        profile = self.visit_demand.day_profile(
+            location.get("id"),
+            date.weekday(),
+            location.get("wait_time", location.get("wait_time_avg", 0)) or 0,
+        )
+        if profile is not None:
+            suggestions = self._observed_visit_slots(profile, day_hours, day_name)
+        else:
+            suggestions = self._typical_visit_slots(day_hours)
+
+        if (
+            origin is not None
+            and self.transit_router is not None
+            and "lat" in location
+            and "lon" in location
+        ):
+            destination = (location["lat"], location["lon"])
+            for suggestion in suggestions:
+                self._add_transit_plan(suggestion, origin, destination, date)
+
+        return suggestions
+
+    def _typical_visit_slots(self, day_hours: Dict) -> List[Dict]:
+        """Fixed slots scored by typical crowd patterns."""
         suggestions = []
         open_time = datetime.strptime(day_hours["open"], "%H:%M").time()
         close_time = datetime.strptime(day_hours["close"], "%H:%M").time()
@@ -302,11 +1051,111 @@ class RouteOptimizer:
 
         return suggestions
 
+    def _observed_visit_slots(
+        self, profile: DayProfile, day_hours: Dict, day_name: str
+    ) -> List[Dict]:
+        """Slots across the opening hours scored by expected wait."""
+        open_minute, close_minute = self._opening_minutes(day_hours)
+
+        slots = []
+        for start in range(open_minute, close_minute, VISIT_SLOT_MINUTES):
+            end = min(start + VISIT_SLOT_MINUTES, close_minute)
+            hours = np.arange(start // 60, (end - 1) // 60 + 1) % 24
+            occupancy = profile.occupancy[hours]
+            slots.append(
+                (
+                    start,
+                    end,
+                    float(profile.wait_minutes[hours].mean()),
+                    int(profile.checkins[hours].sum()),
+                    float(np.nanmean(occupancy))
+                    if np.isfinite(occupancy).any()
+                    else None,
+                )
+            )
+        if not slots:
+            return []
+
+        best_wait = min(slot[2] for slot in slots)
+        suggestions = []
+        for start, end, wait, checkins, occupancy in slots:
+            score = 1.0 / (1.0 + wait / VISIT_WAIT_SCALE_MINUTES)
+            if checkins >= VISIT_MIN_CHECKINS:
+                reason = f"{checkins} check-ins observed on {day_name.capitalize()}s"
+            else:
+                reason = "Few check-ins at this time - estimated from the average wait"
+            if occupancy is not None:
+                score *= 1.0 - VISIT_OCCUPANCY_WEIGHT * occupancy
+                reason += f"; beds usually {occupancy:.0%} taken"
+
+            suggestions.append(
+                {
+                    "time_slot": f"{self._format_minutes(start)} - {self._format_minutes(end)}",
+                    "score": round(score, 2),
+                    "wait_time_estimate": f"{self._wait_label(wait)} (~{wait:.0f} min)",
+                    "expected_wait_minutes": round(wait, 1),
+                    "checkins": checkins,
+                    "reason": reason,
+                    "recommended": wait <= best_wait + VISIT_RECOMMEND_MARGIN_MINUTES,
+                }
+            )
+
+        return suggestions
+
+    @staticmethod
+    def _wait_label(wait_minutes: float) -> str:
+        if wait_minutes < 10:
+            return "Low"
+        if wait_minutes < 20:
+            return "Low-Medium"
+        if wait_minutes < 30:
+            return "Medium"
+        return "High"
+
+    def _add_transit_plan(
+        self,
+        suggestion: Dict,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        date: datetime,
+    ):
+        """Attach a timetable trip arriving for a visit slot; demote if none."""
+        slot_start, slot_end = (
+            self._parse_minutes(t.strip()) for t in suggestion["time_slot"].split("-")
+        )
+        if slot_end <= slot_start:
+            slot_end += 24 * 60  # Slot of overnight hours ending after midnight
+        day = datetime.combine(date.date(), datetime.min.time())
+
+        # Leave early enough for the speed estimate plus a wait for the vehicle
+        distance = self._travel(origin, destination, "public_transport")[0]
+        lead = self._estimate_travel_time(distance, "public_transport") + 15
+        departure = day + timedelta(minutes=max(slot_start - lead, 0))
+        arrival = self.transit_router.earliest_arrival(origin, destination, departure)
+
+        if arrival is None or arrival > day + timedelta(minutes=slot_end):
+            suggestion["transit"] = None
+            suggestion["score"] = round(max(suggestion["score"] - 0.3, 0.0), 2)
+            suggestion["recommended"] = False
+            suggestion["reason"] += "; no public transport arrives in time"
+            return
+
+        suggestion["transit"] = {
+            "depart": departure.strftime("%H:%M"),
+            "arrive": arrival.strftime("%H:%M"),
+            "travel_minutes": int((arrival - departure).total_seconds() // 60),
+        }
+
     def identify_service_gaps(
         self,
         service_locations: List[Dict],
         coverage_area: Dict,
         population_density: List[Dict] = None,
+        grid_size: float = 2.0,
+        output: str = "detailed",
+        transport_mode: str = "walking",
+        max_minutes: Optional[float] = None,
+        departure: Optional[datetime] = None,
     ) -> Dict:
         """
         Identify underserved areas lacking service coverage.
@@ -314,161 +1163,239 @@ class RouteOptimizer:
         Args:
             service_locations: List of existing service locations
             coverage_area: Dict with bounds (min_lat, max_lat, min_lon, max_lon)
-            population_density: Optional population density data
+            population_density: Optional list of {lat, lon, population} points
+            grid_size: Grid cell size in km
+            output: "detailed" for per-gap dicts, "raster" for compact arrays
+            transport_mode: Transport mode for max_minutes
+            max_minutes: Optional travel-time budget; coverage then comes from
+                service isochrones instead of straight-line distance, and
+                cells no service reaches within the budget are gaps
+            departure: Departure time (public transport)
 
         Returns:
             Analysis of service gaps and recommendations
         """
-        # Create grid of coverage area
-        grid = self._create_coverage_grid(coverage_area)
+        raster = self._coverage_raster(
+            service_locations,
+            coverage_area,
+            population_density,
+            grid_size,
+            transport_mode,
+            max_minutes,
+            departure,
+        )
 
-        # Calculate coverage for each grid cell
-        coverage_map = self._calculate_coverage_map(grid, service_locations)
+        if output == "raster":
+            return self._raster_summary(raster, service_locations)
 
-        # Identify gaps
-        gaps = []
-        for cell in grid:
-            if coverage_map[cell["id"]]["coverage_score"] < 0.5:
-                gaps.append(
-                    {
-                        "location": cell["center"],
-                        "coverage_score": coverage_map[cell["id"]]["coverage_score"],
-                        "nearest_service": coverage_map[cell["id"]]["nearest_service"],
-                        "distance_to_nearest": coverage_map[cell["id"]]["distance"],
-                        "population_estimate": cell.get("population", 0),
-                        "priority": self._calculate_gap_priority(
-                            cell, coverage_map[cell["id"]]
-                        ),
-                    }
-                )
+        # Identify gaps, highest priority first (stable for equal priorities)
+        gap_cells = np.flatnonzero(raster["coverage"].ravel() < 0.5)
+        gap_cells = gap_cells[
+            np.argsort(-raster["priority"].ravel()[gap_cells], kind="stable")
+        ]
 
-        # Sort by priority
-        gaps.sort(key=lambda x: x["priority"], reverse=True)
+        gaps = []
+        for cell in gap_cells:
+            row, col = divmod(int(cell), raster["shape"][1])
+            nearest = int(raster["nearest_service"][row, col])
+            gaps.append(
+                {
+                    "location": (
+                        float(raster["lat_values"][row]),
+                        float(raster["lon_values"][col]),
+                    ),
+                    "coverage_score": float(raster["coverage"][row, col]),
+                    "nearest_service": service_locations[nearest]
+                    if nearest >= 0
+                    else None,
+                    "distance_to_nearest": float(raster["distance"][row, col]),
+                    "population_estimate": int(round(raster["population"][row, col])),
+                    "priority": float(raster["priority"][row, col]),
+                }
+            )
 
         return {
             "total_gaps": len(gaps),
             "high_priority_gaps": [g for g in gaps if g["priority"] > 0.7],
-            "coverage_percentage": self._calculate_overall_coverage(coverage_map),
+            "coverage_percentage": raster["coverage_percentage"],
             "recommendations": self._generate_gap_recommendations(gaps[:5]),
             "gap_details": gaps,
         }
 
-    def _solve_tsp(
-        self, start: Tuple[float, float], locations: List[Location], constraints: Dict
-    ) -> List[Location]:
-        """Solve Traveling Salesman Problem using nearest neighbor + 2-opt."""
-        if not locations:
-            return []
+    def _route_result(
+        self,
+        start: Tuple[float, float],
+        locations: LocationStore,
+        tour: List[int],
+        dist: np.ndarray,
+        constraints: Dict,
+        search: Optional[TSPSearch] = None,
+        members: Optional[List[int]] = None,
+    ) -> Dict:
+        """
+        Build the route response for a tour over dist (node 0 = start).
+
+        Node n is location n - 1, or members[n - 1] when dist only covers
+        some of the locations. Alternatives are only generated when the TSP
+        search state is given.
+        """
+        order = [node - 1 for node in tour]
+        if members is not None:
+            order = [members[i] for i in order]
 
-        # Nearest neighbor construction
-        unvisited = locations.copy()
-        route = []
-        current = start
+        # Build detailed route
+        route = self._build_route(
+            start,
+            locations,
+            order,
+            constraints,
+            legs=dist[[0] + tour[:-1], tour] if tour else None,
+        )
 
-        while unvisited:
-            # Find nearest unvisited location
-            nearest = min(
-                unvisited,
-                key=lambda loc: self._haversine_distance(current, (loc.lat, loc.lon)),
+        # Calculate scores
+        return {
+            "route": route,
+            "order": [locations.ids[i] for i in order],
+            "total_distance": route.total_distance,
+            "total_time": route.total_time,
+            "estimated_cost": route.cost,
+            "accessibility_score": route.accessibility_score,
+            "waypoints": route.waypoints,
+            "transport_modes": route.transport_modes,
+            "alternatives": self._generate_alternatives(
+                start, locations, constraints, search
             )
-            route.append(nearest)
-            unvisited.remove(nearest)
-            current = (nearest.lat, nearest.lon)
+            if search is not None
+            else [],
+        }
 
-        # Improve with 2-opt
-        route = self._two_opt_improve(start, route)
+    def _solve_tsp(
+        self, dist: np.ndarray, deadline: Optional[float] = None
+    ) -> List[int]:
+        """
+        Solve open-path TSP using nearest neighbor + 2-opt.
 
-        return route
+        Node 0 of the distance matrix is the fixed start; the returned tour
+        lists the remaining node indices in visiting order.
+        """
+        return self._search_tsp(dist, deadline).tour
+
+    def _search_tsp(
+        self, dist: np.ndarray, deadline: Optional[float] = None
+    ) -> TSPSearch:
+        """Solve the TSP and keep the search state for alternatives."""
+        started = time.perf_counter()
+        tour = self._nearest_neighbor_tour(dist)
+        search_dist = symmetric(dist)
+        d = search_dist.tolist()
+        neighbors = nearest_neighbors(search_dist, Config.ROUTE_NEIGHBOR_K)
+
+        # Improve with 2-opt; moves are scored on symmetric distances
+        improved = self._two_opt_improve(tour, d, neighbors, deadline=deadline)
+        if search_dist is not dist and improved:
+            # Directed (one-way) matrix: polish with Or-opt moves that keep
+            # segment direction, which are exact there, and keep the greedy
+            # tour if it is still shorter
+            path = [0] + improved
+            or_opt(
+                path,
+                dist.tolist(),
+                nearest_neighbors(dist, Config.ROUTE_NEIGHBOR_K),
+                deadline=deadline,
+                reverse=False,
+            )
+            improved = path[1:]
+            if self._tour_length(dist, tour) < self._tour_length(dist, improved):
+                improved = tour
+        tour = improved
+
+        return TSPSearch(
+            dist, d, neighbors, tour, time.perf_counter() - started, deadline
+        )
+
+    @staticmethod
+    def _tour_length(dist: np.ndarray, tour: List[int]) -> float:
+        """Length of an open tour from node 0."""
+        return float(dist[[0] + tour[:-1], tour].sum()) if tour else 0.0
+
+    def _nearest_neighbor_tour(self, dist: np.ndarray) -> List[int]:
+        """Greedy open tour from node 0."""
+        n = len(dist)
+        if n <= 1:
+            return []
+
+        visited = np.zeros(n, dtype=bool)
+        visited[0] = True
+        tour = []
+        current = 0
+
+        for _ in range(n - 1):
+            row = np.where(visited, np.inf, dist[current])
+            nearest = int(np.argmin(row))
+            tour.append(nearest)
+            visited[nearest] = True
+            current = nearest
+
+        return tour
 
     def _two_opt_improve(
         self,
-        start: Tuple[float, float],
-        route: List[Location],
+        tour: List[int],
+        d: List[List[float]],
+        neighbors: List[List[int]],
         max_iterations: int = 100,
-    ) -> List[Location]:
-        """Improve route using 2-opt algorithm."""
-        improved = True
-        iterations = 0
-
-        while improved and iterations < max_iterations:
-            improved = False
-            iterations += 1
-
-            for i in range(len(route) - 1):
-                for j in range(i + 2, len(route)):
-                    # Calculate current distance
-                    current_dist = (
-                        self._route_segment_distance(start, route[: i + 1])
-                        + self._route_segment_distance(
-                            (route[i].lat, route[i].lon), route[i + 1 : j + 1]
-                        )
-                        + self._route_segment_distance(
-                            (route[j].lat, route[j].lon), route[j + 1 :]
-                        )
-                    )
-
-                    # Reverse segment and calculate new distance
-                    new_route = (
-                        route[: i + 1] + route[i + 1 : j + 1][::-1] + route[j + 1 :]
-                    )
-                    new_dist = (
-                        self._route_segment_distance(start, new_route[: i + 1])
-                        + self._route_segment_distance(
-                            (new_route[i].lat, new_route[i].lon),
-                            new_route[i + 1 : j + 1],
-                        )
-                        + self._route_segment_distance(
-                            (new_route[j].lat, new_route[j].lon), new_route[j + 1 :]
-                        )
-                    )
-
-                    if new_dist < current_dist:
-                        route = new_route
-                        improved = True
-
-        return route
+        deadline: Optional[float] = None,
+    ) -> List[int]:
+        """Improve route using neighbor-list 2-opt and Or-opt moves."""
+        if len(tour) < 2:
+            return tour
+
+        path = [0] + list(tour)
+        improve_path(path, d, neighbors, max_iterations, deadline)
+
+        return path[1:]
 
     def _build_route(
-        self, start: Tuple[float, float], locations: List[Location], constraints: Dict
+        self,
+        start: Tuple[float, float],
+        locations: LocationStore,
+        order: List[int],
+        constraints: Dict,
+        legs: Optional[np.ndarray] = None,
+        with_locations: bool = True,
     ) -> Route:
-        """Build detailed route with all metadata."""
-        waypoints = [start]
-        total_distance = 0.0
-        total_time = 0
-        transport_modes = []
-        total_cost = 0.0
-
-        current = start
-        for location in locations:
-            dest = (location.lat, location.lon)
-
-            # Calculate segment
-            distance = self._haversine_distance(current, dest)
-            transport = constraints.get("transport_mode", "driving")
-            time = self._estimate_travel_time(distance, transport)
-            cost = self._estimate_travel_cost(distance, transport)
-
-            total_distance += distance
-            total_time += time + location.wait_time_avg
-            total_cost += cost
-            transport_modes.append(transport)
-            waypoints.append(dest)
-
-            current = dest
+        """
+        Build detailed route with all metadata for locations visited in order.
+
+        Location objects are only materialized when with_locations is set.
+        """
+        coords = locations.coords[order]
+        if legs is None:
+            legs = haversine_paired(np.vstack([start, coords])[:-1], coords)
+        legs = np.asarray(legs, dtype=float)
+
+        # Per-leg time and cost; cumulative sums add in visiting order
+        transport = constraints.get("transport_mode", "driving")
+        times = (legs / TRANSPORT_SPEEDS_KMH.get(transport, 25) * 60).astype(int)
+        costs = self._estimate_travel_costs(legs, transport)
+        total_distance = float(np.cumsum(legs)[-1]) if len(legs) else 0.0
+        total_cost = float(np.cumsum(costs)[-1]) if len(costs) else 0.0
+        total_time = int(times.sum() + locations.wait_time[order].sum())
+        transport_modes = [transport] * len(order)
 
         # Calculate accessibility score
         accessibility = self._calculate_route_accessibility(
-            locations, transport_modes, constraints
+            locations, order, transport_modes, constraints
         )
 
         return Route(
-            locations=locations,
+            locations=locations.locations(order) if with_locations else [],
             total_distance=round(total_distance, 2),
             total_time=total_time,
             transport_modes=transport_modes,
             cost=round(total_cost, 2),
             accessibility_score=round(accessibility, 3),
-            waypoints=waypoints,
+            waypoints=[start] + [tuple(point) for point in coords.tolist()],
         )
 
     def _haversine_distance(
@@ -494,18 +1421,101 @@ class RouteOptimizer:
 
         return R * c
 
-    def _estimate_travel_time(self, distance_km: float, transport_mode: str) -> int:
-        """Estimate travel time in minutes."""
-        speeds = {
-            "walking": 5,  # km/h
-            "cycling": 15,
-            "public_transport": 25,
-            "driving": 40,
+    def estimate_travel(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        transport_mode: str = "public_transport",
+    ) -> Dict:
+        """
+        Estimate distance, travel time and cost between two points.
+
+        Distances and travel times are served from the distance cache when
+        the same pair and mode was seen before.
+        """
+        distance, time = self._travel(origin, destination, transport_mode)
+        return {
+            "distance_km": distance,
+            "time": time,
+            "cost": self._estimate_travel_cost(distance, transport_mode),
         }
 
-        speed = speeds.get(transport_mode, 25)
+    def _travel(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        transport_mode: str,
+    ) -> Tuple[float, int]:
+        """Get (distance_km, travel_minutes) for a pair, using the cache."""
+        cache_mode = self._cache_mode(transport_mode)
+        cached = self.distance_cache.get(origin, destination, cache_mode)
+        if cached is not None:
+            return cached[0], int(cached[1])
+
+        if self.road_network is not None:
+            distance = self.road_network.route_distance(
+                origin, destination, transport_mode
+            )
+        else:
+            distance = float(self._haversine_distance(origin, destination))
+        time = self._estimate_travel_time(distance, transport_mode)
+        self.distance_cache.set(origin, destination, cache_mode, distance, time)
+
+        return distance, time
+
+    def _distance_matrix(
+        self,
+        points_a: List[Tuple[float, float]],
+        points_b: Optional[List[Tuple[float, float]]] = None,
+        transport_mode: str = "driving",
+    ) -> np.ndarray:
+        """
+        Pairwise distances (km) on the road network if loaded, else Haversine.
+
+        Road-network blocks of up to MATRIX_CACHE_MAX_CELLS pairs go through
+        the distance cache: only origins with a missing pair are routed, and
+        their rows are stored. Haversine is cheaper than a cache lookup.
+        """
+        if self.road_network is None:
+            return haversine_matrix(points_a, points_b)
+
+        a = coords_array(points_a)
+        b = a if points_b is None else coords_array(points_b)
+        if not len(a) or not len(b) or len(a) * len(b) > MATRIX_CACHE_MAX_CELLS:
+            return self.road_network.distance_matrix(a, b, transport_mode)
+
+        cache_mode = self._cache_mode(transport_mode)
+        dist = self.distance_cache.get_many(a, b, cache_mode)
+        missing = np.isnan(dist).any(axis=1)
+        if missing.any():
+            rows = self.road_network.distance_matrix(a[missing], b, transport_mode)
+            dist[missing] = rows
+            speed = TRANSPORT_SPEEDS_KMH.get(transport_mode, 25)
+            minutes = (rows / speed * 60).astype(int)
+            self.distance_cache.set_many(a[missing], b, cache_mode, rows, minutes)
+        return dist
+
+    def _cache_mode(self, transport_mode: str) -> str:
+        """Cache key mode; network and straight-line results are kept apart."""
+        if self.road_network is None:
+            return transport_mode
+        return f"road:{transport_mode}"
+
+    def _estimate_travel_time(self, distance_km: float, transport_mode: str) -> int:
+        """Estimate travel time in minutes."""
+        speed = TRANSPORT_SPEEDS_KMH.get(transport_mode, 25)
         return int((distance_km / speed) * 60)
 
+    def _estimate_travel_costs(
+        self, distances_km: np.ndarray, transport_mode: str
+    ) -> np.ndarray:
+        """Vectorized _estimate_travel_cost over an array of legs."""
+        if transport_mode == "public_transport":
+            return 2.5 + np.maximum(0, (distances_km - 5) * 0.3)
+        if transport_mode == "driving":
+            return distances_km * 0.5
+        return np.zeros(len(distances_km))
+
     def _estimate_travel_cost(self, distance_km: float, transport_mode: str) -> float:
         """Estimate travel cost."""
         costs = {
@@ -521,52 +1531,6 @@ class RouteOptimizer:
 
         return costs.get(transport_mode, 0.0)
 
-    def _cluster_locations(
-        self, individuals: List[Dict], max_cluster_radius: float = 5.0
-    ) -> List[List[Dict]]:
-        """Cluster individuals by geographic proximity."""
-        clusters = []
-        unclustered = individuals.copy()
-
-        while unclustered:
-            # Start new cluster with first individual
-            seed = unclustered.pop(0)
-            cluster = [seed]
-            seed_loc = (seed["lat"], seed["lon"])
-
-            # Add nearby individuals to cluster
-            remaining = []
-            for individual in unclustered:
-                ind_loc = (individual["lat"], individual["lon"])
-                if self._haversine_distance(seed_loc, ind_loc) <= max_cluster_radius:
-                    cluster.append(individual)
-                else:
-                    remaining.append(individual)
-
-            unclustered = remaining
-            clusters.append(cluster)
-
-        return clusters
-
-    def _assign_clusters_to_volunteers(
-        self, volunteers: List[Dict], clusters: List[List[Dict]]
-    ) -> Dict[str, List[Dict]]:
-        """Assign clusters to volunteers to balance workload."""
-        assignments = {v["id"]: [] for v in volunteers}
-
-        # Sort clusters by size (largest first)
-        sorted_clusters = sorted(clusters, key=len, reverse=True)
-
-        # Assign clusters using greedy approach
-        for cluster in sorted_clusters:
-            # Find volunteer with least workload
-            volunteer_id = min(
-                assignments.keys(), key=lambda v_id: len(assignments[v_id])
-            )
-            assignments[volunteer_id].extend(cluster)
-
-        return assignments
-
     def _calculate_accessibility_score(
         self,
         distance: float,
@@ -615,9 +1579,17 @@ class RouteOptimizer:
         origin: Tuple[float, float],
         destination: Tuple[float, float],
         profile: Dict,
+        distance: Optional[float] = None,
+        transit_minutes: Optional[float] = None,
     ) -> List[Dict]:
-        """Get available transport options with time and cost."""
-        distance = self._haversine_distance(origin, destination)
+        """
+        Get available transport options with time and cost.
+
+        transit_minutes is the timetable travel time for public transport;
+        inf drops the option, None falls back to the speed estimate.
+        """
+        if distance is None:
+            distance = self._travel(origin, destination, "public_transport")[0]
         options = []
 
         # Walking (if reasonable distance)
@@ -635,15 +1607,18 @@ class RouteOptimizer:
             )
 
         # Public transport
-        options.append(
-            {
-                "mode": "public_transport",
-                "time": self._estimate_travel_time(distance, "public_transport"),
-                "cost": self._estimate_travel_cost(distance, "public_transport"),
-                "distance_km": distance,
-                "accessibility": "high",
-            }
-        )
+        if transit_minutes is None:
+            transit_minutes = self._estimate_travel_time(distance, "public_transport")
+        if np.isfinite(transit_minutes):
+            options.append(
+                {
+                    "mode": "public_transport",
+                    "time": int(transit_minutes),
+                    "cost": self._estimate_travel_cost(distance, "public_transport"),
+                    "distance_km": distance,
+                    "accessibility": "high",
+                }
+            )
 
         # Cycling (if available and reasonable)
         if distance <= 10 and not profile.get("mobility_issues"):
@@ -659,28 +1634,174 @@ class RouteOptimizer:
 
         return options
 
-    def _route_segment_distance(
-        self, start: Tuple[float, float], segment: List[Location]
-    ) -> float:
-        """Calculate total distance for a route segment."""
-        if not segment:
-            return 0.0
-
-        total = self._haversine_distance(start, (segment[0].lat, segment[0].lon))
-        for i in range(len(segment) - 1):
-            total += self._haversine_distance(
-                (segment[i].lat, segment[i].lon),
-                (segment[i + 1].lat, segment[i + 1].lon),
+    def _generate_alternatives(
+        self,
+        start: Tuple[float, float],
+        locations: LocationStore,
+        constraints: Dict,
+        search: TSPSearch,
+    ) -> List[Dict]:
+        """
+        Generate alternative routes from a finished TSP search.
+
+        Returns the primary order with the fastest and cheapest other
+        transport modes (when they beat the requested mode on that measure),
+        followed by up to constraints["alternatives"] different visiting
+        orders within ALTERNATIVE_MAX_DETOUR of the best length. They share
+        the request's deadline with the primary search: none are generated
+        once it has passed.
+        """
+        k = int(constraints.get("alternatives", ALTERNATIVE_ROUTES))
+        if k <= 0 or not search.tour:
+            return []
+
+        now = time.perf_counter()
+        if search.deadline is not None and now >= search.deadline:
+            return []
+        deadline = now + max(
+            ALTERNATIVE_TIME_SHARE * search.solve_seconds, ALTERNATIVE_MIN_BUDGET_S
+        )
+        if search.deadline is not None:
+            deadline = min(deadline, search.deadline)
+        alternatives = self._transport_alternatives(
+            start, locations, constraints, search
+        )
+
+        for tour, shared in self._diversified_tours(search, k, deadline):
+            alternative = self._alternative_result(
+                "alternate_order", start, locations, tour, search.dist, constraints
             )
-        return total
+            alternative["shared_edges"] = round(shared, 2)
+            alternatives.append(alternative)
 
-    def _generate_alternatives(
-        self, start: Tuple[float, float], locations: List[Location], constraints: Dict
+        return alternatives
+
+    def _transport_alternatives(
+        self,
+        start: Tuple[float, float],
+        locations: LocationStore,
+        constraints: Dict,
+        search: TSPSearch,
     ) -> List[Dict]:
-        """Generate alternative routes."""
-        # For now, return empty list
-        # In production, would generate 2-3 alternative routes
-        return []
+        """Re-cost the primary order with the fastest and cheapest other modes."""
+        primary_mode = constraints.get("transport_mode", "driving")
+        points = np.vstack([start, locations.coords])
+        routes = {}
+        for mode in TRANSPORT_SPEEDS_KMH:
+            # Each mode has its own graph (edges, one-way rules) on the road
+            # network; straight-line distances are the same for all
+            if mode == primary_mode or self.road_network is None:
+                dist = search.dist
+            else:
+                dist = self._distance_matrix(points, transport_mode=mode)
+            routes[mode] = self._alternative_result(
+                mode,
+                start,
+                locations,
+                search.tour,
+                dist,
+                {**constraints, "transport_mode": mode},
+            )
+        primary = routes.get(primary_mode)
+        others = [mode for mode in routes if mode != primary_mode]
+
+        alternatives = []
+        fastest = min(others, key=lambda m: routes[m]["total_time"])
+        if primary is None or routes[fastest]["total_time"] < primary["total_time"]:
+            routes[fastest]["label"] = "fastest"
+            alternatives.append(routes[fastest])
+
+        cheapest = min(
+            others,
+            key=lambda m: (routes[m]["estimated_cost"], routes[m]["total_time"]),
+        )
+        if cheapest != fastest and (
+            primary is None
+            or routes[cheapest]["estimated_cost"] < primary["estimated_cost"]
+        ):
+            routes[cheapest]["label"] = "cheapest"
+            alternatives.append(routes[cheapest])
+
+        return alternatives
+
+    def _diversified_tours(
+        self, search: TSPSearch, k: int, deadline: float
+    ) -> List[Tuple[List[int], float]]:
+        """
+        Find up to k different near-optimal tours by penalty diversification.
+
+        The edges of the last tour found are made ALTERNATIVE_EDGE_PENALTY
+        longer and the local search restarts from that tour, reusing the
+        primary search's matrix and neighbor lists. The primary solve is
+        finished, so penalties are applied to its nested-list matrix in place.
+
+        Returns:
+            (tour, share of edges shared with an earlier tour) pairs
+        """
+        d = search.d
+        dist = search.dist
+        current = [0] + search.tour
+        best_length = float(dist[current[:-1], current[1:]].sum())
+        seen = [self._tour_edges(current)]
+        tours = []
+
+        while len(tours) < k and time.perf_counter() < deadline:
+            for a, b in zip(current, current[1:]):
+                d[a][b] *= 1 + ALTERNATIVE_EDGE_PENALTY
+                d[b][a] *= 1 + ALTERNATIVE_EDGE_PENALTY
+
+            path = list(current)
+            improve_path(path, d, search.neighbors, deadline=deadline)
+            if path == current:
+                break
+
+            length = float(dist[path[:-1], path[1:]].sum())
+            edges = self._tour_edges(path)
+            shared = max(len(edges & other) / len(edges) for other in seen)
+            if (
+                length <= best_length * (1 + ALTERNATIVE_MAX_DETOUR)
+                and shared <= ALTERNATIVE_MAX_SHARED_EDGES
+            ):
+                tours.append((path[1:], shared))
+                seen.append(edges)
+            current = path
+
+        return tours
+
+    @staticmethod
+    def _tour_edges(path: List[int]) -> set:
+        """Undirected edge set of a path."""
+        return {(min(a, b), max(a, b)) for a, b in zip(path, path[1:])}
+
+    def _alternative_result(
+        self,
+        label: str,
+        start: Tuple[float, float],
+        locations: LocationStore,
+        tour: List[int],
+        dist: np.ndarray,
+        constraints: Dict,
+    ) -> Dict:
+        """Summarize an alternative route (no nested Route object)."""
+        order = [node - 1 for node in tour]
+        route = self._build_route(
+            start,
+            locations,
+            order,
+            constraints,
+            legs=dist[[0] + tour[:-1], tour],
+            with_locations=False,
+        )
+        return {
+            "label": label,
+            "transport_mode": constraints.get("transport_mode", "driving"),
+            "order": [locations.ids[i] for i in order],
+            "total_distance": route.total_distance,
+            "total_time": route.total_time,
+            "estimated_cost": route.cost,
+            "accessibility_score": route.accessibility_score,
+            "waypoints": route.waypoints,
+        }
 
     def _calculate_workload_score(self, route: Dict) -> float:
         """Calculate workload score for a route."""
@@ -689,10 +1810,10 @@ class RouteOptimizer:
         distance_score = min(route["total_distance"] / 100, 1.0)  # 100km max
         return (time_score + distance_score) / 2
 
-    def _calculate_coverage(self, assignments: Dict, individuals: List[Dict]) -> float:
+    def _calculate_coverage(self, assignments: Dict, total: int) -> float:
         """Calculate coverage percentage."""
-        assigned_count = sum(len(inds) for inds in assignments.values())
-        return assigned_count / len(individuals) if individuals else 0.0
+        assigned_count = sum(len(stops) for stops in assignments.values())
+        return assigned_count / total if total else 0.0
 
     def _calculate_balance_score(self, volunteer_routes: Dict) -> float:
         """Calculate workload balance score."""
@@ -729,15 +1850,52 @@ class RouteOptimizer:
         return notes
 
     def _calculate_route_accessibility(
-        self, locations: List[Location], transport_modes: List[str], constraints: Dict
+        self,
+        locations: LocationStore,
+        order: List[int],
+        transport_modes: List[str],
+        constraints: Dict,
     ) -> float:
         """Calculate overall route accessibility."""
-        # Average of location accessibility scores
-        if not locations:
+        # Average of location accessibility scores (0.7 when unscored)
+        if not order:
             return 1.0
 
-        scores = [loc.accessibility_score or 0.7 for loc in locations]
-        return np.mean(scores)
+        scores = locations.accessibility[order]
+        return np.mean(np.where(scores != 0, scores, 0.7))
+
+    def _parse_minutes(self, value: str) -> int:
+        """Convert an "HH:MM" string to minutes since midnight."""
+        parsed = datetime.strptime(value, "%H:%M")
+        return parsed.hour * 60 + parsed.minute
+
+    def _format_minutes(self, minutes: float) -> str:
+        """Convert minutes since midnight to an "HH:MM" string (past midnight wraps)."""
+        minutes = int(round(minutes)) % (24 * 60)
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def _time_window(self, hours: Optional[Dict], day_name: str) -> Tuple[int, int]:
+        """Get the (open, close) visiting window in minutes for a day."""
+        if not hours:
+            return 0, 24 * 60
+
+        day_hours = hours.get(day_name)
+        if not day_hours or day_hours.get("closed"):
+            return 24 * 60, 0  # Empty window: cannot be visited
+
+        return self._opening_minutes(day_hours)
+
+    def _opening_minutes(self, day_hours: Dict) -> Tuple[int, int]:
+        """
+        Get (open, close) in minutes since midnight. Overnight hours (close
+        at or before open, e.g. 20:00-08:00) close on the next day, after
+        24 * 60.
+        """
+        open_minute = self._parse_minutes(day_hours["open"])
+        close_minute = self._parse_minutes(day_hours["close"])
+        if close_minute <= open_minute:
+            close_minute += 24 * 60
+        return open_minute, close_minute
 
     def _get_alternative_days(self, hours: Dict) -> List[str]:
         """Get alternative days when location is open."""
@@ -748,89 +1906,178 @@ class RouteOptimizer:
         ]
         return open_days
 
-    def _create_coverage_grid(
-        self, coverage_area: Dict, grid_size: float = 2.0
-    ) -> List[Dict]:
-        """Create grid cells for coverage analysis."""
-        cells = []
-        lat_range = np.arange(
-            coverage_area["min_lat"],
-            coverage_area["max_lat"],
-            grid_size / 111,  # Approx km to degrees
-        )
-        lon_range = np.arange(
-            coverage_area["min_lon"], coverage_area["max_lon"], grid_size / 111
-        )
-
-        for i, lat in enumerate(lat_range):
-            for j, lon in enumerate(lon_range):
-                cells.append(
-                    {
-                        "id": f"cell_{i}_{j}",
-                        "center": (lat, lon),
-                        "bounds": {
-                            "min_lat": lat,
-                            "max_lat": lat + grid_size / 111,
-                            "min_lon": lon,
-                            "max_lon": lon + grid_size / 111,
-                        },
-                    }
-                )
-
-        return cells
-
-    def _calculate_coverage_map(
-        self, grid: List[Dict], service_locations: List[Dict]
+    def _coverage_raster(
+        self,
+        service_locations: List[Dict],
+        coverage_area: Dict,
+        population_density: Optional[List[Dict]] = None,
+        grid_size: float = 2.0,
+        transport_mode: str = "walking",
+        max_minutes: Optional[float] = None,
+        departure: Optional[datetime] = None,
     ) -> Dict:
-        """Calculate coverage for each grid cell."""
-        coverage_map = {}
-
-        for cell in grid:
-            cell_center = cell["center"]
-
-            # Find nearest service
-            if service_locations:
-                nearest = min(
-                    service_locations,
-                    key=lambda s: self._haversine_distance(
-                        cell_center, (s["lat"], s["lon"])
-                    ),
-                )
-                distance = self._haversine_distance(
-                    cell_center, (nearest["lat"], nearest["lon"])
-                )
-            else:
-                nearest = None
-                distance = float("inf")
-
+        """
+        Compute coverage, nearest service, population and gap priority as
+        2-D arrays over the coverage grid in one vectorized pass.
+        """
+        step = grid_size / 111  # Approx km to degrees
+        lat_values = np.arange(coverage_area["min_lat"], coverage_area["max_lat"], step)
+        lon_values = np.arange(coverage_area["min_lon"], coverage_area["max_lon"], step)
+        shape = (len(lat_values), len(lon_values))
+
+        lat_grid, lon_grid = np.meshgrid(lat_values, lon_values, indexing="ij")
+        cells = np.column_stack([lat_grid.ravel(), lon_grid.ravel()])
+
+        # Find nearest service for every cell
+        if service_locations and len(cells):
+            index = get_spatial_index([(s["lat"], s["lon"]) for s in service_locations])
+            distance, nearest = index.nearest(cells)
+            distance, nearest = distance[:, 0], nearest[:, 0]
+        else:
+            distance = np.full(len(cells), np.inf)
+            nearest = np.full(len(cells), -1, dtype=int)
+
+        if max_minutes is not None and service_locations and len(cells):
+            # Fastest service per cell from the cached isochrone rasters;
+            # coverage is 0.5 at the budget, so gaps are the unreached cells
+            minutes = self.isochrones.travel_minutes_to(
+                service_locations, cells, transport_mode, max_minutes, departure
+            )
+            fastest = np.argmin(minutes, axis=1)
+            best = minutes[np.arange(len(cells)), fastest]
+            reached = np.isfinite(best)
+            nearest = np.where(reached, fastest, nearest)
+            service_coords = coords_array(
+                [(s["lat"], s["lon"]) for s in service_locations]
+            )
+            distance = haversine_paired(cells, service_coords[nearest])
+            coverage = np.where(
+                reached,
+                np.clip(1.0 - np.where(reached, best, 0) / (2 * max_minutes), 0, 1),
+                0.0,
+            )
+        else:
             # Calculate coverage score (inverse of distance)
-            coverage_score = max(0.0, 1.0 - (distance / 10))  # 10km threshold
-
-            coverage_map[cell["id"]] = {
-                "coverage_score": coverage_score,
-                "nearest_service": nearest,
-                "distance": distance,
-            }
-
-        return coverage_map
-
-    def _calculate_gap_priority(self, cell: Dict, coverage_info: Dict) -> float:
-        """Calculate priority for addressing a service gap."""
-        priority = 1.0 - coverage_info["coverage_score"]
+            coverage = np.maximum(0.0, 1.0 - distance / 10)  # 10km threshold
+
+        # Bin population points into the cells that contain them
+        population = np.zeros(shape)
+        if population_density and len(cells):
+            points = np.array(
+                [
+                    (p["lat"], p["lon"], p.get("population", 0))
+                    for p in population_density
+                ],
+                dtype=float,
+            ).reshape(-1, 3)
+            rows = np.floor((points[:, 0] - coverage_area["min_lat"]) / step).astype(int)
+            cols = np.floor((points[:, 1] - coverage_area["min_lon"]) / step).astype(int)
+            inside = (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+            np.add.at(population, (rows[inside], cols[inside]), points[inside, 2])
+
+        # Priority for addressing a gap, higher for populous cells
+        priority = np.minimum(
+            1.0, 1.0 - coverage.reshape(shape) + 0.2 * (population > 1000)
+        )
 
-        # Increase priority if high population
-        if cell.get("population", 0) > 1000:
-            priority += 0.2
+        return {
+            "shape": shape,
+            "step": step,
+            "lat_values": lat_values,
+            "lon_values": lon_values,
+            "coverage": coverage.reshape(shape),
+            "distance": distance.reshape(shape),
+            "nearest_service": nearest.reshape(shape),
+            "population": population,
+            "priority": priority,
+            "coverage_percentage": float(coverage.mean() * 100) if len(cells) else 0.0,
+        }
 
-        return min(1.0, priority)
+    def _raster_summary(
+        self, raster: Dict, service_locations: List[Dict], top_n: int = 10
+    ) -> Dict:
+        """Encode raster layers compactly with a GeoJSON summary of top gaps."""
+        rows, cols = raster["shape"]
+        step = raster["step"]
+        gap_mask = raster["coverage"] < 0.5
+        priority = np.where(gap_mask, raster["priority"], -1.0).ravel()
+
+        top = np.argsort(-priority, kind="stable")[:top_n]
+        top = top[priority[top] >= 0]
+
+        features = []
+        for cell in top:
+            row, col = divmod(int(cell), cols)
+            lat = float(raster["lat_values"][row])
+            lon = float(raster["lon_values"][col])
+            nearest = int(raster["nearest_service"][row, col])
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Polygon",
+                        "coordinates": [
+                            [
+                                [lon, lat],
+                                [lon + step, lat],
+                                [lon + step, lat + step],
+                                [lon, lat + step],
+                                [lon, lat],
+                            ]
+                        ],
+                    },
+                    "properties": {
+                        "row": row,
+                        "col": col,
+                        "priority": round(float(raster["priority"][row, col]), 3),
+                        "coverage_score": round(
+                            float(raster["coverage"][row, col]), 3
+                        ),
+                        "population_estimate": int(
+                            round(raster["population"][row, col])
+                        ),
+                        "nearest_service_id": service_locations[nearest].get("id")
+                        if nearest >= 0
+                        else None,
+                    },
+                }
+            )
 
-    def _calculate_overall_coverage(self, coverage_map: Dict) -> float:
-        """Calculate overall coverage percentage."""
-        if not coverage_map:
-            return 0.0
+        return {
+            "format": "raster",
+            "shape": [rows, cols],
+            "origin": {
+                "lat": float(raster["lat_values"][0]) if rows else None,
+                "lon": float(raster["lon_values"][0]) if cols else None,
+            },
+            "cell_size_deg": step,
+            "encoding": {
+                "coverage": "uint8 row-major, score = value / 255",
+                "priority": "uint8 row-major, priority = value / 255",
+                "nearest_service": "int32 row-major index into service_locations, -1 if none",
+                "population": "float32 row-major",
+            },
+            "coverage": self._encode_layer(
+                np.round(raster["coverage"] * 255).astype(np.uint8)
+            ),
+            "priority": self._encode_layer(
+                np.round(np.clip(raster["priority"], 0, 1) * 255).astype(np.uint8)
+            ),
+            "nearest_service": self._encode_layer(
+                raster["nearest_service"].astype("<i4")
+            ),
+            "population": self._encode_layer(raster["population"].astype("<f4")),
+            "total_gaps": int(gap_mask.sum()),
+            "high_priority_gap_count": int(
+                (gap_mask & (raster["priority"] > 0.7)).sum()
+            ),
+            "coverage_percentage": raster["coverage_percentage"],
+            "top_gaps": {"type": "FeatureCollection", "features": features},
+        }
 
-        scores = [info["coverage_score"] for info in coverage_map.values()]
-        return np.mean(scores) * 100
+    def _encode_layer(self, layer: np.ndarray) -> str:
+        """Base64-encode the raw bytes of a raster layer."""
+        return base64.b64encode(np.ascontiguousarray(layer).tobytes()).decode("ascii")
 
     def _generate_gap_recommendations(self, gaps: List[Dict]) -> List[Dict]:
         """Generate recommendations for addressing service gaps."""
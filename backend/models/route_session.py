@@ -0,0 +1,421 @@
+"""
+Server-side route sessions repaired incrementally as the day changes.
+
+A session keeps a volunteer's current visiting order, the distance matrix
+over its stops and their time windows. Changes (a stop inserted, removed
+or delayed) are applied to that solution instead of re-solving it:
+
+- insert: cheapest feasible insertion position, then 2-opt around it
+- remove: splice the stop out, 2-opt around the gap, then retry stops that
+  did not fit before
+- delay: extend a stop's service time or push the whole schedule back;
+  stops that now miss their window are taken out and reinserted where
+  they still fit
+
+2-opt only looks at the positions near the change, so a repair takes
+milliseconds and leaves the rest of the day's order as it was.
+"""
+
+import threading
+import time
+import uuid
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from models.vrp_solver import schedule_route
+
+# Positions on each side of a change that localized 2-opt may touch
+REPAIR_WINDOW = 6
+
+# 2-opt moves applied per repair
+MAX_REPAIR_MOVES = 20
+
+IMPROVEMENT_EPS = 1e-9
+
+# Attributes a failed batch of changes rolls back (arrays are replaced, not
+# modified in place, except service which is copied on write)
+_SESSION_STATE = (
+    "coords",
+    "dist",
+    "service",
+    "window_open",
+    "window_close",
+    "stops",
+    "order",
+    "unserved",
+    "start_minute",
+    "version",
+)
+
+# (points_a, points_b) -> (A, B) distances in km
+DistanceFn = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# location hours -> (open, close) minutes since midnight for the session day
+WindowFn = Callable[[Optional[Dict]], Tuple[float, float]]
+
+
+class RouteSession:
+    """
+    One volunteer's route for a day, kept feasible under incremental changes.
+
+    Node 0 of ``dist`` is the start; node i is ``stops[i - 1]``. ``order``
+    lists the routed nodes in visiting order and ``unserved`` the nodes that
+    fit nowhere.
+    """
+
+    def __init__(
+        self,
+        start: Tuple[float, float],
+        stops: List[Dict],
+        order: List[int],
+        dist: np.ndarray,
+        distance_fn: DistanceFn,
+        window_fn: WindowFn,
+        minutes_per_km: float,
+        start_minute: float,
+        shift_end: float = np.inf,
+        constraints: Optional[Dict] = None,
+        room: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.constraints = constraints or {}
+        self.room = room
+        self.distance_fn = distance_fn
+        self.window_fn = window_fn
+        self.minutes_per_km = minutes_per_km
+        self.start_minute = float(start_minute)
+        self.shift_end = float(shift_end)
+
+        self.coords = np.vstack([start, [(s["lat"], s["lon"]) for s in stops]])
+        self.coords = self.coords.reshape(-1, 2).astype(float)
+        self.stops = list(stops)
+        self.dist = np.asarray(dist, dtype=float)
+        self.service = np.array(
+            [0.0] + [self._wait_time(s) for s in stops], dtype=float
+        )
+        windows = [(0.0, np.inf)] + [window_fn(s.get("hours")) for s in stops]
+        self.window_open = np.array([w[0] for w in windows], dtype=float)
+        self.window_close = np.array([w[1] for w in windows], dtype=float)
+
+        self.order: List[int] = list(order)
+        self.unserved: List[int] = []
+        self.version = 0
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+
+        # The initial order may ignore windows; make it feasible
+        self._restore_feasibility()
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+
+    def apply(self, change: Dict) -> Dict:
+        """
+        Apply one change and repair the route.
+
+        Args:
+            change: {"type": "insert", "stop": {...}},
+                {"type": "remove", "stop_id": ...} or
+                {"type": "delay", "minutes": ..., "stop_id": ... (optional)}
+
+        Returns:
+            Summary of the change (type, stop_id, affected stop ids)
+        """
+        kind = change.get("type")
+        if kind == "insert":
+            summary = self.insert(change["stop"])
+        elif kind == "remove":
+            summary = self.remove(change["stop_id"])
+        elif kind == "delay":
+            summary = self.delay(float(change["minutes"]), change.get("stop_id"))
+        else:
+            raise ValueError(f"Unknown change type: {kind}")
+
+        self.version += 1
+        self.updated_at = time.time()
+        return summary
+
+    def insert(self, stop: Dict) -> Dict:
+        """Add a stop at its cheapest feasible position."""
+        stop_id = stop.get("id", f"loc_{len(self.stops)}")
+        if self._node_of(stop_id) is not None:
+            raise ValueError(f"Stop {stop_id} is already in the route")
+        stop = dict(stop, id=stop_id)
+
+        point = np.array([[stop["lat"], stop["lon"]]], dtype=float)
+        # Both directions: on one-way streets the way back can differ
+        row = np.asarray(self.distance_fn(point, self.coords), dtype=float)[0]
+        column = np.asarray(self.distance_fn(self.coords, point), dtype=float)[:, 0]
+        n = len(self.coords)
+        dist = np.empty((n + 1, n + 1))
+        dist[:n, :n] = self.dist
+        dist[n, :n] = row
+        dist[:n, n] = column
+        dist[n, n] = 0.0
+        self.dist = dist
+
+        opens, closes = self.window_fn(stop.get("hours"))
+        self.coords = np.vstack([self.coords, point])
+        self.stops.append(stop)
+        self.service = np.append(self.service, self._wait_time(stop))
+        self.window_open = np.append(self.window_open, opens)
+        self.window_close = np.append(self.window_close, closes)
+
+        routed = self._insert_node(n)
+        return {
+            "type": "insert",
+            "stop_id": stop_id,
+            "routed": routed,
+        }
+
+    def remove(self, stop_id) -> Dict:
+        """Drop a stop (visited, cancelled or closed) and close the gap."""
+        node = self._node_of(stop_id)
+        if node is None:
+            raise KeyError(f"Stop {stop_id} is not in the route")
+
+        if node in self.order:
+            position = self.order.index(node)
+            self.order.pop(position)
+            self._two_opt_near(position)
+        else:
+            self.unserved.remove(node)
+
+        keep = np.arange(len(self.coords)) != node
+        self.coords = self.coords[keep]
+        self.dist = self.dist[np.ix_(keep, keep)]
+        self.service = self.service[keep]
+        self.window_open = self.window_open[keep]
+        self.window_close = self.window_close[keep]
+        self.stops.pop(node - 1)
+        self.order = [i - (i > node) for i in self.order]
+        self.unserved = [i - (i > node) for i in self.unserved]
+
+        # Freed time may let earlier leftovers in
+        added = self._retry_unserved()
+        return {
+            "type": "remove",
+            "stop_id": stop_id,
+            "added": [self.stops[i - 1]["id"] for i in added],
+        }
+
+    def delay(self, minutes: float, stop_id=None) -> Dict:
+        """
+        Extend one stop's service time, or push the rest of the day back
+        when no stop is given.
+        """
+        if stop_id is None:
+            self.start_minute += minutes
+        else:
+            node = self._node_of(stop_id)
+            if node is None:
+                raise KeyError(f"Stop {stop_id} is not in the route")
+            self.service = self.service.copy()
+            self.service[node] = max(self.service[node] + minutes, 0.0)
+
+        dropped = self._restore_feasibility()
+        return {
+            "type": "delay",
+            "stop_id": stop_id,
+            "minutes": minutes,
+            "unserved": [self.stops[i - 1]["id"] for i in dropped],
+        }
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def apply_all(self, changes: List[Dict]) -> List[Dict]:
+        """Apply changes in order; if one fails, none of them is kept."""
+        saved = self._snapshot()
+        try:
+            return [self.apply(change) for change in changes]
+        except Exception:
+            self._restore(saved)
+            raise
+
+    def schedule(self) -> List[Tuple[float, float, float]]:
+        """(arrival, start, depart) in minutes for each routed stop."""
+        return self._simulate(self.order) or []
+
+    def stop_ids(self, nodes: List[int]) -> List:
+        return [self.stops[i - 1]["id"] for i in nodes]
+
+    # ------------------------------------------------------------------
+    # Repair
+    # ------------------------------------------------------------------
+
+    def _insert_node(self, node: int) -> bool:
+        """Insert a node at the cheapest feasible position; else unserved."""
+        path = np.array([0] + self.order)
+        following = np.append(path[1:], -1)
+        has_next = following >= 0
+        safe_next = np.where(has_next, following, 0)
+        added = self.dist[path, node] + np.where(
+            has_next,
+            self.dist[node, safe_next] - self.dist[path, safe_next],
+            0.0,
+        )
+
+        for position in np.argsort(added, kind="stable"):
+            candidate = self.order[:position] + [node] + self.order[position:]
+            if self._simulate(candidate) is not None:
+                self.order = candidate
+                self._two_opt_near(int(position))
+                return True
+
+        self.unserved.append(node)
+        return False
+
+    def _retry_unserved(self) -> List[int]:
+        pending, self.unserved = self.unserved, []
+        return [node for node in pending if self._insert_node(node)]
+
+    def _restore_feasibility(self) -> List[int]:
+        """Take out stops that miss their window, then reinsert what fits."""
+        dropped = []
+        while self.order:
+            late = self._first_violation(self.order)
+            if late is None:
+                break
+            dropped.append(self.order.pop(late))
+        return [node for node in dropped if not self._insert_node(node)]
+
+    def _two_opt_near(self, position: int):
+        """
+        2-opt restricted to edges within REPAIR_WINDOW positions of a change
+        (position = index in ``order``), keeping the schedule feasible.
+        """
+        path = [0] + self.order
+        last = len(path) - 1
+        if last < 2:
+            return
+        lo = max(position + 1 - REPAIR_WINDOW, 0)
+        hi = min(position + 1 + REPAIR_WINDOW, last)
+
+        # Reverse path[i + 1 .. j] for every window pair i < j
+        i, j = np.triu_indices(hi - lo + 1, k=1)
+        i, j = i + lo, j + lo
+        keep = i + 1 < j
+        i, j = i[keep], j[keep]
+        if not len(i):
+            return
+
+        rejected = set()
+        for _ in range(MAX_REPAIR_MOVES):
+            nodes = np.array(path)
+            a, b, c = nodes[i], nodes[i + 1], nodes[j]
+            has_next = j < last
+            e = nodes[np.minimum(j + 1, last)]
+            gain = self.dist[a, b] - self.dist[a, c] + np.where(
+                has_next, self.dist[c, e] - self.dist[b, e], 0.0
+            )
+            # A reversed segment is driven the other way (one-way streets)
+            forward = self.dist[nodes[:-1], nodes[1:]]
+            backward = self.dist[nodes[1:], nodes[:-1]]
+            flipped = np.concatenate([[0.0], np.cumsum(backward - forward)])
+            gain -= flipped[j] - flipped[i + 1]
+            for move in rejected:
+                gain[move] = -np.inf
+
+            best = int(np.argmax(gain))
+            if gain[best] <= IMPROVEMENT_EPS:
+                return
+            start, end = i[best] + 1, j[best] + 1
+            candidate = path[:start] + path[start:end][::-1] + path[end:]
+            if self._simulate(candidate[1:]) is None:
+                rejected.add(best)
+                continue
+            path = candidate
+            self.order = path[1:]
+            rejected.clear()
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _snapshot(self) -> Dict:
+        return {
+            name: list(value) if isinstance(value, list) else value
+            for name, value in vars(self).items()
+            if name in _SESSION_STATE
+        }
+
+    def _restore(self, saved: Dict):
+        for name, value in saved.items():
+            setattr(self, name, value)
+
+    def _simulate(
+        self, order: List[int]
+    ) -> Optional[List[Tuple[float, float, float]]]:
+        if not order:
+            return []
+        nodes = [0] + order
+        return schedule_route(
+            self.dist[nodes[:-1], nodes[1:]] * self.minutes_per_km,
+            self.service[order],
+            self.window_open[order],
+            self.window_close[order],
+            self.start_minute,
+            self.shift_end,
+        )
+
+    def _first_violation(self, order: List[int]) -> Optional[int]:
+        """Index in ``order`` of the first stop that cannot be served in time."""
+        clock = self.start_minute
+        previous = 0
+        for k, node in enumerate(order):
+            arrival = clock + self.dist[previous, node] * self.minutes_per_km
+            start = max(arrival, self.window_open[node])
+            clock = start + self.service[node]
+            if clock > min(self.window_close[node], self.shift_end) + 1e-6:
+                return k
+            previous = node
+        return None
+
+    def _node_of(self, stop_id) -> Optional[int]:
+        for i, stop in enumerate(self.stops):
+            if str(stop["id"]) == str(stop_id):
+                return i + 1
+        return None
+
+    @staticmethod
+    def _wait_time(stop: Dict) -> float:
+        return float(stop.get("wait_time", stop.get("wait_time_avg", 0)) or 0)
+
+
+class RouteSessionStore:
+    """Thread-safe LRU of route sessions that expire when idle."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 43_200):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, RouteSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: RouteSession):
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[RouteSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.updated_at > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
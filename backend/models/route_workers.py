@@ -0,0 +1,154 @@
+"""
+Process-pool execution of per-volunteer route improvement.
+
+Once the VRP solver has assigned stops to volunteers, every route can be
+improved independently. RoutePool sends each route's own distance
+submatrix and service/window arrays to a worker (a few KB, rather than the
+full matrix), submits one task per route and merges the results back in
+volunteer order. Every task carries its deadline and stops searching when
+it passes, even if the parent has already given up on it. A route whose
+task fails or misses its timeout is improved in-process with what is left
+of the budget, so a slow worker never delays or changes the other routes.
+The workers are started (and their imports paid for) by RoutePool.start(),
+when the optimizer is created, never inside a solve's timeout.
+"""
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context, parent_process
+from typing import List, Optional, Tuple
+from models.vrp_solver import improve_route_order
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _improve_route_task(problem: Tuple, deadline_epoch: float) -> Optional[List[int]]:
+    """
+    Worker entry point: improve one route (improve_route_order arguments)
+    until deadline_epoch, a time.time() value since perf_counter() values
+    are not comparable across processes.
+    """
+    remaining = deadline_epoch - time.time()
+    if remaining <= 0:
+        return None
+    return improve_route_order(*problem, deadline=time.perf_counter() + remaining)
+
+
+def _warm_up_task() -> None:
+    """No-op run once per worker at startup; importing this module is the work."""
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """Get the process-wide executor, starting it on first use."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            # Spawned workers do not inherit the Flask process's threads/locks
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=get_context("spawn")
+            )
+            _executor_workers = workers
+        return _executor
+
+
+def reset_executor():
+    """Drop the executor (e.g. after a worker crash); the next call restarts it."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class RoutePool:
+    """Fans VRPSolver route improvement out to worker processes."""
+
+    def __init__(self, workers: int, solve_timeout_ms: float = 1000):
+        self.workers = workers
+        self.solve_timeout_ms = solve_timeout_ms
+        self.timeouts = 0
+        self.failures = 0
+
+    def start(self):
+        """
+        Start the worker processes and wait until each has run a task, so
+        process startup and imports are never charged to a solve.
+        """
+        if parent_process() is not None:
+            return  # Inside a worker, which re-imports the main module
+        executor = get_executor(self.workers)
+        for future in [executor.submit(_warm_up_task) for _ in range(self.workers)]:
+            future.result()
+
+    def improve_routes(
+        self, solver, vehicles: List[int], deadline: float
+    ) -> List[Optional[List[int]]]:
+        """
+        Improve the given routes of a solver in parallel.
+
+        Returns:
+            One new stop order (positions 1..m) or None per vehicle, in the
+            order of ``vehicles``
+        """
+        try:
+            return self._improve_in_pool(solver, vehicles, deadline)
+        except BrokenProcessPool:
+            # Keep serving requests if a worker died; solve this batch in-process
+            self.failures += 1
+            reset_executor()
+            return [solver._improve_route(v, deadline) for v in vehicles]
+
+    def _improve_in_pool(
+        self, solver, vehicles: List[int], deadline: float
+    ) -> List[Optional[List[int]]]:
+        executor = get_executor(self.workers)
+
+        # Each route gets the per-solve timeout, counted per wave of `workers`
+        # tasks and capped by the overall deadline
+        submitted = time.perf_counter()
+        timeout = self.solve_timeout_ms / 1000.0
+        task_deadlines = [
+            min(submitted + (i // self.workers + 1) * timeout, deadline)
+            for i in range(len(vehicles))
+        ]
+        to_epoch = time.time() - submitted
+        futures = [
+            executor.submit(
+                _improve_route_task, solver._route_problem(v), task_deadline + to_epoch
+            )
+            for v, task_deadline in zip(vehicles, task_deadlines)
+        ]
+
+        # Results are collected in submission order; a task that misses its
+        # deadline here also stops in its worker at that deadline
+        results = []
+        retry = []
+        for k, (future, task_deadline) in enumerate(zip(futures, task_deadlines)):
+            try:
+                remaining = max(task_deadline - time.perf_counter(), 0.0)
+                results.append(future.result(timeout=remaining))
+            except FutureTimeout:
+                future.cancel()
+                self.timeouts += 1
+                results.append(None)
+                retry.append(k)
+            except BrokenProcessPool:
+                raise
+            except Exception:
+                self.failures += 1
+                results.append(None)
+                retry.append(k)
+
+        # Routes the pool did not finish get the rest of the budget in-process
+        for k in retry:
+            if time.perf_counter() >= deadline:
+                break
+            results[k] = solver._improve_route(vehicles[k], deadline)
+
+        return results
@@ -1,8 +1,139 @@
 import numpy as np
-from typing import Dict, List
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from scipy.spatial.distance import euclidean
 from config import Config
 
+PRIORITY_LEVELS = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+DEFAULT_PRIORITY_SUPPORT = ["low", "medium", "high"]
+
+# Component score columns returned by score_batch, in explanation order
+COMPONENTS = (
+    "location_score",
+    "skill_match_score",
+    "availability_score",
+    "priority_score",
+    "historical_score",
+)
+
+# Set bits per byte value, for counting bits in skill bitsets
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+@dataclass
+class ResourceFeatures:
+    """Scoring inputs of many resources as columns, one row per resource."""
+
+    resources: List[Dict]
+    ids: List[str]
+    locations: np.ndarray  # (N, D), nan rows where the location is missing
+    capacity: np.ndarray
+    occupied: np.ndarray
+    skill_bits: np.ndarray  # (N, W) uint64 bitsets of required skills
+    skill_counts: np.ndarray  # distinct required skills per resource
+    priority_masks: np.ndarray  # bit level-1 set per supported level; 0 = none
+    vocabulary: Dict[str, int]  # lowercased skill -> bit
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def take(self, indices: Iterable[int]) -> "ResourceFeatures":
+        """Features of a subset of the resources, in the given order."""
+        indices = np.asarray(indices, dtype=int)
+        return ResourceFeatures(
+            resources=[self.resources[i] for i in indices],
+            ids=[self.ids[i] for i in indices],
+            locations=self.locations[indices],
+            capacity=self.capacity[indices],
+            occupied=self.occupied[indices],
+            skill_bits=self.skill_bits[indices],
+            skill_counts=self.skill_counts[indices],
+            priority_masks=self.priority_masks[indices],
+            vocabulary=self.vocabulary,
+        )
+
+
+def priority_mask(priority_support: Optional[Iterable[str]]) -> int:
+    """Bitmask of the priority levels a resource supports."""
+    mask = 0
+    for p in priority_support or ():
+        mask |= 1 << (PRIORITY_LEVELS.get(p.lower(), 2) - 1)
+    return mask
+
+
+def skill_bitset(
+    skills: Iterable[str], vocabulary: Dict[str, int], words: int, grow: bool = False
+) -> np.ndarray:
+    """
+    Bitset of skills over the vocabulary as ``words`` uint64 words. With
+    grow, unseen skills are added to the vocabulary (the caller widens
+    ``words`` when needed); otherwise they are left out.
+    """
+    bits = np.zeros(words, dtype=np.uint64)
+    for skill in skills or ():
+        skill = skill.lower()
+        bit = vocabulary.get(skill)
+        if bit is None:
+            if not grow:
+                continue
+            bit = vocabulary[skill] = len(vocabulary)
+        if bit < 64 * words:
+            bits[bit // 64] |= np.uint64(1 << (bit % 64))
+    return bits
+
+
+def skill_words(vocabulary: Dict[str, int]) -> int:
+    """uint64 words needed for a bitset over the vocabulary."""
+    return max(1, -(-len(vocabulary) // 64))
+
+
+def build_features(resources: List[Dict]) -> ResourceFeatures:
+    """Extract the scoring columns of resource dicts."""
+    count = len(resources)
+    vocabulary: Dict[str, int] = {}
+    skill_counts = np.zeros(count)
+    rows, bits = [], []
+    for i, resource in enumerate(resources):
+        skills = {s.lower() for s in resource.get("required_skills", []) or ()}
+        for skill in skills:
+            rows.append(i)
+            bits.append(vocabulary.setdefault(skill, len(vocabulary)))
+        skill_counts[i] = len(skills)
+    skill_bits = np.zeros((count, skill_words(vocabulary)), dtype=np.uint64)
+    if bits:
+        bits = np.array(bits, dtype=np.uint64)
+        np.bitwise_or.at(
+            skill_bits,
+            (rows, (bits // 64).astype(int)),
+            np.left_shift(np.uint64(1), bits % np.uint64(64)),
+        )
+
+    located = [i for i, r in enumerate(resources) if r.get("location")]
+    dims = len(resources[located[0]]["location"]) if located else 2
+    locations = np.full((count, dims), np.nan)
+    if located:
+        locations[located] = np.array(
+            [resources[i]["location"] for i in located], dtype=float
+        ).reshape(len(located), -1)
+
+    return ResourceFeatures(
+        resources=resources,
+        ids=[r["id"] for r in resources],
+        locations=locations,
+        capacity=np.array([r.get("capacity", 0) for r in resources], dtype=float),
+        occupied=np.array([r.get("occupied", 0) for r in resources], dtype=float),
+        skill_bits=skill_bits,
+        skill_counts=skill_counts,
+        priority_masks=np.array(
+            [
+                priority_mask(r.get("priority_support", DEFAULT_PRIORITY_SUPPORT))
+                for r in resources
+            ],
+            dtype=np.int64,
+        ),
+        vocabulary=vocabulary,
+    )
+
 
 class RecommendationScorer:
     """
@@ -71,15 +202,13 @@ class RecommendationScorer:
         """
         Calculate priority alignment score.
         """
-        priority_levels = {"low": 1, "medium": 2, "high": 3, "critical": 4}
-
-        individual_level = priority_levels.get(individual_priority.lower(), 2)
+        individual_level = PRIORITY_LEVELS.get(individual_priority.lower(), 2)
 
         if not resource_priority_support:
             return 0.5
 
         supported_levels = [
-            priority_levels.get(p.lower(), 2) for p in resource_priority_support
+            PRIORITY_LEVELS.get(p.lower(), 2) for p in resource_priority_support
         ]
 
         if individual_level in supported_levels:
@@ -121,7 +250,7 @@ class RecommendationScorer:
         # Priority score
         priority_score = self.calculate_priority_score(
             individual.get("priority", "medium"),
-            resource.get("priority_support", ["low", "medium", "high"]),
+            resource.get("priority_support", DEFAULT_PRIORITY_SUPPORT),
         )
 
         # Historical score
@@ -141,7 +270,7 @@ class RecommendationScorer:
         # Cold start bonus
         if (
             self.bandit
-            and self.bandit.counts[resource_type][resource["id"]]
+            and self.bandit.get_count(resource_type, resource["id"])
             < Config.MIN_INTERACTIONS_FOR_LEARNING
         ):
             composite += Config.COLD_START_BONUS
@@ -156,3 +285,179 @@ class RecommendationScorer:
         }
 
         return composite, explanation
+
+    def score_batch(
+        self,
+        individual: Dict,
+        resources: Union[List[Dict], ResourceFeatures],
+        resource_type: str,
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Score many resources at once; same results as calculate_composite_score.
+
+        Resources are resource dicts or their precomputed ResourceFeatures
+        (e.g. from the ResourceCatalog); every component is computed with
+        array operations. Build explanations for the resources you return
+        with explain().
+
+        Returns:
+            (composite scores, component name -> scores), one entry per resource
+        """
+        features = self._features(resources)
+        count = len(features)
+        components = {
+            "location_score": self._batch_location_scores(
+                individual.get("location"), features
+            ),
+            "skill_match_score": self._batch_skill_scores(
+                individual.get("skills", []), features
+            ),
+            "availability_score": self._batch_availability_scores(
+                features.capacity, features.occupied
+            ),
+            "priority_score": self._batch_priority_scores(
+                individual.get("priority", "medium"), features
+            ),
+        }
+
+        # Bandit history, one table lookup for all candidates
+        historical = np.full(count, 0.5)
+        cold = np.zeros(count, dtype=bool)
+        if self.bandit:
+            table = self.bandit.table(resource_type)
+            rows = table.lookup(features.ids)
+            historical = table.means(rows, default=0.5)
+            cold = table.counts(rows) < Config.MIN_INTERACTIONS_FOR_LEARNING
+        components["historical_score"] = historical
+
+        composite = (
+            Config.WEIGHT_LOCATION * components["location_score"]
+            + Config.WEIGHT_SKILL_MATCH * components["skill_match_score"]
+            + Config.WEIGHT_AVAILABILITY * components["availability_score"]
+            + Config.WEIGHT_PRIORITY * components["priority_score"]
+            + Config.WEIGHT_HISTORICAL * historical
+        )
+        composite += np.where(cold, Config.COLD_START_BONUS, 0.0)
+
+        return composite, components
+
+    def prefilter(
+        self,
+        individual: Dict,
+        resources: Union[List[Dict], ResourceFeatures],
+        max_distance: Optional[float] = None,
+        available_only: bool = False,
+        priority_match: bool = False,
+    ) -> np.ndarray:
+        """
+        Indices of the resources that pass cheap eligibility checks, so the
+        rest can be dropped before full scoring.
+
+        Args:
+            max_distance: Drop resources farther away than this (same units
+                as locations); resources without a location are kept
+            available_only: Drop resources with no free capacity
+            priority_match: Drop resources whose priority_support does not
+                include the individual's priority
+
+        Returns:
+            Indices into resources, in their original order
+        """
+        features = self._features(resources)
+        keep = np.ones(len(features), dtype=bool)
+
+        if max_distance is not None:
+            # Not the shared spatial index: scorer locations are arbitrary
+            # coordinate tuples compared in their own units, while the index
+            # answers great-circle radius queries in km on (lat, lon)
+            distance = self._batch_distances(individual.get("location"), features)
+            keep &= ~(distance > max_distance)
+
+        if available_only:
+            keep &= (features.capacity > 0) & (
+                features.capacity - features.occupied > 0
+            )
+
+        if priority_match:
+            level = PRIORITY_LEVELS.get(individual.get("priority", "medium").lower(), 2)
+            masks = features.priority_masks
+            keep &= (masks == 0) | ((masks >> (level - 1)) & 1 == 1)
+
+        return np.flatnonzero(keep)
+
+    def explain(
+        self, composite: np.ndarray, components: Dict[str, np.ndarray], index: int
+    ) -> Dict:
+        """Explanation dict for one resource of a score_batch result."""
+        explanation = {
+            name: round(float(components[name][index]), 3) for name in COMPONENTS
+        }
+        explanation["composite_score"] = round(float(composite[index]), 3)
+        return explanation
+
+    @staticmethod
+    def _features(resources: Union[List[Dict], ResourceFeatures]) -> ResourceFeatures:
+        if isinstance(resources, ResourceFeatures):
+            return resources
+        return build_features(resources)
+
+    def _batch_location_scores(
+        self, individual_location, features: ResourceFeatures
+    ) -> np.ndarray:
+        distance = self._batch_distances(individual_location, features)
+        return np.where(
+            np.isnan(distance), 0.5, 1.0 - np.minimum(distance / 50.0, 1.0)
+        )
+
+    @staticmethod
+    def _batch_distances(
+        individual_location, features: ResourceFeatures
+    ) -> np.ndarray:
+        """Distance to each resource; nan where either location is missing."""
+        if not individual_location:
+            return np.full(len(features), np.nan)
+        origin = np.asarray(individual_location, dtype=float)
+        return np.sqrt(((features.locations - origin) ** 2).sum(axis=1))
+
+    @staticmethod
+    def _batch_skill_scores(
+        individual_skills: List[str], features: ResourceFeatures
+    ) -> np.ndarray:
+        words = features.skill_bits.shape[1]
+        individual_bits = skill_bitset(
+            individual_skills, features.vocabulary, words
+        )
+        shared = features.skill_bits & individual_bits
+        matches = _POPCOUNT[shared.view(np.uint8)].reshape(len(features), -1).sum(1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = matches / features.skill_counts
+        if not individual_skills:
+            scores = np.zeros(len(features))
+        return np.where(features.skill_counts == 0, 1.0, scores)
+
+    @staticmethod
+    def _batch_availability_scores(
+        capacity: np.ndarray, occupied: np.ndarray
+    ) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            utilization = occupied / capacity
+        scores = np.select(
+            [utilization < 0.3, utilization < 0.8],
+            [0.7 + (utilization / 0.3) * 0.3, 1.0],
+            1.0 - ((utilization - 0.8) / 0.2) * 0.5,
+        )
+        return np.where((capacity <= 0) | (capacity - occupied <= 0), 0.0, scores)
+
+    @staticmethod
+    def _batch_priority_scores(
+        individual_priority: str, features: ResourceFeatures
+    ) -> np.ndarray:
+        level = PRIORITY_LEVELS.get(individual_priority.lower(), 2)
+        levels = np.arange(1, len(PRIORITY_LEVELS) + 1)
+        supported = (features.priority_masks[:, None] >> (levels - 1)) & 1 == 1
+        min_diff = np.where(supported, np.abs(level - levels), 99).min(axis=1)
+        return np.where(
+            features.priority_masks == 0,
+            0.5,
+            np.maximum(0.0, 1.0 - min_diff * 0.25),
+        )
@@ -0,0 +1,299 @@
+"""
+Bandit arm statistics shared by every worker process on a host.
+
+All workers map the same file into memory. It holds a small header (epsilon)
+and a fixed-size open-addressing hash table of arms keyed by resource type
+and id. Each slot has a reward count, sum and sum of squares. Reads go
+straight to the mapping without locking. Updates and new arms take an
+exclusive ``fcntl`` lock on the file, so concurrent increments from
+different processes are never lost. Arms are never moved or deleted, so a
+process can cache the slot of an arm once it has found it.
+
+Only plain running totals are kept; exponential decay and sliding windows
+are not available with this backend.
+"""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, Iterable, Set
+
+MAGIC = b"HABANDIT"
+VERSION = 1
+KEY_BYTES = 64
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("capacity", "<u4"),
+        ("arms", "<u8"),
+        ("updates", "<u8"),
+        ("epsilon", "<f8"),
+        ("reserved", "S24"),
+    ]
+)
+SLOT_DTYPE = np.dtype(
+    [
+        ("hash", "<u8"),  # 0 = empty
+        ("count", "<f8"),
+        ("sum", "<f8"),
+        ("sum_sq", "<f8"),
+        ("updates", "<u8"),
+        ("key", f"S{KEY_BYTES}"),
+    ]
+)
+
+# Separates resource type and id in slot keys; a key with an empty id holds
+# the totals of its resource type
+_SEP = "\x1f"
+
+
+def _key(resource_type: str, resource_id: str) -> bytes:
+    return f"{resource_type}{_SEP}{resource_id}".encode("utf-8")
+
+
+def _hash(key: bytes) -> int:
+    value = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    return value or 1
+
+
+class SharedBanditFile:
+    """Memory-mapped arm table file, safe to open from many processes."""
+
+    def __init__(self, path: str, capacity: int = 65536, epsilon: float = 0.1):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        # First process to get here lays out the file; the others see it
+        with self._locked():
+            self.created = os.fstat(self._fd).st_size == 0
+            if self.created:
+                size = HEADER_DTYPE.itemsize + capacity * SLOT_DTYPE.itemsize
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, 0)
+            self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._map)
+            if self.created:
+                self.header["magic"] = MAGIC
+                self.header["version"] = VERSION
+                self.header["capacity"] = capacity
+                self.header["epsilon"] = epsilon
+                self._map.flush()
+            elif bytes(self.header["magic"]) != MAGIC:
+                raise ValueError(f"{path} is not a shared bandit file")
+
+        self.capacity = int(self.header["capacity"])
+        self.slots = np.ndarray(
+            (self.capacity,),
+            dtype=SLOT_DTYPE,
+            buffer=self._map,
+            offset=HEADER_DTYPE.itemsize,
+        )
+        self._known: Dict[bytes, int] = {}
+        # Keys found absent, valid while no arm has been added anywhere
+        self._missing: Set[bytes] = set()
+        self._missing_arms = -1
+
+    # ------------------------------------------------------------------
+    # Arms
+    # ------------------------------------------------------------------
+
+    def find(self, key: bytes) -> int:
+        """Slot of a key, or -1 if no process has added it."""
+        slot = self._known.get(key)
+        if slot is not None:
+            return slot
+        arms = int(self.header["arms"])
+        if arms != self._missing_arms:
+            self._missing.clear()
+            self._missing_arms = arms
+        elif key in self._missing:
+            return -1
+        slot, found = self._probe(key)
+        if found:
+            self._known[key] = slot
+            return slot
+        self._missing.add(key)
+        return -1
+
+    def add(self, key: bytes, count: float, reward_sum: float, reward_sq_sum: float):
+        """Add to an arm and its resource type totals, creating them if new."""
+        type_key = key[: key.index(_SEP.encode()) + 1]
+        with self._locked():
+            for target in (key, type_key):
+                slot = self._insert(target)
+                row = self.slots[slot : slot + 1]
+                row["count"] += count
+                row["sum"] += reward_sum
+                row["sum_sq"] += reward_sq_sum
+                row["updates"] += int(count)
+            self.header["updates"] += int(count)
+
+    def keys(self, resource_type: str) -> np.ndarray:
+        """Slots of the arms of a resource type."""
+        prefix = f"{resource_type}{_SEP}".encode("utf-8")
+        used = np.flatnonzero(self.slots["hash"] != 0)
+        keys = self.slots["key"][used]
+        mine = np.char.startswith(keys, prefix) & (keys != prefix)
+        return used[mine]
+
+    def resource_types(self) -> Set[str]:
+        """Resource types any process has added arms for."""
+        used = np.flatnonzero(self.slots["hash"] != 0)
+        keys = self.slots["key"][used]
+        totals = keys[np.char.endswith(keys, _SEP.encode())]
+        return {key[:-1].decode("utf-8") for key in totals.tolist()}
+
+    # ------------------------------------------------------------------
+    # Exploration rate
+    # ------------------------------------------------------------------
+
+    @property
+    def epsilon(self) -> float:
+        return float(self.header["epsilon"])
+
+    @epsilon.setter
+    def epsilon(self, value: float):
+        with self._locked():
+            self.header["epsilon"] = value
+
+    def decay_epsilon(self, factor: float, floor: float):
+        """Multiply epsilon by factor (not below floor) as one atomic step."""
+        with self._locked():
+            self.header["epsilon"] = max(floor, float(self.header["epsilon"]) * factor)
+
+    def get_stats(self) -> Dict:
+        """Get file usage statistics."""
+        return {
+            "path": self.path,
+            "capacity": self.capacity,
+            "arms": int(self.header["arms"]),
+            "updates": int(self.header["updates"]),
+        }
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    # ------------------------------------------------------------------
+    # Hash table
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _probe(self, key: bytes):
+        """(slot, found): the key's slot, or the empty slot it would take."""
+        target = _hash(key)
+        stored_key = key[:KEY_BYTES]
+        slot = target % self.capacity
+        for _ in range(self.capacity):
+            current = int(self.slots["hash"][slot])
+            if current == 0:
+                return slot, False
+            if current == target and self.slots["key"][slot] == stored_key:
+                return slot, True
+            slot = (slot + 1) % self.capacity
+        return -1, False
+
+    def _insert(self, key: bytes) -> int:
+        """Slot of a key, claiming an empty one if needed (lock held)."""
+        slot = self.find(key)
+        if slot >= 0:
+            return slot
+        slot, found = self._probe(key)
+        if slot < 0:
+            raise RuntimeError(
+                f"Shared bandit file {self.path} is full ({self.capacity} arms)"
+            )
+        if not found:
+            # Key before hash: readers only look at slots with a hash
+            self.slots["key"][slot] = key[:KEY_BYTES]
+            self.slots["hash"][slot] = _hash(key)
+            self.header["arms"] += 1
+        self._known[key] = slot
+        return slot
+
+
+class SharedArmTable:
+    """ArmTable interface over the arms of one resource type in a shared file."""
+
+    def __init__(self, shared: SharedBanditFile, resource_type: str):
+        self.shared = shared
+        self.resource_type = resource_type
+        self._type_key = _key(resource_type, "")
+
+    def __len__(self) -> int:
+        return len(self.shared.keys(self.resource_type))
+
+    def update(self, arm_id: str, reward: float):
+        """Add one reward to an arm."""
+        reward = float(reward)
+        self.shared.add(_key(self.resource_type, arm_id), 1, reward, reward * reward)
+
+    def load(
+        self, arm_id: str, count: float, reward_sum: float, reward_sq_sum: float
+    ):
+        """Add stored totals to an arm (warm start)."""
+        if count > 0:
+            self.shared.add(
+                _key(self.resource_type, arm_id), count, reward_sum, reward_sq_sum
+            )
+
+    def lookup(self, arm_ids: Iterable[str]) -> np.ndarray:
+        """Slots of arms, -1 for arms without feedback."""
+        find = self.shared.find
+        return np.array(
+            [find(_key(self.resource_type, i)) for i in arm_ids], dtype=int
+        )
+
+    def counts(self, rows: np.ndarray) -> np.ndarray:
+        """Number of rewards per slot."""
+        rows = np.asarray(rows, dtype=int)
+        return np.where(rows >= 0, self.shared.slots["count"][rows], 0.0)
+
+    def means(self, rows: np.ndarray, default: float = 0.5) -> np.ndarray:
+        """Mean reward per slot; default where there is none."""
+        rows = np.asarray(rows, dtype=int)
+        slots = self.shared.slots[rows]
+        count = np.where(rows >= 0, slots["count"], 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = slots["sum"] / count
+        return np.where(count > 0, mean, default)
+
+    def variances(self, rows: np.ndarray) -> np.ndarray:
+        """Reward variance per slot; 0 where there is no reward."""
+        rows = np.asarray(rows, dtype=int)
+        slots = self.shared.slots[rows]
+        count = np.where(rows >= 0, slots["count"], 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = slots["sum"] / count
+            variance = slots["sum_sq"] / count - mean**2
+        return np.where(count > 0, np.maximum(variance, 0.0), 0.0)
+
+    def total_count(self) -> float:
+        """Number of rewards over all arms of the type."""
+        slot = self.shared.find(self._type_key)
+        return float(self.shared.slots["count"][slot]) if slot >= 0 else 0.0
+
+    def get_stats(self) -> Dict:
+        """Summary of the arms."""
+        rows = self.shared.keys(self.resource_type)
+        means = self.means(rows)
+        seen = self.counts(rows) > 0
+        slot = self.shared.find(self._type_key)
+        return {
+            "total_interactions": int(self.shared.slots["updates"][slot])
+            if slot >= 0
+            else 0,
+            "unique_resources": len(rows),
+            "avg_reward": float(means[seen].mean()) if seen.any() else 0.0,
+        }
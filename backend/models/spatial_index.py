@@ -0,0 +1,125 @@
+"""
+Spatial index for nearest-service and radius lookups on (lat, lon) points.
+
+Points are projected onto the unit sphere and stored in a KD-tree, so
+Euclidean chord distances map exactly onto great-circle distances.
+"""
+
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+from scipy.spatial import cKDTree
+from models.distance_matrix import EARTH_RADIUS_KM, coords_array
+
+# Number of distinct point sets kept by get_spatial_index
+INDEX_CACHE_SIZE = 32
+
+
+def to_unit_vectors(points: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Project (lat, lon) pairs onto 3-D unit-sphere coordinates."""
+    rad = np.radians(coords_array(points))
+    lat, lon = rad[:, 0], rad[:, 1]
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Convert unit-sphere chord lengths to great-circle distances (km)."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+
+def km_to_chord(distance_km: float) -> float:
+    """Convert a great-circle distance (km) to a unit-sphere chord length."""
+    angle = min(distance_km / EARTH_RADIUS_KM, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+class SpatialIndex:
+    """
+    KD-tree over unit-sphere coordinates with nearest-k and radius queries.
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float]]):
+        self.points = coords_array(points)
+        self.size = len(self.points)
+        self._tree = cKDTree(to_unit_vectors(self.points)) if self.size else None
+
+    def nearest(
+        self, query_points: Sequence[Tuple[float, float]], k: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest indexed points for each query point.
+
+        Returns:
+            (distances_km, indices), each shaped (Q, k); missing neighbors
+            have distance inf and index -1
+        """
+        queries = coords_array(query_points)
+        if not self.size or not len(queries):
+            return (
+                np.full((len(queries), k), np.inf),
+                np.full((len(queries), k), -1, dtype=int),
+            )
+
+        chord, idx = self._tree.query(to_unit_vectors(queries), k=min(k, self.size))
+        chord = np.asarray(chord, dtype=float).reshape(len(queries), -1)
+        idx = np.asarray(idx).reshape(len(queries), -1)
+
+        distances = chord_to_km(chord)
+        if k > self.size:
+            pad = k - self.size
+            distances = np.pad(distances, ((0, 0), (0, pad)), constant_values=np.inf)
+            idx = np.pad(idx, ((0, 0), (0, pad)), constant_values=-1)
+
+        return distances, idx
+
+    def within_radius(
+        self, query_points: Sequence[Tuple[float, float]], radius_km: float
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Find all indexed points within radius_km of each query point.
+
+        Returns:
+            One (indices, distances_km) pair per query point, sorted by distance
+        """
+        queries = coords_array(query_points)
+        if not self.size:
+            return [(np.empty(0, dtype=int), np.empty(0)) for _ in range(len(queries))]
+
+        query_vectors = to_unit_vectors(queries)
+        matches = self._tree.query_ball_point(query_vectors, r=km_to_chord(radius_km))
+
+        results = []
+        for vector, indices in zip(query_vectors, matches):
+            indices = np.asarray(indices, dtype=int)
+            chord = np.linalg.norm(self._tree.data[indices] - vector, axis=1)
+            order = np.argsort(chord)
+            results.append((indices[order], chord_to_km(chord[order])))
+
+        return results
+
+
+_index_cache: "OrderedDict[str, SpatialIndex]" = OrderedDict()
+
+
+def get_spatial_index(points: Sequence[Tuple[float, float]]) -> SpatialIndex:
+    """
+    Get a shared index for a point set, building it only on first use.
+
+    Indexes are keyed by the point coordinates, so callers passing the same
+    resource set (e.g. the shelter list) reuse one tree.
+    """
+    coords = np.ascontiguousarray(coords_array(points))
+    key = hashlib.sha1(coords.tobytes()).hexdigest()
+
+    index = _index_cache.get(key)
+    if index is None:
+        index = SpatialIndex(coords)
+        _index_cache[key] = index
+        if len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    else:
+        _index_cache.move_to_end(key)
+
+    return index
@@ -0,0 +1,484 @@
+"""
+Time-dependent public-transit travel times from a local GTFS feed.
+
+The feed is loaded into flat arrays: one row per stop time, sorted by trip
+and stop sequence, with times in seconds since midnight (values past 24:00
+are kept as GTFS writes them). Queries run round-based (RAPTOR style) over
+the stop times departing inside the query horizon. Each round boards every
+trip at its first stop reached so far and propagates arrivals to its later
+stops, all as array operations; walking transfers between nearby stops are
+relaxed after every round. Origins and destinations reach stops on foot;
+a journey counts only if it rides at least one vehicle. Many-to-one
+queries run the same rounds backwards from an arrival deadline (latest
+departure from every stop).
+"""
+
+import csv
+import io
+import zipfile
+import numpy as np
+from datetime import date as date_type, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from scipy.spatial import cKDTree
+from models.distance_matrix import coords_array
+from models.spatial_index import (
+    SpatialIndex,
+    chord_to_km,
+    km_to_chord,
+    to_unit_vectors,
+)
+
+WALKING_SPEED_KMH = 5.0
+
+# Walking limits for reaching a stop, leaving one, and changing between stops
+ACCESS_RADIUS_KM = 1.0
+TRANSFER_RADIUS_KM = 0.3
+
+# Boarding rounds per query (number of vehicles used, so transfers + 1)
+MAX_ROUNDS = 4
+
+WEEKDAYS = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+
+
+def _parse_gtfs_time(value: str) -> int:
+    """Convert a GTFS HH:MM:SS time (hours may exceed 23) to seconds."""
+    hours, minutes, seconds = value.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def _walk_seconds(distance_km):
+    return np.asarray(distance_km) / WALKING_SPEED_KMH * 3600
+
+
+class TransitRouter:
+    """
+    Earliest-arrival transit queries over array-backed GTFS timetables.
+    """
+
+    def __init__(
+        self,
+        stop_ids: List[str],
+        stop_coords: np.ndarray,
+        trip_service: np.ndarray,
+        service_days: np.ndarray,
+        service_ranges: np.ndarray,
+        service_exceptions: Dict[Tuple[int, int], bool],
+        st_trip: np.ndarray,
+        st_stop: np.ndarray,
+        st_arrival: np.ndarray,
+        st_departure: np.ndarray,
+        transfers: Optional[List[Tuple[int, int, int]]] = None,
+        max_trip_minutes: int = 120,
+    ):
+        self.stop_ids = stop_ids
+        self.stop_coords = coords_array(stop_coords)
+        self.num_stops = len(stop_ids)
+        self.trip_service = np.asarray(trip_service, dtype=np.int32)
+        self.service_days = np.asarray(service_days, dtype=bool)  # (services, 7)
+        self.service_ranges = np.asarray(service_ranges, dtype=np.int64)  # yyyymmdd
+        self.service_exceptions = service_exceptions
+        self.max_trip_seconds = max_trip_minutes * 60
+
+        self.st_trip = np.asarray(st_trip, dtype=np.int32)
+        self.st_stop = np.asarray(st_stop, dtype=np.int32)
+        self.st_arrival = np.asarray(st_arrival, dtype=np.int32)
+        self.st_departure = np.asarray(st_departure, dtype=np.int32)
+
+        self.stop_index = SpatialIndex(self.stop_coords)
+        self._stop_vectors = to_unit_vectors(self.stop_coords)
+        self._build_transfers(transfers or [])
+        self._active_trips: Dict[date_type, np.ndarray] = {}
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_gtfs(cls, path: str, max_trip_minutes: int = 120) -> "TransitRouter":
+        """Load stops, trips, stop_times, calendar(_dates) and transfers."""
+        with zipfile.ZipFile(path) as feed:
+
+            def rows(name: str) -> List[Dict[str, str]]:
+                if name not in feed.namelist():
+                    return []
+                with feed.open(name) as f:
+                    text = io.TextIOWrapper(f, encoding="utf-8-sig")
+                    return list(csv.DictReader(text))
+
+            stops = rows("stops.txt")
+            trips = rows("trips.txt")
+            stop_times = rows("stop_times.txt")
+            calendar = rows("calendar.txt")
+            calendar_dates = rows("calendar_dates.txt")
+            transfer_rows = rows("transfers.txt")
+
+        stop_ids = [s["stop_id"] for s in stops]
+        stop_lookup = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+        stop_coords = [(float(s["stop_lat"]), float(s["stop_lon"])) for s in stops]
+
+        service_ids = sorted(
+            {c["service_id"] for c in calendar}
+            | {c["service_id"] for c in calendar_dates}
+            | {t["service_id"] for t in trips}
+        )
+        service_lookup = {service_id: i for i, service_id in enumerate(service_ids)}
+        service_days = np.zeros((len(service_ids), 7), dtype=bool)
+        service_ranges = np.zeros((len(service_ids), 2), dtype=np.int64)
+        for c in calendar:
+            i = service_lookup[c["service_id"]]
+            service_days[i] = [c[day] == "1" for day in WEEKDAYS]
+            service_ranges[i] = (int(c["start_date"]), int(c["end_date"]))
+        service_exceptions = {
+            (service_lookup[c["service_id"]], int(c["date"])): c["exception_type"]
+            == "1"
+            for c in calendar_dates
+        }
+
+        trip_lookup = {t["trip_id"]: i for i, t in enumerate(trips)}
+        trip_service = [service_lookup[t["service_id"]] for t in trips]
+
+        records = []
+        for st in stop_times:
+            arrival = st.get("arrival_time") or st.get("departure_time")
+            departure = st.get("departure_time") or arrival
+            if not arrival:
+                continue  # untimed stop; GTFS allows interpolation
+            records.append(
+                (
+                    trip_lookup[st["trip_id"]],
+                    int(st["stop_sequence"]),
+                    stop_lookup[st["stop_id"]],
+                    _parse_gtfs_time(arrival),
+                    _parse_gtfs_time(departure),
+                )
+            )
+        table = np.array(records, dtype=np.int64).reshape(-1, 5)
+        table = table[np.lexsort((table[:, 1], table[:, 0]))]
+
+        transfers = []
+        for t in transfer_rows:
+            if t.get("transfer_type") == "3":  # transfer not possible
+                continue
+            if t["from_stop_id"] in stop_lookup and t["to_stop_id"] in stop_lookup:
+                transfers.append(
+                    (
+                        stop_lookup[t["from_stop_id"]],
+                        stop_lookup[t["to_stop_id"]],
+                        int(t.get("min_transfer_time") or 0),
+                    )
+                )
+
+        return cls(
+            stop_ids,
+            np.array(stop_coords),
+            np.array(trip_service),
+            service_days,
+            service_ranges,
+            service_exceptions,
+            table[:, 0],
+            table[:, 2],
+            table[:, 3],
+            table[:, 4],
+            transfers,
+            max_trip_minutes,
+        )
+
+    def _build_transfers(self, transfers: List[Tuple[int, int, int]]):
+        """Walking links between stops, sorted by target stop for group-min."""
+        links = {}
+        for i, (neighbors, distances) in enumerate(
+            self.stop_index.within_radius(self.stop_coords, TRANSFER_RADIUS_KM)
+        ):
+            for j, seconds in zip(neighbors, _walk_seconds(distances)):
+                if i != j:
+                    links[(i, int(j))] = int(seconds)
+        for from_stop, to_stop, seconds in transfers:
+            if from_stop != to_stop:
+                links[(from_stop, to_stop)] = seconds
+
+        pairs = sorted(links.items(), key=lambda item: (item[0][1], item[0][0]))
+        self.tr_from = np.array([p[0][0] for p in pairs], dtype=np.int32)
+        self.tr_to = np.array([p[0][1] for p in pairs], dtype=np.int32)
+        self.tr_seconds = np.array([p[1] for p in pairs], dtype=np.float64)
+        self.tr_targets, self.tr_starts = np.unique(self.tr_to, return_index=True)
+
+        # The same links grouped by source stop, for backward relaxation
+        self.tr_by_source = np.argsort(self.tr_from, kind="stable")
+        self.tr_sources, self.tr_source_starts = np.unique(
+            self.tr_from[self.tr_by_source], return_index=True
+        )
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def travel_minutes(
+        self,
+        origin: Tuple[float, float],
+        destinations: Sequence[Tuple[float, float]],
+        departure: datetime,
+    ) -> np.ndarray:
+        """
+        One-to-many door-to-door public transport travel time in minutes.
+
+        Returns:
+            Minutes per destination; inf if no vehicle gets there within the
+            horizon
+        """
+        destinations = coords_array(destinations)
+        start = departure.hour * 3600 + departure.minute * 60 + departure.second
+        arrival = self._stop_arrivals(origin, start, departure.date())
+
+        # Egress: walk from any stop reached by vehicle near each destination.
+        # Pairs come from one tree-to-tree search, so large destination sets
+        # (isochrone rasters) avoid a per-destination loop
+        best = np.full(len(destinations), np.inf)
+        reached = np.flatnonzero(np.isfinite(arrival))
+        if len(reached) and len(destinations):
+            pairs = cKDTree(self._stop_vectors[reached]).sparse_distance_matrix(
+                cKDTree(to_unit_vectors(destinations)),
+                km_to_chord(ACCESS_RADIUS_KM),
+                output_type="ndarray",
+            )
+            egress = arrival[reached[pairs["i"]]] + _walk_seconds(
+                chord_to_km(pairs["v"])
+            )
+            np.minimum.at(best, pairs["j"], egress)
+
+        minutes = (best - start) / 60
+        minutes[minutes * 60 > self.max_trip_seconds] = np.inf
+        return minutes
+
+    def travel_minutes_to(
+        self,
+        origins: Sequence[Tuple[float, float]],
+        destination: Tuple[float, float],
+        arrive_by: datetime,
+    ) -> np.ndarray:
+        """
+        Many-to-one door-to-door public transport travel time in minutes to
+        arrive at a destination by a deadline, leaving each origin as late
+        as possible (arrive_by minus the latest departure).
+
+        Returns:
+            Minutes per origin; inf if no vehicle gets there within the
+            horizon
+        """
+        origins = coords_array(origins)
+        deadline = arrive_by.hour * 3600 + arrive_by.minute * 60 + arrive_by.second
+        departure = self._stop_departures(destination, deadline, arrive_by.date())
+
+        # Access: walk to any stop with a departure near each origin
+        latest = np.full(len(origins), -np.inf)
+        reached = np.flatnonzero(np.isfinite(departure))
+        if len(reached) and len(origins):
+            pairs = cKDTree(self._stop_vectors[reached]).sparse_distance_matrix(
+                cKDTree(to_unit_vectors(origins)),
+                km_to_chord(ACCESS_RADIUS_KM),
+                output_type="ndarray",
+            )
+            access = departure[reached[pairs["i"]]] - _walk_seconds(
+                chord_to_km(pairs["v"])
+            )
+            np.maximum.at(latest, pairs["j"], access)
+
+        minutes = (deadline - latest) / 60
+        minutes[minutes * 60 > self.max_trip_seconds] = np.inf
+        return minutes
+
+    def earliest_arrival(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        departure: datetime,
+    ) -> Optional[datetime]:
+        """Earliest arrival at a destination, or None if out of the horizon."""
+        minutes = float(self.travel_minutes(origin, [destination], departure)[0])
+        if np.isinf(minutes):
+            return None
+        return departure + timedelta(minutes=minutes)
+
+    def get_stats(self) -> Dict:
+        """Get timetable size."""
+        return {
+            "stops": self.num_stops,
+            "trips": len(self.trip_service),
+            "stop_times": len(self.st_trip),
+            "transfers": len(self.tr_from),
+            "max_trip_minutes": self.max_trip_seconds // 60,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _stop_arrivals(
+        self, origin: Tuple[float, float], start: int, day: date_type
+    ) -> np.ndarray:
+        """Earliest arrival (seconds) at every stop by vehicle, else inf."""
+        arrival = np.full(self.num_stops, np.inf)
+        stops, distances = self.stop_index.within_radius([origin], ACCESS_RADIUS_KM)[0]
+        if not len(stops):
+            return arrival
+        arrival[stops] = start + _walk_seconds(distances)
+        arrival = self._relax_transfers(arrival)
+        walked = arrival.copy()
+
+        # Stop times of running trips inside the horizon; times increase
+        # along a trip, so the rows kept for each trip stay contiguous
+        horizon = start + self.max_trip_seconds
+        window = (
+            self._trips_running(day)[self.st_trip]
+            & (self.st_departure >= start)
+            & (self.st_arrival <= horizon)
+        )
+        rows = np.flatnonzero(window)
+        if not len(rows):
+            return np.full(self.num_stops, np.inf)
+
+        trip = self.st_trip[rows]
+        stop = self.st_stop[rows]
+        arrive = self.st_arrival[rows].astype(float)
+        depart = self.st_departure[rows]
+
+        # Index of the first row of each row's trip within the window
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = trip[1:] != trip[:-1]
+        trip_start = np.maximum.accumulate(np.where(first, np.arange(len(rows)), 0))
+
+        # Group rows by stop once for the per-round minimum
+        by_stop = np.argsort(stop, kind="stable")
+        stop_sorted = stop[by_stop]
+        group_starts = np.flatnonzero(np.r_[True, stop_sorted[1:] != stop_sorted[:-1]])
+        group_stops = stop_sorted[group_starts]
+
+        for _ in range(MAX_ROUNDS):
+            board = arrival[stop] <= depart
+            # Rows strictly after the first boarding row of their trip
+            boarded_before = np.cumsum(board) - board
+            reached = boarded_before - np.r_[0, np.cumsum(board)][trip_start] > 0
+            if not reached.any():
+                break
+
+            candidate = np.where(reached, arrive, np.inf)[by_stop]
+            best = np.minimum.reduceat(candidate, group_starts)
+            improved = best < arrival[group_stops]
+            if not improved.any():
+                break
+            arrival[group_stops[improved]] = best[improved]
+            arrival = self._relax_transfers(arrival)
+
+        return np.where(arrival < walked, arrival, np.inf)
+
+    def _stop_departures(
+        self, destination: Tuple[float, float], deadline: int, day: date_type
+    ) -> np.ndarray:
+        """
+        Latest departure (seconds) from every stop that reaches the
+        destination by the deadline by vehicle, else -inf. Mirrors
+        _stop_arrivals with time reversed.
+        """
+        departure = np.full(self.num_stops, -np.inf)
+        stops, distances = self.stop_index.within_radius(
+            [destination], ACCESS_RADIUS_KM
+        )[0]
+        if not len(stops):
+            return departure
+        departure[stops] = deadline - _walk_seconds(distances)
+        departure = self._relax_transfers_backward(departure)
+        walked = departure.copy()
+
+        horizon = deadline - self.max_trip_seconds
+        window = (
+            self._trips_running(day)[self.st_trip]
+            & (self.st_arrival <= deadline)
+            & (self.st_departure >= horizon)
+        )
+        rows = np.flatnonzero(window)
+        if not len(rows):
+            return np.full(self.num_stops, -np.inf)
+
+        trip = self.st_trip[rows]
+        stop = self.st_stop[rows]
+        arrive = self.st_arrival[rows]
+        depart = self.st_departure[rows].astype(float)
+
+        # Index of the last row of each row's trip within the window
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = trip[1:] != trip[:-1]
+        trip_end = np.minimum.accumulate(
+            np.where(last, np.arange(len(rows)), len(rows))[::-1]
+        )[::-1]
+
+        by_stop = np.argsort(stop, kind="stable")
+        stop_sorted = stop[by_stop]
+        group_starts = np.flatnonzero(np.r_[True, stop_sorted[1:] != stop_sorted[:-1]])
+        group_stops = stop_sorted[group_starts]
+
+        for _ in range(MAX_ROUNDS):
+            alight = arrive <= departure[stop]
+            # Rows strictly before the last alighting row of their trip
+            alighted = np.cumsum(alight)
+            reached = alighted[trip_end] - alighted > 0
+            if not reached.any():
+                break
+
+            candidate = np.where(reached, depart, -np.inf)[by_stop]
+            best = np.maximum.reduceat(candidate, group_starts)
+            improved = best > departure[group_stops]
+            if not improved.any():
+                break
+            departure[group_stops[improved]] = best[improved]
+            departure = self._relax_transfers_backward(departure)
+
+        return np.where(departure > walked, departure, -np.inf)
+
+    def _relax_transfers_backward(self, departure: np.ndarray) -> np.ndarray:
+        """Apply one walking transfer into every stop (latest departures)."""
+        if not len(self.tr_from):
+            return departure
+        order = self.tr_by_source
+        via = np.maximum.reduceat(
+            departure[self.tr_to[order]] - self.tr_seconds[order],
+            self.tr_source_starts,
+        )
+        departure[self.tr_sources] = np.maximum(departure[self.tr_sources], via)
+        return departure
+
+    def _relax_transfers(self, arrival: np.ndarray) -> np.ndarray:
+        """Apply one walking transfer from every stop."""
+        if not len(self.tr_from):
+            return arrival
+        via = np.minimum.reduceat(
+            arrival[self.tr_from] + self.tr_seconds, self.tr_starts
+        )
+        arrival[self.tr_targets] = np.minimum(arrival[self.tr_targets], via)
+        return arrival
+
+    def _trips_running(self, day: date_type) -> np.ndarray:
+        """Boolean mask of trips whose service runs on a date (cached)."""
+        active = self._active_trips.get(day)
+        if active is not None:
+            return active
+
+        stamp = int(day.strftime("%Y%m%d"))
+        services = self.service_days[:, day.weekday()] & (
+            (self.service_ranges[:, 0] <= stamp) & (stamp <= self.service_ranges[:, 1])
+        )
+        for (service, exception_day), added in self.service_exceptions.items():
+            if exception_day == stamp:
+                services[service] = added
+
+        active = services[self.trip_service]
+        if len(self._active_trips) >= 14:
+            self._active_trips.clear()
+        self._active_trips[day] = active
+        return active
@@ -0,0 +1,318 @@
+"""
+Time-of-day demand model for service locations.
+
+Check-ins (with the wait the visitor reported) and shelter capacity updates
+are folded into per-location histograms bucketed by weekday and hour of
+day. Buckets are running sums, so recording an event and reading a bucket
+are both O(1). Expected waits are shrunk toward the location's overall
+average until a bucket has enough check-ins of its own.
+
+Events come from the main app's ``analytics_events`` table (read
+incrementally by id) or are recorded directly.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+DAYS_PER_WEEK = 7
+HOURS_PER_DAY = 24
+
+# analytics_events.event_type values the model consumes
+CHECKIN_EVENT = "location_checkin"
+CAPACITY_EVENT = "shelter_capacity"
+
+# Check-ins a bucket needs before its own average outweighs the prior
+PRIOR_WEIGHT = 3.0
+
+# Events read from the database per query
+EVENT_BATCH_SIZE = 5000
+
+
+@dataclass
+class DayProfile:
+    """Hourly demand of one location on one weekday."""
+
+    wait_minutes: np.ndarray  # (24,) expected wait, shrunk toward the prior
+    checkins: np.ndarray  # (24,) observed check-ins
+    occupancy: np.ndarray  # (24,) mean share of beds taken, nan if unknown
+
+
+class VisitDemandModel:
+    """Per-location weekday × hour histograms of check-ins, waits and occupancy."""
+
+    def __init__(self, db_path: Optional[str] = None, refresh_seconds: float = 60):
+        self.db_path = db_path
+        self.refresh_seconds = refresh_seconds
+
+        self._slots: Dict[str, int] = {}
+        self._allocate(16)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+        self.last_event_id = 0
+        self.events_seen = 0
+        self._next_refresh = 0.0
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record_checkin(
+        self,
+        location_id: str,
+        when: datetime,
+        wait_minutes: Optional[float] = None,
+    ):
+        """Count a visit; the wait (minutes until served) is optional."""
+        with self._lock:
+            slot = self._slot(location_id)
+            day, hour = when.weekday(), when.hour
+            self._checkins[slot, day, hour] += 1
+            if wait_minutes is not None:
+                self._wait_sum[slot, day, hour] += float(wait_minutes)
+                self._wait_count[slot, day, hour] += 1
+                self._location_wait_sum[slot] += float(wait_minutes)
+                self._location_wait_count[slot] += 1
+            self.events_seen += 1
+
+    def record_capacity(
+        self,
+        location_id: str,
+        when: datetime,
+        available_beds: int,
+        total_capacity: int,
+    ):
+        """Record a bed-count update as an occupancy sample."""
+        if not total_capacity:
+            return
+        occupancy = min(max(1.0 - available_beds / total_capacity, 0.0), 1.0)
+        with self._lock:
+            slot = self._slot(location_id)
+            day, hour = when.weekday(), when.hour
+            self._occupancy_sum[slot, day, hour] += occupancy
+            self._occupancy_count[slot, day, hour] += 1
+            self.events_seen += 1
+
+    def ingest(self, events: Iterable[Dict]) -> int:
+        """
+        Fold analytics_events rows into the histograms.
+
+        Rows need event_type and metadata (a dict or JSON string with
+        location_id plus wait_minutes, or available_beds and total_capacity).
+        The event time is metadata["occurred_at"] (local time) when present,
+        else created_at.
+
+        Returns:
+            Number of rows used
+        """
+        used = 0
+        for event in events:
+            self.last_event_id = max(self.last_event_id, int(event.get("id") or 0))
+            metadata = event.get("metadata") or {}
+            if isinstance(metadata, str):
+                metadata = json.loads(metadata)
+            location_id = metadata.get("location_id")
+            if location_id is None:
+                continue
+
+            when = metadata.get("occurred_at") or event.get("created_at")
+            if isinstance(when, str):
+                when = datetime.fromisoformat(when)
+            when = when or datetime.now()
+
+            if event["event_type"] == CHECKIN_EVENT:
+                self.record_checkin(
+                    str(location_id), when, metadata.get("wait_minutes")
+                )
+            elif event["event_type"] == CAPACITY_EVENT:
+                self.record_capacity(
+                    str(location_id),
+                    when,
+                    metadata.get("available_beds", 0),
+                    metadata.get("total_capacity", 0),
+                )
+            else:
+                continue
+            used += 1
+        return used
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Read analytics events newer than the last one seen from the database.
+        Runs at most once per refresh_seconds unless forced.
+        """
+        if not self.db_path:
+            return 0
+        now = time.monotonic()
+        if not force and now < self._next_refresh:
+            return 0
+        # One reader at a time; others keep serving the current histograms
+        if not self._refresh_lock.acquire(blocking=force):
+            return 0
+        self._next_refresh = now + self.refresh_seconds
+
+        used = 0
+        conn = None
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            while True:
+                rows = conn.execute(
+                    """
+                    SELECT id, event_type, metadata, created_at FROM analytics_events
+                    WHERE id > ? AND event_type IN (?, ?)
+                    ORDER BY id LIMIT ?
+                    """,
+                    (
+                        self.last_event_id,
+                        CHECKIN_EVENT,
+                        CAPACITY_EVENT,
+                        EVENT_BATCH_SIZE,
+                    ),
+                ).fetchall()
+                used += self.ingest(dict(row) for row in rows)
+                if len(rows) < EVENT_BATCH_SIZE:
+                    break
+        except sqlite3.OperationalError:
+            # Database not created yet (main app never started)
+            pass
+        finally:
+            if conn is not None:
+                conn.close()
+            self._refresh_lock.release()
+        return used
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def has_data(self, location_id: Optional[str]) -> bool:
+        """Whether any event has been recorded for a location."""
+        self.refresh()
+        return location_id is not None and str(location_id) in self._slots
+
+    def expected_wait(
+        self, location_id: str, when: datetime, default: float = 0.0
+    ) -> float:
+        """Expected wait in minutes at a location for the hour of ``when``."""
+        self.refresh()
+        slot = self._slots.get(str(location_id))
+        if slot is None:
+            return float(default)
+        day, hour = when.weekday(), when.hour
+        prior = self._prior(slot, default)
+        return float(
+            (self._wait_sum[slot, day, hour] + PRIOR_WEIGHT * prior)
+            / (self._wait_count[slot, day, hour] + PRIOR_WEIGHT)
+        )
+
+    def day_profile(
+        self, location_id: Optional[str], weekday: int, default: float = 0.0
+    ) -> Optional[DayProfile]:
+        """Hourly profile of a location for a weekday (0 = Monday), or None."""
+        self.refresh()
+        slot = self._slots.get(str(location_id)) if location_id is not None else None
+        if slot is None:
+            return None
+        prior = self._prior(slot, default)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            occupancy = (
+                self._occupancy_sum[slot, weekday]
+                / self._occupancy_count[slot, weekday]
+            )
+        return DayProfile(
+            wait_minutes=(self._wait_sum[slot, weekday] + PRIOR_WEIGHT * prior)
+            / (self._wait_count[slot, weekday] + PRIOR_WEIGHT),
+            checkins=self._checkins[slot, weekday].copy(),
+            occupancy=occupancy,
+        )
+
+    def service_profiles(
+        self, location_ids: Iterable[str], weekday: int, defaults: np.ndarray
+    ) -> Optional[np.ndarray]:
+        """
+        (N, 24) expected waits for a weekday, for use as time-dependent
+        service durations; rows without data repeat their default. None if no
+        location has data.
+        """
+        self.refresh()
+        defaults = np.asarray(defaults, dtype=float)
+        slots = np.array(
+            [self._slots.get(str(location_id), -1) for location_id in location_ids],
+            dtype=int,
+        )
+        known = slots >= 0
+        if not known.any():
+            return None
+
+        profiles = np.repeat(defaults[:, None], HOURS_PER_DAY, axis=1)
+        rows = slots[known]
+        counts = self._location_wait_count[rows]
+        prior = np.where(
+            counts > 0,
+            self._location_wait_sum[rows] / np.maximum(counts, 1),
+            defaults[known],
+        )
+        profiles[known] = (
+            self._wait_sum[rows, weekday] + PRIOR_WEIGHT * prior[:, None]
+        ) / (self._wait_count[rows, weekday] + PRIOR_WEIGHT)
+        return profiles
+
+    def get_stats(self) -> Dict:
+        """Get model statistics."""
+        return {
+            "locations": len(self._slots),
+            "events_seen": self.events_seen,
+            "checkins": int(self._checkins[: len(self._slots)].sum()),
+            "last_event_id": self.last_event_id,
+            "source": "analytics_events" if self.db_path else "api",
+        }
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _prior(self, slot: int, default: float) -> float:
+        """Location-wide mean wait, or the default before any wait is seen."""
+        count = self._location_wait_count[slot]
+        if count == 0:
+            return float(default)
+        return float(self._location_wait_sum[slot] / count)
+
+    def _slot(self, location_id: str) -> int:
+        """Row of a location, growing the arrays when full (lock held)."""
+        slot = self._slots.get(location_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self._checkins):
+                self._allocate(2 * slot)
+            self._slots[location_id] = slot
+        return slot
+
+    def _allocate(self, rows: int):
+        """Create or grow the histogram arrays to ``rows`` locations."""
+        shape = (rows, DAYS_PER_WEEK, HOURS_PER_DAY)
+        for name, dtype in (
+            ("_checkins", np.int64),
+            ("_wait_sum", float),
+            ("_wait_count", np.int64),
+            ("_occupancy_sum", float),
+            ("_occupancy_count", np.int64),
+        ):
+            grown = np.zeros(shape, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                grown[: len(old)] = old
+            setattr(self, name, grown)
+        for name in ("_location_wait_sum", "_location_wait_count"):
+            grown = np.zeros(rows)
+            old = getattr(self, name, None)
+            if old is not None:
+                grown[: len(old)] = old
+            setattr(self, name, grown)
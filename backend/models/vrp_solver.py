@@ -0,0 +1,517 @@
+"""
+Capacitated vehicle routing with time windows for volunteer outreach.
+
+Volunteers start from their own location (multi-depot, open routes) and
+every stop has a service duration and a [open, close] visiting window in
+minutes since midnight. Service durations may be time-dependent: a (N, 24)
+profile gives the duration for a service starting in each hour of the day.
+Routes are built by parallel cheapest insertion, evaluated for every
+position of every route at once, then improved with intra-route
+2-opt/Or-opt and inter-route relocation until the time budget runs out.
+Intra-route improvement can be fanned out to a process pool (see
+models/route_workers.py); routes are independent at that stage, so the
+merged result is identical to a serial run.
+"""
+
+import time
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+from models.local_search import improve_path, nearest_neighbors, symmetric
+
+TIME_EPS = 1e-6
+
+HOURS_PER_DAY = 24
+
+
+def service_hour(start):
+    """Hour-of-day column of a service profile for start time(s) in minutes."""
+    return np.floor_divide(start, 60).astype(int) % HOURS_PER_DAY
+
+
+def schedule_route(
+    legs: np.ndarray,
+    service: np.ndarray,
+    window_open: np.ndarray,
+    window_close: np.ndarray,
+    shift_start: float,
+    shift_end: float,
+) -> Optional[List[Tuple[float, float, float]]]:
+    """
+    Simulate one route from per-stop travel legs (minutes) and windows.
+    ``service`` is one duration per stop or one (24,) hourly profile per stop.
+
+    Returns:
+        (arrival, start, depart) per stop, or None if a window or the
+        shift end is violated
+    """
+    clock = shift_start
+    schedule = []
+    profiled = np.ndim(service) == 2
+
+    for leg, duration, opens, closes in zip(legs, service, window_open, window_close):
+        arrival = clock + leg
+        start = max(arrival, opens)
+        if profiled:
+            duration = duration[int(start // 60) % HOURS_PER_DAY]
+        depart = start + duration
+        if depart > min(closes, shift_end) + TIME_EPS:
+            return None
+        schedule.append((float(arrival), float(start), float(depart)))
+        clock = depart
+
+    return schedule
+
+
+def improve_route_order(
+    sub_dist: np.ndarray,
+    service: np.ndarray,
+    window_open: np.ndarray,
+    window_close: np.ndarray,
+    shift_start: float,
+    shift_end: float,
+    minutes_per_km: float,
+    neighbor_k: int = 10,
+    deadline: Optional[float] = None,
+) -> Optional[List[int]]:
+    """
+    Run 2-opt/Or-opt on a single route.
+
+    Args:
+        sub_dist: Distance matrix over [start] + stops
+        service, window_open, window_close: Per-stop attributes (stop order)
+        deadline: Optional time.perf_counter() value at which to stop searching
+
+    Returns:
+        New visiting order as stop positions 1..m, or None if no shorter
+        schedule-feasible order was found
+    """
+    m = len(sub_dist) - 1
+    identity = list(range(m + 1))
+    # Searched on symmetric distances, accepted on the directed ones below
+    search_dist = symmetric(sub_dist)
+    path = improve_path(
+        list(identity),
+        search_dist.tolist(),
+        nearest_neighbors(search_dist, neighbor_k),
+        deadline=deadline,
+    )
+    if path == identity:
+        return None
+
+    before = sub_dist[identity[:-1], identity[1:]].sum()
+    after = sub_dist[path[:-1], path[1:]].sum()
+    if (after - before) * minutes_per_km >= -TIME_EPS:
+        return None
+
+    stops = np.array(path[1:]) - 1
+    legs = sub_dist[path[:-1], path[1:]] * minutes_per_km
+    if (
+        schedule_route(
+            legs,
+            service[stops],
+            window_open[stops],
+            window_close[stops],
+            shift_start,
+            shift_end,
+        )
+        is None
+    ):
+        return None
+
+    return path[1:]
+
+
+@dataclass
+class VRPSolution:
+    """Result of a VRP solve; stops are customer indices (0..N-1)."""
+
+    routes: List[List[int]]
+    schedules: List[List[Tuple[float, float, float]]]  # (arrival, start, depart)
+    unassigned: List[int]
+    travel_minutes: List[float]
+    stats: Dict = field(default_factory=dict)
+
+
+class VRPSolver:
+    """
+    Multi-depot open VRP with capacities, shift limits and time windows.
+
+    Node indices into ``dist`` are volunteers 0..V-1 followed by customers
+    V..V+N-1.
+    """
+
+    def __init__(
+        self,
+        dist: np.ndarray,
+        speeds_kmh: np.ndarray,
+        shift_start: np.ndarray,
+        shift_end: np.ndarray,
+        capacity: np.ndarray,
+        service: np.ndarray,
+        window_open: np.ndarray,
+        window_close: np.ndarray,
+        demand: np.ndarray,
+        priority: np.ndarray,
+        neighbor_k: int = 10,
+    ):
+        """
+        Args:
+            service: Per-customer service minutes, (N,) or (N, 24) by the
+                hour the service starts
+        """
+        self.dist = dist
+        self.num_vehicles = len(speeds_kmh)
+        self.num_customers = len(service)
+        self.minutes_per_km = 60.0 / np.asarray(speeds_kmh, dtype=float)
+        self.shift_start = np.asarray(shift_start, dtype=float)
+        self.shift_end = np.asarray(shift_end, dtype=float)
+        self.capacity = np.asarray(capacity, dtype=float)
+        self.neighbor_k = neighbor_k
+
+        # Customer attributes indexed by global node id (depots padded)
+        pad = np.zeros(self.num_vehicles)
+        service = np.asarray(service, dtype=float)
+        self.time_dependent = service.ndim == 2
+        self.service = np.concatenate(
+            [np.zeros((self.num_vehicles,) + service.shape[1:]), service]
+        )
+        self.window_open = np.concatenate([pad, window_open])
+        self.window_close = np.concatenate([pad, window_close])
+        self.demand = np.concatenate([pad, demand])
+        self.priority = np.asarray(priority, dtype=float)
+
+        self.routes: List[List[int]] = [[] for _ in range(self.num_vehicles)]
+        self.load = np.zeros(self.num_vehicles)
+        self._positions: List[Dict[str, np.ndarray]] = [
+            None
+        ] * self.num_vehicles
+        self._flat: Optional[Dict[str, np.ndarray]] = None
+        self._dirty = set()
+        self._pool = None
+        self._parallel_routes = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def solve(self, time_limit_ms: float = 2000, pool=None) -> VRPSolution:
+        """
+        Construct and improve routes within the wall-clock budget.
+
+        Args:
+            time_limit_ms: Wall-clock budget for the whole solve
+            pool: Optional RoutePool used to improve routes in parallel
+        """
+        for solution in self.solve_progressive(time_limit_ms, pool):
+            pass
+        return solution
+
+    def solve_progressive(
+        self, time_limit_ms: float = 2000, pool=None
+    ) -> Iterator[VRPSolution]:
+        """
+        Yield the constructed solution, then a new one after every improving
+        pass until the budget runs out; the last one yielded is the final
+        solution. A final pass that improves nothing yields the same routes
+        again with its time included in the stats. Construction always
+        completes, even past the budget.
+        """
+        self._pool = pool
+        started = time.perf_counter()
+        deadline = started + time_limit_ms / 1000.0
+
+        for v in range(self.num_vehicles):
+            self._refresh_route(v)
+
+        unassigned = self._construct(self._insertion_order())
+        constructed = time.perf_counter()
+        yield self._solution(unassigned, started, constructed)
+
+        while time.perf_counter() < deadline:
+            improved = self._improve_intra_route(deadline)
+            improved = self._relocate_between_routes(deadline) or improved
+            if unassigned:
+                remaining = self._construct(unassigned)
+                improved = improved or len(remaining) < len(unassigned)
+                unassigned = remaining
+            if not improved:
+                # Same routes; report the time this pass took as well
+                yield self._solution(unassigned, started, constructed)
+                break
+            yield self._solution(unassigned, started, constructed)
+
+    def _solution(
+        self, unassigned: List[int], started: float, constructed: float
+    ) -> VRPSolution:
+        """Snapshot the current routes as a VRPSolution."""
+        schedules = [self._schedule(v, route) for v, route in enumerate(self.routes)]
+        travel = [self._travel_minutes(v, route) for v, route in enumerate(self.routes)]
+        now = time.perf_counter()
+
+        return VRPSolution(
+            routes=[[node - self.num_vehicles for node in r] for r in self.routes],
+            schedules=schedules,
+            unassigned=sorted(node - self.num_vehicles for node in unassigned),
+            travel_minutes=travel,
+            stats={
+                "construction_ms": round((constructed - started) * 1000, 1),
+                "improvement_ms": round((now - constructed) * 1000, 1),
+                "total_travel_minutes": round(float(sum(travel)), 1),
+                "parallel_routes": self._parallel_routes,
+            },
+        )
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _insertion_order(self) -> List[int]:
+        """Highest priority first, then customers far from every depot."""
+        customers = np.arange(self.num_vehicles, self.num_vehicles + self.num_customers)
+        if not len(customers):
+            return []
+        remoteness = self.dist[: self.num_vehicles, customers].min(axis=0)
+        order = np.lexsort((-remoteness, -self.priority))
+        return customers[order].tolist()
+
+    def _construct(self, customers: List[int]) -> List[int]:
+        """Insert customers one by one at their cheapest feasible position."""
+        unassigned = []
+        for node in customers:
+            best = self._best_insertion(node)
+            if best is None:
+                unassigned.append(node)
+            else:
+                self._insert(node, *best[1:])
+        return unassigned
+
+    def _best_insertion(
+        self, node: int, exclude_vehicle: int = -1
+    ) -> Optional[Tuple[float, int, int]]:
+        """
+        Find the cheapest feasible insertion of a customer across all routes.
+
+        Returns:
+            (added travel minutes, vehicle, position) or None if infeasible
+        """
+        flat = self._flat_positions()
+        vehicle = flat["vehicle"]
+        prev = flat["prev"]
+        nxt = flat["next"]
+        has_next = nxt >= 0
+        nxt_safe = np.where(has_next, nxt, 0)
+        mpk = self.minutes_per_km[vehicle]
+
+        t_prev = self.dist[prev, node] * mpk
+        start = np.maximum(flat["depart_prev"] + t_prev, self.window_open[node])
+        service = self.service[node]
+        if self.time_dependent:
+            service = service[service_hour(start)]
+        depart = start + service
+        latest = np.minimum(self.window_close[node], self.shift_end[vehicle])
+        feasible = depart <= latest + TIME_EPS
+
+        t_next = self.dist[node, nxt_safe] * mpk
+        push = (
+            np.maximum(depart + t_next, flat["open_next"]) - flat["start_next"]
+        )
+        feasible &= ~has_next | (push <= flat["slack_next"] + TIME_EPS)
+        feasible &= self.load[vehicle] + self.demand[node] <= self.capacity[vehicle]
+        if exclude_vehicle >= 0:
+            feasible &= vehicle != exclude_vehicle
+
+        if not feasible.any():
+            return None
+
+        cost = t_prev + np.where(
+            has_next, t_next - self.dist[prev, nxt_safe] * mpk, 0.0
+        )
+        cost = np.where(feasible, cost, np.inf)
+        if not self.time_dependent:
+            best = int(np.argmin(cost))
+            return float(cost[best]), int(vehicle[best]), int(flat["position"][best])
+
+        # Pushed stops may start in an hour with a longer service, which the
+        # slack check does not see; confirm candidates by simulation
+        for best in np.argsort(cost)[: int(feasible.sum())]:
+            v, position = int(vehicle[best]), int(flat["position"][best])
+            route = self.routes[v]
+            if self._schedule(v, route[:position] + [node] + route[position:]):
+                return float(cost[best]), v, position
+        return None
+
+    def _insert(self, node: int, vehicle: int, position: int):
+        self.routes[vehicle].insert(position, node)
+        self.load[vehicle] += self.demand[node]
+        self._refresh_route(vehicle)
+
+    def _remove(self, node: int, vehicle: int):
+        self.routes[vehicle].remove(node)
+        self.load[vehicle] -= self.demand[node]
+        self._refresh_route(vehicle)
+
+    # ------------------------------------------------------------------
+    # Improvement
+    # ------------------------------------------------------------------
+
+    def _improve_intra_route(self, deadline: float) -> bool:
+        """Run 2-opt/Or-opt on each changed route, keeping only feasible gains."""
+        vehicles = [v for v in sorted(self._dirty) if len(self.routes[v]) >= 3]
+        self._dirty.clear()
+        if not vehicles:
+            return False
+
+        if self._pool is not None and len(vehicles) > 1:
+            orders = self._pool.improve_routes(self, vehicles, deadline)
+            self._parallel_routes += len(vehicles)
+        else:
+            orders = []
+            for v in vehicles:
+                if time.perf_counter() >= deadline:
+                    break
+                orders.append(self._improve_route(v, deadline))
+
+        improved = False
+        for v, order in zip(vehicles, orders):
+            if order is not None:
+                route = self.routes[v]
+                self.routes[v] = [route[i - 1] for i in order]
+                self._refresh_route(v)
+                self._dirty.discard(v)
+                improved = True
+
+        return improved
+
+    def _improve_route(
+        self, v: int, deadline: Optional[float] = None
+    ) -> Optional[List[int]]:
+        """Improve one route in-process; see improve_route_order."""
+        return improve_route_order(*self._route_problem(v), deadline)
+
+    def _route_problem(self, v: int) -> Tuple:
+        """Positional arguments of improve_route_order for one route."""
+        route = self.routes[v]
+        nodes = [v] + route
+        return (
+            self.dist[np.ix_(nodes, nodes)],
+            self.service[route],
+            self.window_open[route],
+            self.window_close[route],
+            float(self.shift_start[v]),
+            float(self.shift_end[v]),
+            float(self.minutes_per_km[v]),
+            self.neighbor_k,
+        )
+
+    def _relocate_between_routes(self, deadline: float) -> bool:
+        """Move single stops to another volunteer when that saves travel."""
+        if self.num_vehicles < 2:
+            return False
+
+        improved = False
+        for v in range(self.num_vehicles):
+            for node in list(self.routes[v]):
+                if time.perf_counter() >= deadline:
+                    return improved
+
+                route = self.routes[v]
+                k = route.index(node)
+                prev = route[k - 1] if k > 0 else v
+                mpk = self.minutes_per_km[v]
+                gain = self.dist[prev, node] * mpk
+                if k + 1 < len(route):
+                    nxt = route[k + 1]
+                    gain += (self.dist[node, nxt] - self.dist[prev, nxt]) * mpk
+
+                best = self._best_insertion(node, exclude_vehicle=v)
+                if best is None or best[0] >= gain - TIME_EPS:
+                    continue
+
+                # Removing a stop moves the later ones earlier, which with
+                # time-dependent service (or non-metric road distances) can
+                # break their windows; simulate both changed routes first
+                _, target, position = best
+                source = route[:k] + route[k + 1 :]
+                moved = list(self.routes[target])
+                moved.insert(position, node)
+                if (
+                    self._schedule(v, source) is None
+                    or self._schedule(target, moved) is None
+                ):
+                    continue
+
+                self._remove(node, v)
+                self._insert(node, target, position)
+                improved = True
+
+        return improved
+
+    # ------------------------------------------------------------------
+    # Route bookkeeping
+    # ------------------------------------------------------------------
+
+    def _schedule(
+        self, v: int, route: List[int]
+    ) -> Optional[List[Tuple[float, float, float]]]:
+        """Simulate a route; returns (arrival, start, depart) per stop or None."""
+        if not route:
+            return []
+        nodes = [v] + route
+        return schedule_route(
+            self.dist[nodes[:-1], nodes[1:]] * self.minutes_per_km[v],
+            self.service[route],
+            self.window_open[route],
+            self.window_close[route],
+            self.shift_start[v],
+            self.shift_end[v],
+        )
+
+    def _travel_minutes(self, v: int, route: List[int]) -> float:
+        if not route:
+            return 0.0
+        nodes = [v] + route
+        return float(self.dist[nodes[:-1], nodes[1:]].sum() * self.minutes_per_km[v])
+
+    def _refresh_route(self, v: int):
+        """Recompute the insertion-position arrays of one route."""
+        route = self.routes[v]
+        schedule = self._schedule(v, route) or []
+        m = len(route)
+
+        arrival = np.array([s[0] for s in schedule], dtype=float)
+        start = np.array([s[1] for s in schedule], dtype=float)
+        depart = np.array([s[2] for s in schedule], dtype=float)
+        nodes = np.array(route, dtype=int)
+
+        # Forward time slack: how far each start can be pushed back
+        latest = np.minimum(self.window_close[nodes], self.shift_end[v]) - (
+            depart - start
+        )
+        slack = np.empty(m)
+        carry = np.inf
+        for k in range(m - 1, -1, -1):
+            carry = min(latest[k] - start[k], carry)
+            slack[k] = carry
+            carry += start[k] - arrival[k]  # waiting absorbs delay
+
+        self._positions[v] = {
+            "vehicle": np.full(m + 1, v, dtype=int),
+            "position": np.arange(m + 1),
+            "prev": np.concatenate([[v], nodes]).astype(int),
+            "next": np.concatenate([nodes, [-1]]).astype(int),
+            "depart_prev": np.concatenate([[self.shift_start[v]], depart]),
+            "start_next": np.concatenate([start, [np.inf]]),
+            "open_next": np.concatenate([self.window_open[nodes], [0.0]]),
+            "slack_next": np.concatenate([slack, [np.inf]]),
+        }
+        self._flat = None
+        self._dirty.add(v)
+
+    def _flat_positions(self) -> Dict[str, np.ndarray]:
+        if self._flat is None:
+            keys = self._positions[0].keys()
+            self._flat = {
+                key: np.concatenate([p[key] for p in self._positions]) for key in keys
+            }
+        return self._flat
@@ -65,6 +65,67 @@ def test_shelter_recommendation():
     return response.json()
 
 
+def test_filtered_recommendation():
+    """Test candidate pre-filtering before scoring."""
+    print("\n=== Testing Filtered Recommendations ===")
+
+    payload = {
+        "individual": {
+            "id": "ind_001",
+            "location": [40.7128, -74.0060],
+            "priority": "high",
+        },
+        "shelters": [
+            {
+                "id": "shelter_near",
+                "location": [40.7180, -74.0010],
+                "capacity": 20,
+                "occupied": 12,
+                "priority_support": ["high", "critical"],
+            },
+            {
+                "id": "shelter_full",
+                "location": [40.7150, -74.0030],
+                "capacity": 20,
+                "occupied": 20,
+                "priority_support": ["high"],
+            },
+            {
+                "id": "shelter_low_only",
+                "location": [40.7140, -74.0050],
+                "capacity": 20,
+                "occupied": 5,
+                "priority_support": ["low"],
+            },
+            {
+                "id": "shelter_far",
+                "location": [41.5000, -73.0000],
+                "capacity": 20,
+                "occupied": 5,
+                "priority_support": ["high"],
+            },
+        ],
+        "top_k": 5,
+        "use_bandit": False,
+        "filters": {
+            "max_distance": 0.1,
+            "available_only": True,
+            "priority_match": True,
+        },
+    }
+
+    response = requests.post(f"{BASE_URL}/api/v1/recommend/shelters", json=payload)
+    print(f"Status: {response.status_code}")
+    ids = [r["resource_id"] for r in response.json()["recommendations"]]
+    print(f"Recommended: {ids}")
+    assert ids == ["shelter_near"]
+
+    payload["filters"] = {"radius": 1}
+    response = requests.post(f"{BASE_URL}/api/v1/recommend/shelters", json=payload)
+    print(f"Unknown filter status: {response.status_code}")
+    assert response.status_code == 400
+
+
 def test_job_recommendation():
     """Test job recommendation endpoint."""
     print("\n=== Testing Job Recommendations ===")
@@ -125,6 +186,28 @@ def test_feedback():
     print(json.dumps(response.json(), indent=2))
 
 
+def test_slate_feedback(recommendations):
+    """Test per-position feedback on a recommended list."""
+    print("\n=== Testing Slate Feedback ===")
+
+    payload = {
+        "resource_type": "shelter",
+        "slate": [r["resource_id"] for r in recommendations],
+        "accepted_position": len(recommendations) - 1,
+        "individual_id": "ind_001",
+    }
+
+    response = requests.post(f"{BASE_URL}/api/v1/feedback/slate", json=payload)
+    print(f"Status: {response.status_code}")
+    print(json.dumps(response.json(), indent=2))
+    assert response.json()["positions_updated"] == len(recommendations)
+
+    payload["accepted_position"] = len(recommendations)
+    response = requests.post(f"{BASE_URL}/api/v1/feedback/slate", json=payload)
+    print(f"Out-of-range position status: {response.status_code}")
+    assert response.status_code == 400
+
+
 def test_statistics():
     """Test statistics endpoint."""
     print("\n=== Testing Statistics ===")
@@ -155,11 +238,13 @@ if __name__ == "__main__":
 
         # Run tests
         shelter_result = test_shelter_recommendation()
+        test_filtered_recommendation()
         test_job_recommendation()
 
         # Provide feedback on first recommendation
         if shelter_result.get("recommendations"):
             test_feedback()
+            test_slate_feedback(shelter_result["recommendations"])
 
         test_statistics()
         test_ab_testing()
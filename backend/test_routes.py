@@ -58,6 +58,73 @@ def test_multi_stop_optimization():
         print(f"  Accessibility Score: {route['accessibility_score']}")
         print(f"  Visit Order: {' → '.join(route['order'])}")
 
+        print(f"\nAlternatives: {len(route['alternatives'])}")
+        for alt in route["alternatives"]:
+            print(
+                f"  - {alt['label']} ({alt['transport_mode']}): "
+                f"{alt['total_distance']} km, {alt['total_time']} min, "
+                f"${alt['estimated_cost']}"
+            )
+
+    return result
+
+
+def one_way_grid(size=12, step_deg=0.004, origin=(40.70, -74.02)):
+    """Road grid whose east-west streets are one-way, alternating direction."""
+    from models.road_network import ALL_MODES, RoadNetwork
+
+    starts, ends, oneway = [], [], []
+    lat0, lon0 = origin
+    for i in range(size):
+        for j in range(size):
+            point = (lat0 + i * step_deg, lon0 + j * step_deg)
+            if j + 1 < size:
+                east = (lat0 + i * step_deg, lon0 + (j + 1) * step_deg)
+                starts.append(point if i % 2 == 0 else east)
+                ends.append(east if i % 2 == 0 else point)
+                oneway.append(True)
+            if i + 1 < size:
+                starts.append(point)
+                ends.append((lat0 + (i + 1) * step_deg, lon0 + j * step_deg))
+                oneway.append(False)
+    return RoadNetwork.from_segments(starts, ends, [ALL_MODES] * len(starts), oneway)
+
+
+def test_one_way_road_network():
+    """Test multi-stop routing on a road network with one-way streets (in-process)."""
+    print("\n=== Testing One-Way Road Network Routing ===")
+    import time
+    import numpy as np
+    from models.route_optimizer import RouteOptimizer
+
+    optimizer = RouteOptimizer()
+    optimizer.road_network = one_way_grid()
+    start = (40.72, -74.0)
+    rng = np.random.default_rng(4)
+    points = rng.uniform([40.70, -74.02], [40.744, -73.976], size=(25, 2))
+    destinations = [
+        {"id": f"stop_{i}", "lat": lat, "lon": lon, "type": "shelter"}
+        for i, (lat, lon) in enumerate(points)
+    ]
+
+    dist = optimizer._distance_matrix(
+        np.vstack([start, points]), transport_mode="driving"
+    )
+    print(f"Largest one-way difference: {np.abs(dist - dist.T).max():.2f} km")
+
+    started = time.perf_counter()
+    result = optimizer.optimize_multi_stop_route(
+        start, destinations, {"transport_mode": "driving", "alternatives": 0}
+    )
+    elapsed = time.perf_counter() - started
+    print(f"Solved in {elapsed * 1000:.1f} ms: {result['total_distance']} km")
+
+    # Legs are costed in driving direction
+    tour = [int(stop_id.split("_")[1]) + 1 for stop_id in result["order"]]
+    directed = dist[[0] + tour[:-1], tour].sum()
+    assert sorted(tour) == list(range(1, 26))
+    assert abs(result["total_distance"] - round(directed, 2)) < 0.01
+    assert elapsed < 5
     return result
 
 
@@ -73,6 +140,8 @@ def test_volunteer_optimization():
                 "lat": 40.7128,
                 "lon": -74.0060,
                 "available_hours": 8,
+                "start_time": "09:00",
+                "capacity": 3,
                 "transport_mode": "driving",
             },
             {
@@ -130,6 +199,7 @@ def test_volunteer_optimization():
         print(f"  Total Individuals: {opt['total_individuals']}")
         print(f"  Coverage: {opt['coverage'] * 100:.1f}%")
         print(f"  Balance Score: {opt['balance_score']:.3f}")
+        print(f"  Unassigned: {opt['unassigned']}")
 
         for vol_id, route_info in opt["volunteer_routes"].items():
             print(f"\n  {route_info['volunteer_name']}:")
@@ -141,6 +211,54 @@ def test_volunteer_optimization():
     return result
 
 
+def test_route_session():
+    """Test incremental route repair in a route session."""
+    print("\n=== Testing Route Session ===")
+
+    payload = {
+        "start_location": {"lat": 40.7128, "lon": -74.0060},
+        "destinations": [
+            {"id": "ind_1", "lat": 40.7580, "lon": -73.9855, "wait_time": 15},
+            {"id": "ind_2", "lat": 40.7489, "lon": -73.9680, "wait_time": 10},
+            {"id": "shelter_1", "lat": 40.7300, "lon": -73.9950, "wait_time": 20},
+        ],
+        "constraints": {"transport_mode": "walking", "start_time": "09:00"},
+        "room": "volunteer_vol_1",
+    }
+
+    response = requests.post(f"{BASE_URL}/api/v1/routes/sessions", json=payload)
+    print(f"Status: {response.status_code}")
+    session = response.json()["session"]
+    print(f"Initial order: {session['route']['order']}")
+
+    changes = {
+        "changes": [
+            {
+                "type": "insert",
+                "stop": {"id": "ind_3", "lat": 40.7420, "lon": -73.9900},
+            },
+            {"type": "remove", "stop_id": "shelter_1"},
+            {"type": "delay", "minutes": 30},
+        ]
+    }
+    response = requests.post(
+        f"{BASE_URL}/api/v1/routes/sessions/{session['session_id']}/changes",
+        json=changes,
+    )
+    print(f"Status: {response.status_code}")
+    result = response.json()
+
+    if result.get("success"):
+        session = result["session"]
+        print(f"Repaired in {session['repair_ms']} ms (version {session['version']})")
+        print(f"Order: {session['route']['order']}")
+        for stop in session["schedule"]:
+            print(f"  {stop['id']}: {stop['start']} - {stop['depart']}")
+
+    requests.delete(f"{BASE_URL}/api/v1/routes/sessions/{session['session_id']}")
+    return result
+
+
 def test_accessibility_scoring():
     """Test resource accessibility scoring."""
     print("\n=== Testing Accessibility Scoring ===")
@@ -198,6 +316,63 @@ def test_accessibility_scoring():
     return result
 
 
+def test_batch_accessibility_scoring():
+    """Test batch accessibility scoring for several individuals."""
+    print("\n=== Testing Batch Accessibility Scoring ===")
+
+    payload = {
+        "individuals": [
+            {"id": "ind_1", "lat": 40.7128, "lon": -74.0060},
+            {
+                "id": "ind_2",
+                "lat": 40.7306,
+                "lon": -73.9352,
+                "profile": {"mobility_issues": True},
+            },
+        ],
+        "resources": [
+            {
+                "id": "shelter_1",
+                "name": "Hope Shelter",
+                "lat": 40.7580,
+                "lon": -73.9855,
+                "type": "shelter",
+                "wheelchair_accessible": True,
+                "public_transport_nearby": True,
+            },
+            {
+                "id": "shelter_2",
+                "name": "Community Haven",
+                "lat": 40.6782,
+                "lon": -73.9442,
+                "type": "shelter",
+            },
+        ],
+        "top_k": 2,
+    }
+
+    for response_format in ("records", "columnar"):
+        payload["format"] = response_format
+        response = requests.post(
+            f"{BASE_URL}/api/v1/routes/accessibility-score/batch", json=payload
+        )
+        print(f"Status ({response_format}): {response.status_code}")
+        result = response.json()
+
+        if result.get("success") and response_format == "records":
+            for entry in result["results"]:
+                best = entry["top_resources"][0] if entry["top_resources"] else None
+                if best:
+                    print(
+                        f"  {entry['individual_id']}: {best['resource_name']} "
+                        f"(score {best['accessibility_score']})"
+                    )
+        elif result.get("success"):
+            print(f"  Resource index: {result['results']['resource_index']}")
+
+    return result
+
+
 def test_visit_time_suggestions():
     """Test visit time suggestions."""
     print("\n=== Testing Visit Time Suggestions ===")
@@ -235,6 +410,80 @@ def test_visit_time_suggestions():
     return result
 
 
+def test_observed_visit_times():
+    """Test visit times suggested from recorded check-ins."""
+    print("\n=== Testing Observed Visit Times ===")
+
+    # Short waits early, a lunchtime rush, on two Mondays
+    events = []
+    for day in ("2024-11-04", "2024-11-11"):
+        for hour in range(8, 20):
+            wait = 5 if hour < 10 else 40 if 11 <= hour < 14 else 15
+            for minute in (5, 25, 45):
+                events.append(
+                    {
+                        "type": "checkin",
+                        "location_id": "shelter_observed",
+                        "timestamp": f"{day}T{hour:02d}:{minute:02d}:00",
+                        "wait_minutes": wait,
+                    }
+                )
+
+    response = requests.post(
+        f"{BASE_URL}/api/v1/routes/visit-events", json={"events": events}
+    )
+    print(f"Recorded: {response.json().get('recorded')}")
+
+    payload = {
+        "location": {
+            "id": "shelter_observed",
+            "name": "Observed Shelter",
+            "hours": {"monday": {"open": "08:00", "close": "20:00"}},
+        },
+        "date": "2024-11-18",  # Monday
+    }
+    response = requests.post(f"{BASE_URL}/api/v1/routes/visit-times", json=payload)
+    print(f"Status: {response.status_code}")
+    result = response.json()
+
+    if result.get("success"):
+        for suggestion in result["suggestions"]:
+            recommended = "⭐ RECOMMENDED" if suggestion.get("recommended") else ""
+            print(
+                f"  {suggestion['time_slot']} {suggestion['wait_time_estimate']} "
+                f"score {suggestion['score']} {recommended}"
+            )
+
+    return result
+
+
+def test_overnight_visit_times():
+    """Test visit slots and time windows of overnight hours (in-process)."""
+    print("\n=== Testing Overnight Visit Times ===")
+    import numpy as np
+    from models.route_optimizer import RouteOptimizer
+    from models.visit_demand import DayProfile
+
+    optimizer = RouteOptimizer()
+    profile = DayProfile(
+        wait_minutes=np.full(24, 10.0),
+        checkins=np.zeros(24, dtype=int),
+        occupancy=np.full(24, np.nan),
+    )
+    day_hours = {"open": "20:00", "close": "08:00"}
+
+    suggestions = optimizer._observed_visit_slots(profile, day_hours, "friday")
+    for suggestion in suggestions:
+        print(f"  {suggestion['time_slot']} score {suggestion['score']}")
+
+    # 12 hours in 2-hour slots, past midnight
+    assert len(suggestions) == 6
+    assert suggestions[0]["time_slot"] == "20:00 - 22:00"
+    assert suggestions[-1]["time_slot"] == "06:00 - 08:00"
+    assert optimizer._time_window({"friday": day_hours}, "friday") == (1200, 1920)
+    return suggestions
+
+
 def test_service_gap_analysis():
     """Test service gap identification."""
     print("\n=== Testing Service Gap Analysis ===")
@@ -285,6 +534,45 @@ def test_service_gap_analysis():
     return result
 
 
+def test_isochrones():
+    """Test isochrone computation and caching."""
+    print("\n=== Testing Isochrones ===")
+
+    payload = {
+        "locations": [
+            {"id": "shelter_1", "lat": 40.7580, "lon": -73.9855},
+            {"id": "shelter_2", "lat": 40.6782, "lon": -73.9442},
+        ],
+        "transport_mode": "walking",
+        "minutes": 30,
+    }
+
+    response = requests.post(f"{BASE_URL}/api/v1/routes/isochrones", json=payload)
+    print(f"Status: {response.status_code}")
+    result = response.json()
+
+    if result.get("success"):
+        for isochrone in result["isochrones"]:
+            print(
+                f"  {isochrone['location_id']}: {isochrone['area_km2']} km² "
+                f"within {isochrone['minutes']} min"
+            )
+
+    # A smaller budget reuses the cached rasters
+    payload["minutes"] = 15
+    requests.post(f"{BASE_URL}/api/v1/routes/isochrones", json=payload)
+    stats = requests.get(f"{BASE_URL}/api/v1/routes/cache-stats").json()
+    print(f"  Cache: {stats['isochrones']}")
+
+    response = requests.post(
+        f"{BASE_URL}/api/v1/routes/isochrones/invalidate",
+        json={"location_ids": ["shelter_1"]},
+    )
+    print(f"  Invalidated: {response.json().get('invalidated')}")
+
+    return result
+
+
 def test_distance_calculation():
     """Test distance calculation."""
     print("\n=== Testing Distance Calculation ===")
@@ -341,10 +629,16 @@ if __name__ == "__main__":
 
         # Run tests
         test_multi_stop_optimization()
+        test_one_way_road_network()
         test_volunteer_optimization()
+        test_route_session()
         test_accessibility_scoring()
+        test_batch_accessibility_scoring()
         test_visit_time_suggestions()
+        test_observed_visit_times()
+        test_overnight_visit_times()
         test_service_gap_analysis()
+        test_isochrones()
         test_distance_calculation()
         test_travel_estimate()
 